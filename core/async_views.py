@@ -0,0 +1,130 @@
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+
+from django.shortcuts import aget_object_or_404
+
+from rest_framework import exceptions
+
+from core.tracing import deny_permission, start_permission_span, start_span
+
+
+class AsyncAPIViewMixin:
+    """
+    Async request path for read-only GenericAPIView subclasses, only GET is served
+    """
+    http_method_names = ["get", "head", "options"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        view_class = type(self).__name__
+        span_name = f"view {view_class}.{request.method.lower()}"
+
+        with start_span(span_name, **{"view.class": view_class}):
+            try:
+                await self.ainitial(request, *args, **kwargs)
+
+                if request.method.lower() in self.http_method_names:
+                    handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                else:
+                    handler = self.http_method_not_allowed
+
+                response = handler(request, *args, **kwargs)
+
+                # options and http_method_not_allowed are sync
+                if isawaitable(response):
+                    response = await response
+
+            # as APIView.dispatch, handle_exception answers or re-raises
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                response = self.handle_exception(exc)
+
+            self.response = self.finalize_response(request, response, *args, **kwargs)
+            return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        await self.acheck_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        """
+        Same as Request._authenticate(), leaves request.user resolved
+        """
+        # Request has no public way to set its authenticator or an anonymous user
+        # pylint: disable=protected-access
+        for authenticator in request.authenticators:
+            authenticate = (
+                getattr(authenticator, "aauthenticate", None)
+                or sync_to_async(authenticator.authenticate)
+            )
+            span_attributes = {"authentication.classes": type(authenticator).__name__}
+
+            try:
+                with start_span("authenticate", **span_attributes):
+                    user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def acheck_permissions(self, request):
+        for permission in self.get_permissions():
+            with start_permission_span("permission", permission):
+                if hasattr(permission, "ahas_permission"):
+                    allowed = await permission.ahas_permission(request, self)
+                else:
+                    allowed = permission.has_permission(request, self)
+
+            if not allowed:
+                deny_permission(self, request, permission)
+
+    async def acheck_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            with start_permission_span("object permission", permission):
+                if hasattr(permission, "ahas_object_permission"):
+                    allowed = await permission.ahas_object_permission(request, self, obj)
+                else:
+                    allowed = permission.has_object_permission(request, self, obj)
+
+            if not allowed:
+                deny_permission(self, request, permission)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        with start_span("get_object", **{"view.class": type(self).__name__}):
+            obj = await aget_object_or_404(
+                queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+
+            await self.acheck_object_permissions(self.request, obj)
+
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
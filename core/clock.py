@@ -0,0 +1,14 @@
+from django.utils import timezone
+
+
+def get_request_now(request):
+    """
+    Returns the time the request is handled at, the same for every call
+    """
+    if request is None:
+        return timezone.now()
+
+    if not hasattr(request, "now"):
+        request.now = timezone.now()
+
+    return request.now
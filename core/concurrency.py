@@ -0,0 +1,155 @@
+from functools import wraps
+
+from django.db import connections, router
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.utils.http import parse_etags, quote_etag
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+# attempts of a write without If-Match before its conflict is returned
+WRITE_ATTEMPTS = 3
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource was changed by another request. Reload it and try again."
+    default_code = "precondition_failed"
+
+
+class WriteConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The resource kept changing during the request. Try again."
+    default_code = "write_conflict"
+
+
+def get_version_etag(instance):
+    """
+    Returns the strong ETag of an object with a version field
+    """
+    return quote_etag(str(instance.version))
+
+
+def check_if_match(request, instance):
+    """
+    Raises PreconditionFailed on a stale If-Match, returns whether one was sent
+    """
+    if_match = request.headers.get("If-Match")
+
+    if if_match is None:
+        return False
+
+    etags = parse_etags(if_match)
+
+    if "*" in etags:
+        return False
+
+    if get_version_etag(instance) not in etags:
+        raise PreconditionFailed()
+
+    return True
+
+
+def update_conditionally(instance, update_fields, condition=None, check_version=True):
+    """
+    Writes the fields with one UPDATE bumping the version, returns False if no row matched
+    """
+    model = type(instance)
+    opts = model._meta
+    values = [(opts.get_field("version"), None, F("version") + 1)]
+
+    for field_name in update_fields:
+        field = opts.get_field(field_name)
+        values.append((field, None, field.pre_save(instance, add=False)))
+
+    using = router.db_for_write(model, instance=instance)
+    queryset = opts.default_manager.using(using).filter(pk=instance.pk)
+
+    if check_version:
+        queryset = queryset.filter(version=instance.version)
+
+    if condition is not None:
+        queryset = queryset.filter(condition)
+
+    # _update is what Model.save() uses for UPDATE ... RETURNING,
+    # backends without it return a row count instead of rows
+    returning_fields = None if check_version else opts.concrete_fields
+    rows = queryset._update(values, returning_fields)  # pylint: disable=protected-access
+
+    if not rows:
+        return False
+
+    if check_version:
+        instance.version += 1
+    elif rows[0]:
+        for field, value in zip(returning_fields, rows[0]):
+            setattr(instance, field.attname, value)
+    else:
+        instance.refresh_from_db(fields=[field.attname for field in returning_fields])
+
+    post_save.send(
+        sender=model,
+        instance=instance,
+        created=False,
+        update_fields=frozenset(update_fields),
+        raw=False,
+        using=using
+    )
+
+    return True
+
+
+def update_returning(queryset, returning, **values):
+    """
+    Runs queryset.update(**values) and returns the returning fields of the updated rows
+    """
+    opts = queryset.model._meta
+    fields = [opts.get_field(name) for name in returning]
+
+    if connections[queryset.db].features.can_return_rows_from_update:
+        return queryset._update(  # pylint: disable=protected-access
+            [(opts.get_field(name), None, value) for name, value in values.items()],
+            fields
+        )
+
+    rows = list(
+        queryset.select_for_update().values_list("pk", *[field.attname for field in fields])
+    )
+    opts.default_manager.using(queryset.db).filter(
+        pk__in=[row[0] for row in rows]
+    ).update(**values)
+
+    return [row[1:] for row in rows]
+
+
+def save_versioned(instance, update_fields):
+    """
+    Saves the fields if the version did not change, raises PreconditionFailed otherwise
+    """
+    if not update_conditionally(instance, update_fields):
+        raise PreconditionFailed()
+
+    return instance
+
+
+def retry_on_conflict(handler):
+    """
+    Reruns the view handler on a version conflict unless the request sent If-Match,
+    a request without a precondition gets WriteConflict once the attempts run out
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        if "If-Match" in request.headers:
+            return handler(view, request, *args, **kwargs)
+
+        for _ in range(WRITE_ATTEMPTS):
+            try:
+                return handler(view, request, *args, **kwargs)
+            except PreconditionFailed:
+                pass
+
+        raise WriteConflict()
+
+    return wrapper
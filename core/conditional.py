@@ -0,0 +1,87 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def get_queryset_fingerprint(queryset, **aggregates):
+    """
+    Returns row count, latest updated_at and the extra aggregates of the queryset
+    """
+    return queryset.order_by().aggregate(
+        count=Count("pk"),
+        updated_at=Max("updated_at"),
+        **aggregates
+    )
+
+
+async def aget_queryset_fingerprint(queryset, **aggregates):
+    return await queryset.order_by().aaggregate(
+        count=Count("pk"),
+        updated_at=Max("updated_at"),
+        **aggregates
+    )
+
+
+class ConditionalGet:
+    """
+    ETag / Last-Modified support for a GET response built from a fingerprint
+    """
+    cache_prefix = "conditional-get"
+    cache_timeout = 60 * 60 * 24
+
+    def __init__(self, request, *fingerprint):
+        path_key = f"{request.user.pk}:{request.get_full_path()}"
+
+        self.etag = quote_etag(self.hash(f"{path_key}:{fingerprint!r}"))
+        self.last_modified = self.get_last_modified(f"{self.cache_prefix}:{self.hash(path_key)}")
+
+    @staticmethod
+    def hash(value):
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    def get_last_modified(self, cache_key):
+        cache = caches[settings.CONDITIONAL_GET_CACHE]
+        seen = cache.get(cache_key)
+
+        if seen is not None and seen[0] == self.etag:
+            return seen[1]
+
+        # HTTP dates have one second precision, a new fingerprint must never
+        # share its Last-Modified with the previous one
+        last_modified = int(timezone.now().timestamp())
+
+        if seen is not None:
+            last_modified = max(last_modified, seen[1] + 1)
+
+        cache.set(cache_key, (self.etag, last_modified), self.cache_timeout)
+
+        return last_modified
+
+    def get_not_modified_response(self, request):
+        """
+        Returns 304 response if the client's copy is still valid, otherwise None
+        """
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=self.last_modified
+        )
+
+        if response is not None:
+            self.patch_response(response)
+
+        return response
+
+    def patch_response(self, response):
+        response.headers["ETag"] = self.etag
+        response.headers["Last-Modified"] = http_date(self.last_modified)
+
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization", ))
+
+        return response
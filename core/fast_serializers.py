@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.utils import timezone
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.pagination import KeysetPagination
+from core.sparse_fields import check_sparse_fields
+from core.tracing import start_span
+
+
+class FastSerializer:
+    """
+    Read-only serializer over values() rows with the output of the DRF serializer it mirrors
+    """
+    fields = ()
+    datetime_fields = ()
+
+    sparse_variants = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.plan = cls.compile_plan()
+        cls.lookups = tuple(dict.fromkeys(cls.get_lookups(cls.plan)))
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def compile_plan(cls, prefix=""):
+        """
+        Returns [(name, key, is_datetime, nested plan), ...]
+        """
+        plan = []
+
+        for name, source in cls.fields:
+            if isinstance(source, str):
+                plan.append((name, prefix + source, name in cls.datetime_fields, None))
+            else:
+                serializer_class, relation = source
+                nested_prefix = f"{prefix}{relation}__"
+                plan.append((
+                    name, f"{nested_prefix}pk", False, serializer_class.compile_plan(nested_prefix)
+                ))
+
+        return plan
+
+    @classmethod
+    def get_lookups(cls, plan):
+        for _, key, _, nested_plan in plan:
+            yield key
+
+            if nested_plan is not None:
+                yield from cls.get_lookups(nested_plan)
+
+    @classmethod
+    def sparse(cls, fields=None, expand=frozenset()):
+        """
+        Returns a variant limited to fields, nested fields are pks unless expanded
+        """
+        expandable = [name for name, source in cls.fields if not isinstance(source, str)]
+        check_sparse_fields([name for name, _ in cls.fields], expandable, fields, expand)
+
+        if fields is None:
+            return cls
+
+        key = (cls, fields, expand & fields)
+
+        if key not in cls.sparse_variants:
+            cls.sparse_variants[key] = type(cls.__name__, (cls, ), {
+                "fields": tuple(
+                    (
+                        name,
+                        source if isinstance(source, str) or name in expand else f"{source[1]}_id"
+                    )
+                    for name, source in cls.fields
+                    if name in fields
+                )
+            })
+
+        return cls.sparse_variants[key]
+
+    @classmethod
+    def get_values(cls, queryset):
+        """
+        Returns the queryset as values() rows with every lookup of the plan
+        """
+        try:
+            ordering_keys = [name for name, _ in KeysetPagination.get_ordering_keys(queryset)]
+        except ValueError:
+            # orderings keyset pagination does not support need no extra keys
+            ordering_keys = []
+
+        return queryset.values(*dict.fromkeys((
+            *cls.lookups,
+            *ordering_keys
+        )))
+
+    @classmethod
+    def represent(cls, plan, row, to_datetime):
+        data = {}
+
+        for name, key, is_datetime, nested_plan in plan:
+            value = row[key]
+
+            if nested_plan is not None:
+                value = None if value is None else cls.represent(nested_plan, row, to_datetime)
+            elif is_datetime and value is not None:
+                value = to_datetime(value)
+
+            data[name] = value
+
+        return data
+
+    @staticmethod
+    def get_datetime_field():
+        if settings.USE_TZ:
+            return serializers.DateTimeField(default_timezone=timezone.get_current_timezone())
+
+        return serializers.DateTimeField()
+
+    @property
+    def data(self):
+        plan = self.plan
+        to_datetime = self.get_datetime_field().to_representation
+
+        # the rows are usually a lazy queryset, its SQL runs inside the span
+        serializer_class = type(self).__name__
+
+        with start_span(f"serialize {serializer_class}", **{"serializer.class": serializer_class}):
+            return [self.represent(plan, row, to_datetime) for row in self.rows]
+
+
+def get_fast_list_response(view, serializer_class, queryset):
+    """
+    Serializes the values() rows of the queryset, one page of them when the view paginates
+    """
+    rows = serializer_class.get_values(queryset)
+    page = view.paginate_queryset(rows)
+
+    if page is not None:
+        return view.get_paginated_response(serializer_class(page).data)
+
+    return Response(serializer_class(rows).data)
+
+
+async def aget_fast_list_response(view, serializer_class, queryset):
+    rows = serializer_class.get_values(queryset)
+    page = await view.apaginate_queryset(rows)
+
+    if page is not None:
+        return view.get_paginated_response(serializer_class(page).data)
+
+    return Response(serializer_class([row async for row in rows]).data)
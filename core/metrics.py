@@ -0,0 +1,313 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from core.middleware import SyncAndAsyncMiddleware
+from core.query_budget import arecord_queries, record_queries
+
+
+# seconds, the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# every unresolved path is one route, 404 scans do not grow the label set
+UNMATCHED_ROUTE = "unmatched"
+KNOWN_METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_empty_stats():
+    return {
+        # per bucket, not cumulative, the last one is +Inf
+        "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "seconds": 0.0,
+        "db_seconds": 0.0,
+        "db_queries": 0,
+        "statuses": {},
+    }
+
+
+def merge_stats(total, stats):
+    """
+    Adds the stats dict to the total stats dict in place
+    """
+    total["buckets"] = [a + b for a, b in zip(total["buckets"], stats["buckets"])]
+    total["seconds"] += stats["seconds"]
+    total["db_seconds"] += stats["db_seconds"]
+    total["db_queries"] += stats["db_queries"]
+
+    for status, count in stats["statuses"].items():
+        total["statuses"][status] = total["statuses"].get(status, 0) + count
+
+
+class RouteStats:
+    """
+    Latency histogram, status counts, DB time and DB queries of one route and method
+    """
+    __slots__ = ("buckets", "seconds", "db_seconds", "db_queries", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.statuses = {}
+
+    def observe(self, status, seconds, db_seconds, db_queries):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.seconds += seconds
+        self.db_seconds += db_seconds
+        self.db_queries += db_queries
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def as_dict(self):
+        return {
+            "buckets": list(self.buckets),
+            "seconds": self.seconds,
+            "db_seconds": self.db_seconds,
+            "db_queries": self.db_queries,
+            "statuses": {str(status): count for status, count in list(self.statuses.items())},
+        }
+
+
+class RequestMetrics:
+    """
+    Request metrics of this process, sharded per thread
+    """
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        # pids are reused, the token keeps a new process from overwriting a dead one's file
+        self.token = uuid.uuid4().hex
+        self.flushed_at = time.monotonic()
+
+    def reset(self):
+        self.local = threading.local()
+        self.shards = []
+        self.token = uuid.uuid4().hex
+        self.flushed_at = time.monotonic()
+
+    def get_shard(self):
+        shard = getattr(self.local, "shard", None)
+
+        if shard is None:
+            shard = self.local.shard = {}
+            # list.append is atomic, the only write other threads can see
+            self.shards.append(shard)
+
+        return shard
+
+    def observe(self, key, status, seconds, recorder):
+        """
+        Adds a response of the (route, method) key, recorder is its QueryRecorder
+        """
+        shard = self.get_shard()
+        route_stats = shard.get(key)
+
+        if route_stats is None:
+            route_stats = shard[key] = RouteStats()
+
+        route_stats.observe(status, seconds, recorder.duration, recorder.count)
+
+        directory = settings.METRICS_MULTIPROCESS_DIR
+
+        if directory and time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush(directory)
+
+    def collect(self):
+        """
+        Returns {(route, method): stats dict} summed over the threads of this process
+        """
+        totals = {}
+
+        for shard in list(self.shards):
+            for key, route_stats in list(shard.items()):
+                merge_stats(totals.setdefault(key, get_empty_stats()), route_stats.as_dict())
+
+        return totals
+
+    def get_path(self, directory):
+        return os.path.join(directory, f"metrics-{os.getpid()}-{self.token}.json")
+
+    def flush(self, directory):
+        self.flushed_at = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = self.get_path(directory)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+
+        entries = [[route, method, stats] for (route, method), stats in self.collect().items()]
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+
+        # readers see the old file or the new one, never a partial write
+        os.replace(temporary_path, path)
+
+    def collect_all(self):
+        """
+        Returns {(route, method): stats dict} of every process
+        """
+        totals = self.collect()
+        directory = settings.METRICS_MULTIPROCESS_DIR
+
+        if not directory:
+            return totals
+
+        own_path = self.get_path(directory)
+
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            if path == own_path:
+                continue
+
+            try:
+                with open(path, encoding="utf-8") as file:
+                    entries = json.load(file)
+            # the process flushed (renamed) or the directory got cleared meanwhile
+            except FileNotFoundError:
+                continue
+
+            for route, method, stats in entries:
+                merge_stats(totals.setdefault((route, method), get_empty_stats()), stats)
+
+        return totals
+
+
+request_metrics = RequestMetrics()
+
+# a forked worker starts from zero instead of repeating the parent's counts
+os.register_at_fork(after_in_child=request_metrics.reset)
+
+
+@atexit.register
+def flush_request_metrics():
+    # a recycled worker keeps the requests served since its last flush
+    if request_metrics.shards and settings.METRICS_MULTIPROCESS_DIR:
+        request_metrics.flush(settings.METRICS_MULTIPROCESS_DIR)
+
+
+def get_route_key(request):
+    """
+    Returns the (route, method) the request is counted under
+    """
+    resolver_match = request.resolver_match
+
+    return (
+        resolver_match.view_name if resolver_match else UNMATCHED_ROUTE,
+        request.method if request.method in KNOWN_METHODS else "OTHER"
+    )
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render_metrics(totals):
+    """
+    Returns {(route, method): stats dict} in the Prometheus text format
+    """
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route (URL name) and method.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    requests_lines = [
+        "# HELP http_requests_total Responses by route, method and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    db_queries_lines = [
+        "# HELP http_request_db_queries_total SQL statements run by requests of the route.",
+        "# TYPE http_request_db_queries_total counter",
+    ]
+    db_seconds_lines = [
+        "# HELP http_request_db_seconds_total Time spent in SQL statements"
+        " by requests of the route.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+
+    for (route, method), stats in sorted(totals.items()):
+        labels = f"route=\"{escape_label(route)}\",method=\"{method}\""
+        cumulative = 0
+
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), stats["buckets"]):
+            cumulative += count
+            lines.append(
+                f"http_request_duration_seconds_bucket{{{labels},le=\"{bound}\"}} {cumulative}"
+            )
+
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats['seconds']}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        for status, count in sorted(stats["statuses"].items()):
+            requests_lines.append(f"http_requests_total{{{labels},status=\"{status}\"}} {count}")
+
+        db_queries_lines.append(f"http_request_db_queries_total{{{labels}}} {stats['db_queries']}")
+        db_seconds_lines.append(f"http_request_db_seconds_total{{{labels}}} {stats['db_seconds']}")
+
+    return "\n".join(lines + requests_lines + db_queries_lines + db_seconds_lines) + "\n"
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """
+    Records latency, status and DB usage of every request per route and method
+    """
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+
+    def handle_request(self, request):
+        started_at = time.perf_counter()
+
+        with record_queries(request) as recorder:
+            response = self.get_response(request)
+
+        request_metrics.observe(
+            get_route_key(request),
+            response.status_code,
+            time.perf_counter() - started_at,
+            recorder
+        )
+
+        return response
+
+    async def ahandle_request(self, request):
+        started_at = time.perf_counter()
+
+        async with arecord_queries(request) as recorder:
+            response = await self.get_response(request)
+
+        request_metrics.observe(
+            get_route_key(request),
+            response.status_code,
+            time.perf_counter() - started_at,
+            recorder
+        )
+
+        return response
+
+
+class MetricsView(APIView):
+    """
+    Request metrics in the Prometheus text format
+    """
+    permission_classes = [IsAdminUser]
+
+    query_budget = 1
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            render_metrics(request_metrics.collect_all()),
+            content_type=CONTENT_TYPE
+        )
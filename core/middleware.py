@@ -0,0 +1,28 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Middleware serving both request paths, handle_request serves WSGI and sync
+    requests, ahandle_request ASGI requests to an async handler
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.ahandle_request(request)
+
+        return self.handle_request(request)
+
+    def handle_request(self, request):
+        return self.get_response(request)
+
+    async def ahandle_request(self, request):
+        return await self.get_response(request)
@@ -1,12 +1,342 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+import operator
+from functools import reduce
 
-class NormalDataPagination(PageNumberPagination):
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor-based pagination that follows the queryset's own ordering
+    """
+    page_size = 10
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    # state of the page being paginated
+    request = None
+    ordering_keys = None
+    has_next = False
+    page = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = []
+
+        for page_queryset in self.get_page_querysets(queryset, request):
+            rows += page_queryset[:self.page_size + 1 - len(rows)]
+
+            if len(rows) > self.page_size:
+                break
+
+        return self.set_page(rows)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        rows = []
+
+        for page_queryset in self.get_page_querysets(queryset, request):
+            rows += [row async for row in page_queryset[:self.page_size + 1 - len(rows)]]
+
+            if len(rows) > self.page_size:
+                break
+
+        return self.set_page(rows)
+
+    def get_page_querysets(self, queryset, request):
+        """
+        Returns the querysets of the rows after the cursor in page order
+        """
+        self.request = request
+        self.ordering_keys = self.get_ordering_keys(queryset)
+
+        queryset = queryset.order_by(*[
+            F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True)
+            for name, descending in self.ordering_keys
+        ])
+
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            return [queryset]
+
+        conditions = self.get_seek_conditions(queryset, self.get_cursor_values(queryset, cursor))
+
+        return [queryset.filter(condition) for condition in conditions]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last_row = self.page[-1]
+        cursor = self.encode_cursor([
+            self.get_row_value(last_row, name)
+            for name, _ in self.ordering_keys
+        ])
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    @staticmethod
+    def get_ordering_keys(queryset):
+        """
+        Returns [(name, descending), ...] ending with the pk tiebreaker
+        """
+        ordering_keys = []
+
+        for item in queryset.query.order_by or queryset.model._meta.ordering:
+            if isinstance(item, str):
+                name, descending = item.lstrip("-"), item.startswith("-")
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                name, descending = item.expression.name, item.descending
+            else:
+                raise ValueError(f"Keyset pagination does not support ordering by {item}")
+
+            if name in ("pk", queryset.model._meta.pk.name):
+                break
+
+            ordering_keys.append((name, descending))
+
+        ordering_keys.append(("pk", False))
+
+        return ordering_keys
+
+    @staticmethod
+    def get_row_value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+
+        for attribute in name.split("__"):
+            row = getattr(row, attribute)
+
+            if row is None:
+                break
+
+        return row
+
+    @staticmethod
+    def is_nullable(queryset, name):
+        if name == "pk":
+            return False
+
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            # annotations and lookups across relations
+            return True
+
+    def get_seek_conditions(self, queryset, values):
+        """
+        Returns the conditions of the rows after the cursor, split by the first key
+        """
+        (name, descending), value = self.ordering_keys[0], values[0]
+        after_first = self.get_seek_condition(queryset, self.ordering_keys[1:], values[1:])
+
+        if value is None:
+            # the cursor is among the nulls, in desc order the other rows follow
+            conditions = [Q(**{f"{name}__isnull": True}) & after_first]
+
+            if descending:
+                conditions.append(Q(**{f"{name}__isnull": False}))
+
+            return conditions
+
+        # the first comparison repeats the range, so the index seeks to it
+        conditions = [
+            Q(**{f"{name}__{"lte" if descending else "gte"}": value})
+            & (
+                Q(**{f"{name}__{"lt" if descending else "gt"}": value})
+                | (Q(**{name: value}) & after_first)
+            )
+        ]
+
+        if self.is_nullable(queryset, name) and not descending:
+            conditions.append(Q(**{f"{name}__isnull": True}))
+
+        return conditions
+
+    def get_seek_condition(self, queryset, ordering_keys, values):
+        """
+        Builds (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        """
+        conditions = []
+        equal_so_far = Q()
+
+        for (name, descending), value in zip(ordering_keys, values):
+            nullable = self.is_nullable(queryset, name)
+
+            if value is None:
+                # nulls go last in asc order and first in desc order
+                after = Q(**{f"{name}__isnull": False}) if descending else None
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__{"lt" if descending else "gt"}": value})
+
+                if nullable and not descending:
+                    after |= Q(**{f"{name}__isnull": True})
+
+                same = Q(**{name: value})
+
+            if after is not None:
+                conditions.append(equal_so_far & after)
+
+            equal_so_far &= same
+
+        if not conditions:
+            return Q(pk__in=[])
+
+        return reduce(operator.or_, conditions)
+
+    def get_cursor_values(self, queryset, cursor):
+        """
+        Returns the cursor's values, raises NotFound for a tampered cursor
+        """
+        if len(cursor) != len(self.ordering_keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = []
+
+        for (name, _), value in zip(self.ordering_keys, cursor):
+            if value is None:
+                values.append(None)
+                continue
+
+            if isinstance(value, (dict, list)):
+                raise NotFound(self.invalid_cursor_message)
+
+            try:
+                values.append(self.get_output_field(queryset, name).to_python(value))
+            except (TypeError, ValueError, ValidationError) as error:
+                raise NotFound(self.invalid_cursor_message) from error
+
+        return values
+
+    @staticmethod
+    def get_output_field(queryset, name):
+        if name == "pk":
+            return queryset.model._meta.pk
+
+        # fields, lookups across relations and annotations, resolved on a copy of the query
+        return queryset.query.chain().resolve_ref(name, allow_joins=True).output_field
+
+    @staticmethod
+    def encode_cursor(values):
+        # isoformat keeps microseconds, DjangoJSONEncoder would cut them to milliseconds
+        payload = json.dumps(values, default=lambda value: value.isoformat(), separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if not encoded:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+
+        if not isinstance(cursor, list):
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor
+
+
+class KeysetOptInMixin:
+    """
+    Lets clients opt in to KeysetPagination with ?pagination=cursor
+    """
+    pagination_mode_query_param = "pagination"
+    keyset_pagination_mode = "cursor"
+
+    keyset_paginator = None
+
+    def is_keyset_requested(self, request):
+        pagination_mode = request.query_params.get(self.pagination_mode_query_param)
+
+        return pagination_mode == self.keyset_pagination_mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_keyset_requested(request):
+            self.keyset_paginator = KeysetPagination()
+            self.keyset_paginator.page_size = self.page_size
+            return self.keyset_paginator.paginate_queryset(queryset, request, view)
+
+        self.keyset_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async paginate_queryset, leaves a regular Page in self.page
+        """
+        if self.is_keyset_requested(request):
+            self.keyset_paginator = KeysetPagination()
+            self.keyset_paginator.page_size = self.page_size
+            return await self.keyset_paginator.apaginate_queryset(queryset, request, view)
+
+        self.keyset_paginator = None
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count is a cached_property
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            ) from exc
+
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+
+class NormalDataPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 10
     max_page_size = 50
     page_query_param = "page_size"
 
 
-class LargeDataPagination(PageNumberPagination):
+class LargeDataPagination(KeysetOptInMixin, PageNumberPagination):
     page_size = 100
     max_page_size = 200
     page_query_param = "page_size"
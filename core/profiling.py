@@ -0,0 +1,360 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import suppress
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core.metrics import get_route_key
+from core.middleware import SyncAndAsyncMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+# profiles running at once per process, each one is a sampling thread
+MAX_ACTIVE_PROFILES = 4
+# frames kept per stack from the outermost, deeper frames are cut
+MAX_STACK_DEPTH = 200
+
+# samples beyond PROFILING_MAX_STACKS distinct stacks, so the total stays right
+OTHER_STACKS = "[other stacks]"
+TRUNCATED_FRAMES = "[truncated]"
+
+# <UTC time>-<method>-<status>-<duration>ms-<token>.collapsed, sorted by name is sorted by time
+PROFILE_NAME_RE = re.compile(
+    r"^(\d{8}T\d{6}Z)-([A-Z]+)-(\d{3})-(\d+)ms-[0-9a-f]{8}\.collapsed$"
+)
+# route directories are URL names with the namespace colons as dots
+ROUTE_DIRECTORY_RE = re.compile(r"^\w[\w.-]*$")
+
+CONTENT_TYPE = "text/plain; charset=utf-8"
+
+
+@lru_cache(maxsize=4096)
+def get_frame_label(code):
+    """
+    Returns "<path>:<qualified name>" of the frame
+    """
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+
+    if "site-packages" in filename:
+        filename = filename.rsplit("site-packages", 1)[1].lstrip(os.sep)
+    elif filename.startswith(base_dir):
+        filename = os.path.relpath(filename, base_dir)
+    elif filename.startswith(sys.prefix) or filename.startswith(sys.base_prefix):
+        filename = os.path.basename(filename)
+
+    # ; separates frames and a space the count in the collapsed format
+    return f"{filename}:{code.co_qualname}".replace(";", ",").replace(" ", "_")
+
+
+def get_collapsed_stack(frame, root_frame):
+    """
+    Returns the frames from below root_frame down to frame joined by ;
+    """
+    labels = []
+
+    while frame is not None and frame is not root_frame:
+        labels.append(get_frame_label(frame.f_code))
+        frame = frame.f_back
+
+    labels.reverse()
+
+    if len(labels) > MAX_STACK_DEPTH:
+        labels = labels[:MAX_STACK_DEPTH] + [TRUNCATED_FRAMES]
+
+    return ";".join(labels)
+
+
+class StackSampler:
+    """
+    Context manager sampling the stack of the calling thread into counts
+    """
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        # the caller's frame, stacks start below it
+        self.root_frame = sys._getframe(1)
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+        self.root_frame = None
+
+    def run(self):
+        interval = settings.PROFILING_INTERVAL
+        max_stacks = settings.PROFILING_MAX_STACKS
+        stop_at = time.monotonic() + settings.PROFILING_MAX_SECONDS
+
+        while not self.stopped.wait(interval) and time.monotonic() < stop_at:
+            # the only way to read another thread's stack, documented in the sys module
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+
+            if frame is None:
+                return
+
+            stack = get_collapsed_stack(frame, self.root_frame)
+            del frame
+
+            # the thread is in the caller itself, before or after the request
+            if not stack:
+                continue
+
+            if stack not in self.counts and len(self.counts) >= max_stacks:
+                stack = OTHER_STACKS
+
+            self.counts[stack] += 1
+
+
+def get_route_directory(route):
+    return route.replace(":", ".")
+
+
+def get_profile(path):
+    """
+    Returns the listing entry of a stored profile or None for other files
+    """
+    route_directory, name = path.split(os.sep)[-2:]
+    match = PROFILE_NAME_RE.match(name)
+
+    if match is None:
+        return None
+
+    created_at, method, status, duration = match.groups()
+
+    return {
+        "id": f"{route_directory}/{name}",
+        "route": route_directory.replace(".", ":"),
+        "method": method,
+        "status": int(status),
+        "duration_ms": int(duration),
+        "created_at": time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.strptime(created_at, "%Y%m%dT%H%M%SZ")
+        ),
+        "size": os.path.getsize(path),
+    }
+
+
+def prune_profiles(directory):
+    """
+    Removes old profiles of a route, returns the names of the rest newest first
+    """
+    expire_before = time.time() - settings.PROFILING_RETENTION
+    names = sorted(
+        (name for name in os.listdir(directory) if PROFILE_NAME_RE.match(name)), reverse=True
+    )
+    kept = []
+
+    for index, name in enumerate(names):
+        path = os.path.join(directory, name)
+
+        try:
+            if index >= settings.PROFILING_MAX_PER_ROUTE or os.path.getmtime(path) < expire_before:
+                os.remove(path)
+            else:
+                kept.append(name)
+        # another worker pruned it meanwhile
+        except FileNotFoundError:
+            continue
+
+    return kept
+
+
+def store_profile(route, method, status, seconds, counts):
+    """
+    Writes the collapsed stacks of a route's profile, returns the profile id or
+    None when it could not be written
+    """
+    route_directory = get_route_directory(route)
+    directory = os.path.join(settings.PROFILING_DIR, route_directory)
+    name = (
+        f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{method}-{status}-"
+        f"{round(seconds * 1000)}ms-{uuid.uuid4().hex[:8]}.collapsed"
+    )
+    path = os.path.join(directory, name)
+    temporary_path = f"{path}.tmp"
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+        # the listing never sees a partial profile
+        os.replace(temporary_path, path)
+    except OSError:
+        # a full disk loses the profile, not the response
+        logger.warning("Profile of %s %s not stored", method, route, exc_info=True)
+
+        with suppress(FileNotFoundError):
+            os.remove(temporary_path)
+
+        return None
+
+    prune_profiles(directory)
+
+    return f"{route_directory}/{name}"
+
+
+def list_profiles(route=None):
+    """
+    Returns the stored profiles newest first, of one route or of all
+    """
+    base_directory = settings.PROFILING_DIR
+
+    if route is not None:
+        route_directories = [get_route_directory(route)]
+    elif os.path.isdir(base_directory):
+        route_directories = os.listdir(base_directory)
+    else:
+        route_directories = []
+
+    profiles = []
+
+    for route_directory in route_directories:
+        directory = os.path.join(base_directory, route_directory)
+
+        if not ROUTE_DIRECTORY_RE.match(route_directory) or not os.path.isdir(directory):
+            continue
+
+        for name in prune_profiles(directory):
+            try:
+                profile = get_profile(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+
+            if profile is not None:
+                profiles.append(profile)
+
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+def is_staff_request(request):
+    """
+    Authenticates the request ahead of the view
+    """
+    authenticators = [
+        authentication_class()
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]
+
+    try:
+        return Request(request, authenticators=authenticators).user.is_staff
+    except APIException:
+        return False
+
+
+class ProfilingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Profiles requests of staff asking for it and a sample of the others.
+    Async requests are not profiled, the sampler follows one thread and an
+    async request moves between the event loop and the ORM's thread
+    """
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+        self.active_profiles = threading.BoundedSemaphore(MAX_ACTIVE_PROFILES)
+
+    def handle_request(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        # a busy profiler skips the request rather than wait, released below
+        if not self.active_profiles.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return self.get_response(request)
+
+        started_at = time.perf_counter()
+
+        try:
+            with StackSampler() as sampler:
+                response = self.get_response(request)
+        finally:
+            self.active_profiles.release()
+
+        seconds = time.perf_counter() - started_at
+
+        if not sampler.counts:
+            return response
+
+        profile_id = store_profile(
+            *get_route_key(request),
+            response.status_code,
+            seconds,
+            sampler.counts
+        )
+
+        if profile_id is not None:
+            response["X-Profile-Id"] = profile_id
+
+        return response
+
+    @staticmethod
+    def should_profile(request):
+        if request.META.get("HTTP_X_PROFILE") == "1" or request.GET.get("profile") == "1":
+            return is_staff_request(request)
+
+        sample_rate = settings.PROFILING_SAMPLE_RATE
+
+        return bool(sample_rate) and random.random() < sample_rate
+
+
+class ProfileListView(APIView):
+    """
+    Stored profiles newest first, ?route=<URL name> for one route
+    """
+    permission_classes = [IsAdminUser]
+
+    query_budget = 1
+
+    def get(self, request, *args, **kwargs):
+        route = request.query_params.get("route")
+
+        if route is not None and not ROUTE_DIRECTORY_RE.match(get_route_directory(route)):
+            return Response([])
+
+        return Response(list_profiles(route))
+
+
+class ProfileDetailView(APIView):
+    """
+    Collapsed stacks of one profile as text
+    """
+    permission_classes = [IsAdminUser]
+
+    query_budget = 1
+
+    def get(self, request, route, name, *args, **kwargs):
+        if not ROUTE_DIRECTORY_RE.match(route) or not PROFILE_NAME_RE.match(name):
+            raise NotFound()
+
+        try:
+            with open(os.path.join(settings.PROFILING_DIR, route, name), encoding="utf-8") as file:
+                return HttpResponse(file.read(), content_type=CONTENT_TYPE)
+        except FileNotFoundError as error:
+            raise NotFound() from error
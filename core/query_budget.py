@@ -0,0 +1,194 @@
+import logging
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import connections
+
+from core.middleware import SyncAndAsyncMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+# IN lists and multi-row VALUES of different lengths are one query shape
+IN_LIST_RE = re.compile(r"IN \(%s(?:, %s)+\)")
+VALUES_LIST_RE = re.compile(r"VALUES (\([^()]*\))(?:, \1)+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_query_shape(sql):
+    # runs for every statement, most have neither list
+    if "IN (" in sql:
+        sql = IN_LIST_RE.sub("IN (...)", sql)
+
+    if "VALUES (" in sql:
+        sql = VALUES_LIST_RE.sub(r"VALUES \1, ...", sql)
+
+    return sql
+
+
+def get_query_budget(view_func, method):
+    """
+    Returns the query_budget the view class declares for the method or None
+    """
+    budget = getattr(getattr(view_func, "view_class", None), "query_budget", None)
+
+    if isinstance(budget, dict):
+        return budget.get(method)
+
+    return budget
+
+
+def get_caller_stack(limit=8):
+    """
+    Returns the innermost frames of project code, installed packages and this module left out
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        (frame, line_number) for frame, line_number in traceback.walk_stack(None)
+        if frame.f_code.co_filename.startswith(base_dir)
+        and "site-packages" not in frame.f_code.co_filename
+        and frame.f_code.co_filename != __file__
+    ]
+
+    # source lines are read for the kept frames only, outermost first
+    return traceback.StackSummary.extract(reversed(frames[:limit])).format()
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper recording every statement of a request
+    """
+    def __init__(self, repeat_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.queries = []
+        self.shape_counts = Counter()
+        self.repeated_stacks = {}
+
+    def __call__(self, execute, sql, *args):
+        started_at = time.perf_counter()
+
+        try:
+            return execute(sql, *args)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started_at))
+            shape = get_query_shape(sql)
+            self.shape_counts[shape] += 1
+
+            if shape == sql and self.shape_counts[shape] == self.repeat_threshold:
+                self.repeated_stacks[shape] = get_caller_stack()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+
+@contextmanager
+def record_queries(request):
+    """
+    Records the statements of the request into request.query_recorder
+    """
+    recorder = getattr(request, "query_recorder", None)
+
+    if recorder is not None:
+        yield recorder
+        return
+
+    recorder = request.query_recorder = QueryRecorder(settings.QUERY_REPEAT_THRESHOLD)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+        yield recorder
+
+
+@asynccontextmanager
+async def arecord_queries(request):
+    """
+    record_queries of an async request, the ORM of async views runs in the
+    thread sensitive thread and so does the recording
+    """
+    recorder = getattr(request, "query_recorder", None)
+
+    if recorder is not None:
+        yield recorder
+        return
+
+    stack = ExitStack()
+    recorder = await sync_to_async(stack.enter_context)(record_queries(request))
+
+    try:
+        yield recorder
+    finally:
+        await sync_to_async(stack.close)()
+
+
+class QueryBudgetMiddleware(SyncAndAsyncMiddleware):
+    """
+    Logs N+1 query shapes and checks the query_budget of the view class
+    """
+    def handle_request(self, request):
+        if settings.QUERY_BUDGET_MODE == "off":
+            return self.get_response(request)
+
+        with record_queries(request) as recorder:
+            response = self.get_response(request)
+
+        self.check(request, response, recorder)
+
+        return response
+
+    async def ahandle_request(self, request):
+        if settings.QUERY_BUDGET_MODE == "off":
+            return await self.get_response(request)
+
+        async with arecord_queries(request) as recorder:
+            response = await self.get_response(request)
+
+        self.check(request, response, recorder)
+
+        return response
+
+    def check(self, request, response, recorder):
+        for shape, stack in recorder.repeated_stacks.items():
+            logger.warning(
+                "%s %s: %d x %s\n%s",
+                request.method,
+                request.path,
+                recorder.shape_counts[shape],
+                shape,
+                "".join(stack)
+            )
+
+        resolver_match = request.resolver_match
+        budget = get_query_budget(resolver_match.func, request.method) if resolver_match else None
+
+        if budget is None or recorder.count <= budget:
+            return
+
+        message = (
+            f"{request.method} {request.path} made {recorder.count} queries, its budget is {budget}"
+        )
+
+        # a failed request's queries include the error handling (e.g. the debug 500 page),
+        # raising would replace the error
+        if settings.QUERY_BUDGET_MODE == "raise" and response.status_code < 500:
+            shapes = "\n".join(
+                f"{count} x {shape}" for shape, count in recorder.shape_counts.most_common()
+            )
+            raise QueryBudgetExceeded(f"{message}\n{shapes}")
+
+        logger.warning(message)
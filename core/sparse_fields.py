@@ -0,0 +1,87 @@
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_QUERY_PARAM = "fields"
+EXPAND_QUERY_PARAM = "expand"
+
+
+def split_query_param(request, name):
+    value = request.query_params.get(name, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def get_sparse_fields(request):
+    """
+    Returns (fields, expand) parsed from ?fields=a,b and ?expand=c
+    """
+    fields = split_query_param(request, FIELDS_QUERY_PARAM)
+    expand = split_query_param(request, EXPAND_QUERY_PARAM)
+
+    return (frozenset(fields) if fields else None), frozenset(expand)
+
+
+def check_sparse_fields(available, expandable, fields, expand):
+    """
+    Raises ValidationError for unknown field names
+    """
+    errors = {}
+
+    unknown_fields = sorted(set(fields or ()) - set(available))
+    unknown_expand = sorted(set(expand) - set(expandable))
+
+    if unknown_fields:
+        errors[FIELDS_QUERY_PARAM] = [f"Unknown field: {name}" for name in unknown_fields]
+
+    if unknown_expand:
+        errors[EXPAND_QUERY_PARAM] = [
+            f"Field can not be expanded: {name}" for name in unknown_expand
+        ]
+
+    if errors:
+        raise ValidationError(errors)
+
+
+def get_only_fields(model, fields, required=()):
+    """
+    Returns names of model columns among fields and required to pass to only()
+    """
+    names = []
+
+    for name in (*fields, *required):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # pk, annotations and properties
+            continue
+
+        if field.concrete:
+            names.append(field.name)
+
+    return names
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer mixin taking fields and expand as kwargs
+    """
+    collapsible_fields = {}
+
+    def __init__(self, *args, fields=None, expand=frozenset(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        check_sparse_fields(self.fields.keys(), self.collapsible_fields, fields, expand)
+
+        if fields is None:
+            return
+
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+            elif name in self.collapsible_fields and name not in expand:
+                self.fields[name] = serializers.IntegerField(
+                    source=self.collapsible_fields[name],
+                    read_only=True
+                )
@@ -0,0 +1,389 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import cache, wraps
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from rest_framework.generics import GenericAPIView
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.views import APIView
+
+from core.middleware import SyncAndAsyncMiddleware
+from core.query_budget import get_query_shape
+
+
+current_span = ContextVar("current_span", default=None)
+
+# W3C trace context: version-trace id-parent span id-flags
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+# OTLP status codes
+STATUS_ERROR = 2
+
+NOOP_SPAN = nullcontext()
+
+# the caller's span a request's trace continues, span_id is None for a new trace
+RemoteParent = namedtuple("RemoteParent", ["trace_id", "span_id", "spans"])
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """
+    One timed phase of a sampled request, the parent is a Span or a RemoteParent
+    """
+    __slots__ = (
+        "trace_id", "span_id", "parent_span_id", "name", "kind", "attributes",
+        "spans", "start_ns", "end_ns", "error", "token"
+    )
+
+    def __init__(self, name, parent, kind=INTERNAL, attributes=None):
+        self.trace_id = parent.trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent.span_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        # finished spans of the whole trace, shared by every span of it
+        self.spans = parent.spans
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self.token = None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self.token = current_span.set(self)
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        current_span.reset(self.token)
+
+        if exc_type is not None:
+            self.error = exc_type.__name__
+
+        self.spans.append(self)
+
+    def as_otlp(self):
+        otlp_span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": get_otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+        }
+
+        if self.error is not None:
+            otlp_span["status"] = {"code": STATUS_ERROR, "message": self.error}
+
+        return otlp_span
+
+
+def get_otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+
+    if isinstance(value, int):
+        # int64 is a string in OTLP JSON
+        return {"intValue": str(value)}
+
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": str(value)}
+
+
+def start_span(name, kind=INTERNAL, **attributes):
+    """
+    Returns a child span of the current one, a no-op outside sampled requests
+    """
+    parent = current_span.get()
+
+    if parent is None:
+        return NOOP_SPAN
+
+    return Span(name, parent, kind, attributes)
+
+
+def traced(function, describe):
+    """
+    Wraps the function in a span named and attributed by describe(*args)
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return function(*args, **kwargs)
+
+        name, attributes = describe(*args, **kwargs)
+
+        with start_span(name, **attributes):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+@cache
+def get_class_path(cls):
+    """
+    Returns the class's attribute path in its module, e.g. GroupPermissions.IsGroupAdminOrStaff
+    """
+    # permission factories return classes sharing one generated name
+    for name, value in vars(sys.modules[cls.__module__]).items():
+        if value is cls:
+            return name
+
+        if isinstance(value, type):
+            for attribute, nested_value in vars(value).items():
+                if nested_value is cls:
+                    return f"{name}.{attribute}"
+
+    return cls.__qualname__
+
+
+def start_permission_span(prefix, permission):
+    permission_class = get_class_path(type(permission))
+
+    return start_span(f"{prefix} {permission_class}", **{"permission.class": permission_class})
+
+
+def deny_permission(view, request, permission):
+    view.permission_denied(
+        request,
+        message=getattr(permission, "message", None),
+        code=getattr(permission, "code", None)
+    )
+
+
+def check_each_permission(view, request, span_prefix, has_permission):
+    """
+    APIView.check_permissions with a span per permission class, has_permission(permission)
+    is the check
+    """
+    for permission in view.get_permissions():
+        with start_permission_span(span_prefix, permission):
+            allowed = has_permission(permission)
+
+        if not allowed:
+            deny_permission(view, request, permission)
+
+
+def check_permissions(self, request):
+    check_each_permission(
+        self, request, "permission", lambda permission: permission.has_permission(request, self)
+    )
+
+
+def check_object_permissions(self, request, obj):
+    check_each_permission(
+        self,
+        request,
+        "object permission",
+        lambda permission: permission.has_object_permission(request, self, obj)
+    )
+
+
+def trace_when_sampled(original, traced_function):
+    @wraps(original)
+    def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return original(*args, **kwargs)
+
+        return traced_function(*args, **kwargs)
+
+    return wrapper
+
+
+@cache
+def instrument_rest_framework():
+    """
+    Wraps DRF's request phases in spans once per process
+    """
+    APIView.dispatch = traced(APIView.dispatch, lambda view, request, *args, **kwargs: (
+        f"view {type(view).__name__}.{request.method.lower()}",
+        {"view.class": type(view).__name__}
+    ))
+    APIView.perform_authentication = traced(APIView.perform_authentication, lambda view, request: (
+        "authenticate",
+        {"authentication.classes": ",".join(
+            type(authenticator).__name__ for authenticator in request.authenticators
+        )}
+    ))
+    APIView.check_permissions = trace_when_sampled(
+        APIView.check_permissions, check_permissions
+    )
+    APIView.check_object_permissions = trace_when_sampled(
+        APIView.check_object_permissions, check_object_permissions
+    )
+    GenericAPIView.get_object = traced(GenericAPIView.get_object, lambda view: (
+        "get_object",
+        {"view.class": type(view).__name__}
+    ))
+    Serializer.data = property(traced(Serializer.data.fget, lambda serializer: (
+        f"serialize {type(serializer).__name__}",
+        {"serializer.class": type(serializer).__name__}
+    )))
+    ListSerializer.data = property(traced(ListSerializer.data.fget, lambda serializer: (
+        f"serialize {type(serializer.child).__name__} list",
+        {"serializer.class": type(serializer.child).__name__}
+    )))
+    Response.rendered_content = property(traced(Response.rendered_content.fget, lambda response: (
+        "render",
+        {"renderer.class": type(getattr(response, "accepted_renderer", None)).__name__}
+    )))
+
+
+def trace_query(execute, sql, params, many, context):
+    # installed only for sampled requests
+    attributes = {"db.statement": get_query_shape(sql), "db.operation": sql.split(" ", 1)[0]}
+
+    with start_span("db", CLIENT, **attributes):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def trace_queries():
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(trace_query))
+
+        yield
+
+
+export_lock = threading.Lock()
+
+
+def export_trace(spans):
+    """
+    Appends the spans to TRACING_EXPORT_PATH as one OTLP JSON line
+    """
+    line = json.dumps({
+        "resourceSpans": [{
+            "resource": {"attributes": [{
+                "key": "service.name",
+                "value": {"stringValue": settings.TRACING_SERVICE_NAME}
+            }]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [span.as_otlp() for span in spans],
+            }],
+        }]
+    }, separators=(",", ":"))
+
+    with export_lock, open(settings.TRACING_EXPORT_PATH, "a", encoding="utf-8") as file:
+        file.write(line + "\n")
+
+
+class TracingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Traces sampled requests, their trace id is sent in X-Trace-Id
+    """
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        instrument_rest_framework()
+        super().__init__(get_response)
+
+    def handle_request(self, request):
+        root = self.start_trace(request)
+
+        if root is None:
+            return self.get_response(request)
+
+        with root, trace_queries():
+            response = self.get_response(request)
+
+        return self.finish_trace(request, response, root)
+
+    async def ahandle_request(self, request):
+        root = self.start_trace(request)
+
+        if root is None:
+            return await self.get_response(request)
+
+        # the ORM of async views runs in the thread sensitive thread, the
+        # query wrappers are installed on its connections
+        stack = ExitStack()
+
+        with root:
+            await sync_to_async(stack.enter_context)(trace_queries())
+
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+
+        return self.finish_trace(request, response, root)
+
+    def start_trace(self, request):
+        """
+        Returns the root span of a sampled request or None
+        """
+        trace_id, parent_span_id, sampled = self.get_trace_context(request)
+
+        if not sampled:
+            return None
+
+        return Span(
+            request.method,
+            RemoteParent(trace_id, parent_span_id, []),
+            SERVER,
+            {"http.method": request.method, "http.target": request.path}
+        )
+
+    @staticmethod
+    def finish_trace(request, response, root):
+        resolver_match = request.resolver_match
+
+        if resolver_match is not None:
+            root.name = f"{request.method} {resolver_match.view_name}"
+            root.attributes["http.route"] = resolver_match.view_name
+
+        root.attributes["http.status_code"] = response.status_code
+
+        if response.status_code >= 500:
+            root.error = f"HTTP {response.status_code}"
+
+        export_trace(root.spans)
+        response["X-Trace-Id"] = root.trace_id
+
+        return response
+
+    @staticmethod
+    def get_trace_context(request):
+        """
+        Returns (trace id, remote parent span id or None, sampled)
+        """
+        match = TRACEPARENT_RE.match(request.META.get("HTTP_TRACEPARENT", ""))
+
+        if match is not None:
+            trace_id, parent_span_id, flags = match.groups()
+
+            return trace_id, parent_span_id, bool(int(flags, 16) & 1)
+
+        sample_rate = settings.TRACING_SAMPLE_RATE
+
+        if not sample_rate or random.random() >= sample_rate:
+            return None, None, False
+
+        return f"{random.getrandbits(128):032x}", None, True
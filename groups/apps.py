@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class GroupsConfig(AppConfig):
     name = 'groups'
+
+    def ready(self):
+        # registers the receivers
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
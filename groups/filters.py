@@ -15,7 +15,7 @@ class GroupFilter(FilterSet):
 
 class MemberFilter(FilterSet):
     nickname = django_filters.CharFilter(
-        field_name="nickname",
+        field_name="user__nickname",
         lookup_expr="icontains"
     )
 
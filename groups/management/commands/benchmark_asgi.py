@@ -0,0 +1,172 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from groups.management.commands.benchmark_endpoints import get_benchmark_group
+from groups.models import Member
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares sync (WSGI) and async (ASGI) read views in-process. "
+        "Every request goes through the full handler and middleware stack, "
+        "sync requests run in a thread pool, async ones as concurrent tasks on one event loop. "
+        "Test clients keep DB connections open, so both modes close them after every request "
+        "as servers do (respecting CONN_MAX_AGE)"
+    )
+
+    # state of the run, set by handle
+    headers = None
+    total = 0
+    concurrency_levels = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group", type=int, help="group pk, defaults to the group with most members"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="requests per endpoint, mode and concurrency"
+        )
+        parser.add_argument(
+            "--concurrency", default="1,8,32", help="comma separated concurrency levels"
+        )
+        parser.add_argument(
+            "--query", default="", help="query string added to every url, e.g. fields=pk,due_date"
+        )
+
+    def handle(self, *args, **options):
+        group = get_benchmark_group(options["group"])
+        owner = Member.objects.select_related("user").get(
+            group=group, role=Member.RoleChoices.OWNER
+        ).user
+
+        self.headers = {"Authorization": f"Bearer {RefreshToken.for_user(owner).access_token}"}
+        self.total = options["requests"]
+        query = f"?{options['query']}" if options["query"] else ""
+
+        endpoints = [
+            ("user tasks", "tasks:my-task-list", "tasks:async-my-task-list", {}),
+            ("group detail", "groups:group-detail", "groups:async-group-detail", {"pk": group.pk}),
+            ("group tasks", "groups:task-list", "groups:async-task-list", {"pk": group.pk}),
+            ("members", "groups:member-list", "groups:async-member-list", {"pk": group.pk}),
+        ]
+        self.concurrency_levels = [int(level) for level in options["concurrency"].split(",")]
+
+        self.stdout.write(
+            f"group {group.pk}, {group.members_count} members, "
+            f"{options['requests']} requests per run\n"
+        )
+        self.stdout.write(
+            f"{'endpoint':<14}{'mode':<7}{'conc':>6}{'req/s':>10}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+        )
+
+        # test clients send Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name, sync_url_name, async_url_name, kwargs in endpoints:
+                self.run_endpoint(
+                    name,
+                    reverse(sync_url_name, kwargs=kwargs) + query,
+                    reverse(async_url_name, kwargs=kwargs) + query
+                )
+
+    def run_endpoint(self, name, sync_url, async_url):
+        for concurrency in self.concurrency_levels:
+            for mode, run, url in (
+                ("wsgi", self.run_wsgi, sync_url),
+                ("asgi", self.run_asgi, async_url),
+            ):
+                self.write_row(name, mode, concurrency, run(url, concurrency))
+
+    def run_wsgi(self, url, concurrency):
+        """
+        Threads with their own test client, like a threaded WSGI server
+        """
+        latencies = []
+        errors = []
+        counter = iter(range(self.total))
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+
+            while True:
+                with lock:
+                    if next(counter, None) is None:
+                        return
+
+                started_at = time.perf_counter()
+                response = client.get(url, headers=self.headers)
+                close_old_connections()
+                latency = time.perf_counter() - started_at
+
+                with lock:
+                    latencies.append(latency)
+
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started_at = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return time.perf_counter() - started_at, latencies, errors
+
+    def run_asgi(self, url, concurrency):
+        """
+        Runs the requests concurrently on one event loop
+        """
+        latencies = []
+        errors = []
+        counter = iter(range(self.total))
+
+        async def worker():
+            client = AsyncClient()
+
+            while next(counter, None) is not None:
+                started_at = time.perf_counter()
+
+                async with ThreadSensitiveContext():
+                    response = await client.get(url, headers=self.headers)
+                    await sync_to_async(close_old_connections)()
+
+                latencies.append(time.perf_counter() - started_at)
+
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        async def run():
+            started_at = time.perf_counter()
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+            return time.perf_counter() - started_at
+
+        return asyncio.run(run()), latencies, errors
+
+    def write_row(self, name, mode, concurrency, result):
+        elapsed, latencies, errors = result
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        p95 = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+
+        self.stdout.write(
+            f"{name:<14}{mode:<7}{concurrency:>6}"
+            f"{len(latencies) / elapsed:>10.1f}"
+            f"{statistics.median(latencies_ms):>10.2f}"
+            f"{p95:>10.2f}"
+            f"{len(errors):>8}"
+        )
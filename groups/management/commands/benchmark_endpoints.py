@@ -0,0 +1,544 @@
+import json
+import math
+import statistics
+import time
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, resolve, reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.query_budget import get_query_budget
+from groups.models import Group, GroupTask, Member, MemberTaskRelation
+from groups.services.group_task_access import sync_group_task_access
+from groups.services.membership_management import apply_member_changes
+from tasks.models import UserTask
+
+
+User = get_user_model()
+
+BENCHMARKED_APPS = ("users", "tasks", "groups")
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+def get_benchmark_group(group_pk):
+    """
+    The group with the given pk, or the one with most members, annotated with members_count
+    """
+    groups = Group.objects.annotate(members_count=Count("members"))
+
+    if group_pk is not None:
+        group = groups.filter(pk=group_pk).first()
+    else:
+        group = groups.order_by("-members_count").first()
+
+    if group is None:
+        raise CommandError("No group to benchmark, run seed_data first.")
+
+    return group
+
+
+class Scenario:
+    """
+    One method of one URL, who calls it and with what
+    """
+    # the scenario table passes every part positionally
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self, url_name, method, client, kwargs=None, body=None, status=200
+    ):
+        self.url_name = url_name
+        self.method = method
+        self.client = client
+        self.kwargs = kwargs if callable(kwargs) else (
+            lambda iteration, kwargs=kwargs or {}: kwargs
+        )
+        self.body = body if callable(body) else (lambda iteration, body=body: body)
+        self.status = status
+
+    @property
+    def name(self):
+        return f"{self.method.upper()} {self.url_name}"
+
+    @property
+    def is_read(self):
+        return self.method == "get"
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives every URL of the users, tasks and groups apps in-process through "
+        "the DRF test client against the current database (see seed_data) and reports "
+        "p50/p95/p99 latency, queries per request against the view's query_budget "
+        "and response rows per second. "
+        "Runs inside a transaction that is rolled back, reads run before writes. "
+        "--output writes a JSON baseline, --compare diffs a run against one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group", type=int, help="group pk, defaults to the group with most members"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=50, help="measured requests per scenario"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=3, help="unmeasured requests per scenario"
+        )
+        parser.add_argument(
+            "--only", default="", help="run scenarios whose name contains this, e.g. 'GET groups:'"
+        )
+        parser.add_argument("--output", help="path of the JSON baseline to write")
+        parser.add_argument("--compare", help="path of a JSON baseline to compare with")
+        parser.add_argument(
+            "--label", default="", help="free text stored in the baseline, e.g. a commit"
+        )
+
+    def handle(self, *args, **options):
+        group = get_benchmark_group(options["group"])
+        iterations = options["requests"] + options["warmup"]
+        results = {}
+
+        # test clients send Host: testserver,
+        # budgets are checked here rather than by the middleware
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], QUERY_BUDGET_MODE="off"
+        ):
+            with transaction.atomic():
+                dataset = self.get_dataset(group)
+                scenarios = self.get_scenarios(group, iterations)
+                self.check_coverage(scenarios)
+
+                self.stdout.write(
+                    f"group {group.pk}, {group.members_count} members, "
+                    f"{options['requests']} requests per scenario\n"
+                )
+                self.stdout.write(
+                    f"{'scenario':<44}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                    f"{'queries':>9}{'budget':>8}{'rows/s':>10}{'errors':>8}"
+                )
+
+                for scenario in sorted(scenarios, key=lambda scenario: not scenario.is_read):
+                    if options["only"] not in scenario.name:
+                        continue
+
+                    result = self.run_scenario(
+                        scenario, options["requests"], options["warmup"]
+                    )
+                    results[scenario.name] = result
+                    self.write_row(scenario.name, result)
+
+                    budget = result["budget"]
+
+                    if budget is not None and result["max_queries"] > budget:
+                        self.stderr.write(self.style.WARNING(
+                            f"{scenario.name} made {result['max_queries']} queries, "
+                            f"its budget is {budget}"
+                        ))
+
+                transaction.set_rollback(True)
+
+        baseline = {
+            "label": options["label"],
+            "created_at": timezone.now().isoformat(),
+            "requests": options["requests"],
+            "warmup": options["warmup"],
+            "dataset": dataset,
+            "results": results,
+        }
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(baseline, file, indent=2, sort_keys=True)
+                file.write("\n")
+
+        if options["compare"]:
+            self.compare(baseline, options["compare"])
+
+    def get_dataset(self, group):
+        return {
+            "users": User.objects.count(),
+            "groups": Group.objects.count(),
+            "members": Member.objects.count(),
+            "user_tasks": UserTask.objects.count(),
+            "group_tasks": GroupTask.objects.count(),
+            "task_permissions": MemberTaskRelation.objects.count(),
+            "group": group.pk,
+            "group_members": group.members_count,
+            "group_tasks_in_group": group.tasks.count(),
+        }
+
+    def get_client(self, user):
+        client = APIClient()
+        access_token = RefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+
+        return client
+
+    def get_scenarios(self, group, iterations):  # pylint: disable=too-many-locals
+        """
+        Builds the objects the scenarios act on, writes get one object per iteration
+        """
+        now = timezone.now()
+        due_date = (now + timedelta(days=30)).isoformat()
+        numbers = count()
+
+        owner_member = Member.objects.select_related("user").get(
+            group=group, role=Member.RoleChoices.OWNER
+        )
+        owner = owner_member.user
+        staff = User.objects.filter(is_staff=True).first() or User.objects.create_user(
+            f"benchmark-staff-{now.timestamp()}@example.com", BENCHMARK_PASSWORD, is_staff=True
+        )
+        login_user = User.objects.create_user(
+            f"benchmark-login-{now.timestamp()}@example.com", BENCHMARK_PASSWORD
+        )
+
+        as_owner = self.get_client(owner)
+        as_staff = self.get_client(staff)
+        anonymous = APIClient()
+
+        def new_users(amount):
+            return User.objects.bulk_create([
+                User(email=f"benchmark-{now.timestamp()}-{next(numbers)}@example.com", password="!")
+                for _ in range(amount)
+            ])
+
+        def new_members(amount):
+            members = Member.objects.bulk_create([
+                Member(group=group, user=user) for user in new_users(amount)
+            ])
+            apply_member_changes(group.pk, [member.user_id for member in members])
+            return members
+
+        def new_user_tasks(amount, **fields):
+            return UserTask.objects.bulk_create([
+                UserTask(
+                    user=owner, description="benchmark", due_date=now + timedelta(days=30), **fields
+                )
+                for _ in range(amount)
+            ])
+
+        def new_group_tasks(amount, **fields):
+            tasks = GroupTask.objects.bulk_create([
+                GroupTask(
+                    group=group,
+                    creator=owner_member,
+                    description="benchmark",
+                    due_date=now + timedelta(days=30),
+                    **fields
+                )
+                for _ in range(amount)
+            ])
+            MemberTaskRelation.objects.bulk_create([
+                MemberTaskRelation(member=owner_member, group_task=task, can_edit=True)
+                for task in tasks
+            ])
+            sync_group_task_access(group_task_ids=[task.pk for task in tasks])
+            return tasks
+
+        def new_groups(amount):
+            groups = Group.objects.bulk_create([Group(name="benchmark") for _ in range(amount)])
+            Member.objects.bulk_create([
+                Member(group=new_group, user=owner, role=Member.RoleChoices.OWNER)
+                for new_group in groups
+            ])
+            return groups
+
+        def pk_of(objects):
+            return lambda iteration: {"pk": objects[iteration].pk}
+
+        target_member = (
+            Member.objects.filter(group=group, role=Member.RoleChoices.DEFAULT).first()
+            or new_members(1)[0]
+        )
+        user_task = new_user_tasks(1)[0]
+        group_task = new_group_tasks(1)[0]
+        relation = MemberTaskRelation.objects.create(member=target_member, group_task=group_task)
+
+        open_user_tasks = new_user_tasks(iterations)
+        closed_user_tasks = new_user_tasks(iterations, is_closed=True)
+        open_group_tasks = new_group_tasks(iterations)
+        closed_group_tasks = new_group_tasks(iterations, is_closed=True)
+        removable_members = new_members(iterations)
+        removable_relations = MemberTaskRelation.objects.bulk_create([
+            MemberTaskRelation(member=member, group_task=group_task)
+            for member in new_members(iterations)
+        ])
+        sync_group_task_access(group_task_ids=[group_task.pk])
+        member_users = new_users(iterations)
+        bulk_member_users = new_users(iterations * 10)
+        relation_tasks = new_group_tasks(iterations)
+        relation_members = new_members(10)
+
+        group_kwargs = {"pk": group.pk}
+        task_body = {"description": "benchmark", "due_date": due_date}
+        member_kwargs = {"pk": target_member.pk}
+
+        return [
+            # users
+            Scenario("users:user-register", "post", anonymous, body=lambda iteration: {
+                "email": f"benchmark-register-{now.timestamp()}-{iteration}@example.com",
+                "nickname": "benchmark",
+                "password": BENCHMARK_PASSWORD,
+            }, status=201),
+            Scenario("users:user-login", "post", anonymous, body={
+                "email": login_user.email,
+                "password": BENCHMARK_PASSWORD,
+            }),
+            Scenario("users:user-detail", "get", as_owner, {"pk": owner.pk}),
+            Scenario(
+                "users:user-detail", "patch", as_owner, {"pk": owner.pk}, {"nickname": "benchmark"}
+            ),
+            Scenario(
+                "users:user-detail", "delete", as_staff, pk_of(new_users(iterations)), status=204
+            ),
+
+            # tasks
+            Scenario("tasks:my-task-list", "get", as_owner),
+            Scenario("tasks:my-task-list", "post", as_owner, body=task_body, status=201),
+            Scenario("tasks:other-task-list", "get", as_staff, {"pk": owner.pk}),
+            Scenario(
+                "tasks:other-task-list", "post", as_staff, {"pk": owner.pk}, task_body, status=201
+            ),
+            Scenario("tasks:async-my-task-list", "get", as_owner),
+            Scenario("tasks:async-other-task-list", "get", as_staff, {"pk": owner.pk}),
+            Scenario("tasks:my-task-bulk", "post", as_owner, body={"operations": [
+                {"action": "create", "description": "benchmark", "due_date": due_date}
+                for _ in range(10)
+            ]}),
+            Scenario("tasks:other-task-bulk", "post", as_staff, {"pk": owner.pk}, {"operations": [
+                {"action": "update", "pk": user_task.pk, "description": "benchmark"}
+            ]}),
+            Scenario("tasks:task-detail", "get", as_owner, {"pk": user_task.pk}),
+            Scenario(
+                "tasks:task-detail", "patch", as_owner, {"pk": user_task.pk},
+                {"description": "benchmark"}
+            ),
+            Scenario(
+                "tasks:task-detail", "delete", as_owner, pk_of(new_user_tasks(iterations)),
+                status=204
+            ),
+            Scenario("tasks:task-close", "post", as_owner, pk_of(open_user_tasks), {}),
+            Scenario(
+                "tasks:task-reissue", "post", as_owner, pk_of(closed_user_tasks),
+                {"due_date": due_date}
+            ),
+
+            # groups
+            Scenario("groups:my-group-list", "get", as_owner),
+            Scenario(
+                "groups:my-group-list", "post", as_owner, body={"name": "benchmark"}, status=201
+            ),
+            Scenario("groups:other-group-list", "get", as_staff, {"pk": owner.pk}),
+            Scenario(
+                "groups:other-group-list", "post", as_staff, {"pk": owner.pk},
+                {"name": "benchmark"}, status=201
+            ),
+            Scenario("groups:group-detail", "get", as_owner, group_kwargs),
+            Scenario("groups:group-detail", "patch", as_owner, group_kwargs, {"name": group.name}),
+            Scenario(
+                "groups:group-detail", "delete", as_owner, pk_of(new_groups(iterations)),
+                status=204
+            ),
+            Scenario("groups:async-group-detail", "get", as_owner, group_kwargs),
+            Scenario("groups:group-snapshot-stats", "get", as_staff),
+            Scenario("groups:member-list", "get", as_owner, group_kwargs),
+            Scenario("groups:member-list", "post", as_owner, group_kwargs, lambda iteration: {
+                "user": member_users[iteration].pk,
+                "role": Member.RoleChoices.DEFAULT,
+            }, status=201),
+            Scenario("groups:async-member-list", "get", as_owner, group_kwargs),
+            Scenario(
+                "groups:member-bulk-create", "post", as_owner, group_kwargs,
+                lambda iteration: {"members": [
+                    {"user": user.pk, "role": Member.RoleChoices.DEFAULT}
+                    for user in bulk_member_users[iteration * 10:(iteration + 1) * 10]
+                ]},
+                status=200
+            ),
+            Scenario("groups:member-detail", "get", as_owner, member_kwargs),
+            Scenario("groups:member-detail", "patch", as_owner, member_kwargs, lambda iteration: {
+                "role": Member.RoleChoices.DEFAULT if iteration % 2 else Member.RoleChoices.ADMIN,
+            }),
+            Scenario(
+                "groups:member-detail", "delete", as_owner, pk_of(removable_members), status=204
+            ),
+            Scenario("groups:task-list", "get", as_owner, group_kwargs),
+            Scenario("groups:task-list", "post", as_owner, group_kwargs, task_body, status=201),
+            Scenario("groups:async-task-list", "get", as_owner, group_kwargs),
+            Scenario("groups:task-detail", "get", as_owner, {"pk": group_task.pk}),
+            Scenario(
+                "groups:task-detail", "patch", as_owner, {"pk": group_task.pk},
+                {"description": "benchmark"}
+            ),
+            Scenario(
+                "groups:task-detail", "delete", as_owner, pk_of(new_group_tasks(iterations)),
+                status=204
+            ),
+            Scenario("groups:task-close", "post", as_owner, pk_of(open_group_tasks), {}),
+            Scenario(
+                "groups:task-reissue", "post", as_owner, pk_of(closed_group_tasks),
+                {"due_date": due_date}
+            ),
+            Scenario("groups:task-permission-list", "get", as_owner, {"pk": group_task.pk}),
+            Scenario("groups:task-permission-list", "post", as_owner, pk_of(relation_tasks), {
+                "member": target_member.pk,
+                "can_edit": False,
+            }, status=201),
+            Scenario(
+                "groups:task-permission-bulk-create", "post", as_owner, pk_of(relation_tasks),
+                {"members": [member.pk for member in relation_members]}, status=200
+            ),
+            Scenario("groups:task-permission-detail", "get", as_owner, {"pk": relation.pk}),
+            Scenario(
+                "groups:task-permission-detail", "patch", as_owner, {"pk": relation.pk},
+                lambda iteration: {"can_edit": iteration % 2 == 0}
+            ),
+            Scenario(
+                "groups:task-permission-detail", "delete", as_owner, pk_of(removable_relations),
+                status=204
+            ),
+        ]
+
+    def check_coverage(self, scenarios):
+        covered = {scenario.url_name for scenario in scenarios}
+        namespaces = get_resolver().namespace_dict
+
+        for namespace in BENCHMARKED_APPS:
+            reverse_dict = namespaces[namespace][1].reverse_dict
+
+            for name in sorted(key for key in reverse_dict if isinstance(key, str)):
+                if f"{namespace}:{name}" not in covered:
+                    self.stderr.write(self.style.WARNING(f"no scenario for {namespace}:{name}"))
+
+    def run_scenario(self, scenario, requests, warmup):
+        latencies = []
+        query_counts = []
+        rows = 0
+        errors = 0
+        queries = [0]
+
+        def count_queries(execute, sql, *args):
+            queries[0] += 1
+            return execute(sql, *args)
+
+        for iteration in range(warmup + requests):
+            url = reverse(scenario.url_name, kwargs=scenario.kwargs(iteration))
+            queries[0] = 0
+
+            # the benchmark's transaction never commits,
+            # the on_commit callbacks (access syncs) run as a commit would run them
+            with connection.execute_wrapper(count_queries):
+                started_at = time.perf_counter()
+
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    response = getattr(scenario.client, scenario.method)(
+                        url, scenario.body(iteration), format="json"
+                    )
+
+                latency = time.perf_counter() - started_at
+
+            if iteration < warmup:
+                continue
+
+            latencies.append(latency)
+            query_counts.append(queries[0])
+
+            if response.status_code != scenario.status:
+                errors += 1
+            else:
+                rows += self.count_rows(response)
+
+        return {
+            "url": url,
+            "status": scenario.status,
+            **self.get_latency_stats(latencies),
+            "queries": round(statistics.mean(query_counts), 2),
+            "max_queries": max(query_counts),
+            "budget": get_query_budget(resolve(url).func, scenario.method.upper()),
+            "rows_per_s": round(rows / sum(latencies), 1),
+            "errors": errors,
+        }
+
+    @classmethod
+    def get_latency_stats(cls, latencies):
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+
+        return {
+            "p50_ms": round(cls.percentile(latencies_ms, 0.5), 3),
+            "p95_ms": round(cls.percentile(latencies_ms, 0.95), 3),
+            "p99_ms": round(cls.percentile(latencies_ms, 0.99), 3),
+            "mean_ms": round(statistics.mean(latencies_ms), 3),
+        }
+
+    @staticmethod
+    def percentile(sorted_values, fraction):
+        # nearest rank
+        return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+    @staticmethod
+    def count_rows(response):
+        """
+        Objects in the response body: items of a page or list, one object otherwise
+        """
+        data = getattr(response, "data", None)
+
+        if data is None:
+            return 0
+
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            return len(data["results"])
+
+        if isinstance(data, list):
+            return len(data)
+
+        return 1
+
+    def write_row(self, name, result):
+        self.stdout.write(
+            f"{name:<44}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            f"{result['queries']:>9.1f}{'-' if result['budget'] is None else result['budget']:>8}"
+            f"{result['rows_per_s']:>10.0f}{result['errors']:>8}"
+        )
+
+    def compare(self, baseline, path):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)
+
+        self.stdout.write(
+            f"\ncompared with {path} ({previous.get('label') or previous['created_at']})\n"
+            f"{'scenario':<44}{'p50 ms':>17}{'p99 ms':>17}{'queries':>15}"
+        )
+
+        if previous["dataset"] != baseline["dataset"]:
+            self.stderr.write(self.style.WARNING("the baseline was taken on another dataset"))
+
+        for name, after in baseline["results"].items():
+            before = previous["results"].get(name)
+
+            if before is None:
+                self.stdout.write(f"{name:<44}{'new':>17}")
+                continue
+
+            self.stdout.write(
+                f"{name:<44}"
+                f"{before['p50_ms']:>8.2f} {self.get_change(before['p50_ms'], after['p50_ms']):>8}"
+                f"{before['p99_ms']:>8.2f} {self.get_change(before['p99_ms'], after['p99_ms']):>8}"
+                f"{before['queries']:>7.1f} -> {after['queries']:<5.1f}"
+            )
+
+    @staticmethod
+    def get_change(before, after):
+        if not before:
+            return ""
+
+        return f"{(after - before) / before * 100:+.0f}%"
@@ -0,0 +1,126 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.pagination import KeysetPagination, NormalDataPagination
+from tasks.models import UserTask
+
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates one user with --rows personal tasks in a transaction that is rolled "
+        "back and times fetching one page of their due date ordered tasks at several "
+        "depths with page number pagination (COUNT(*) and OFFSET) and with keyset "
+        "pagination (?pagination=cursor), through NormalDataPagination itself"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100_000, help="personal tasks of the benchmark user"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="timed fetches per page, the median is reported"
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        page_size = NormalDataPagination.page_size
+        pages = rows // page_size
+
+        if pages < 2:
+            raise CommandError(f"--rows must be at least {2 * page_size}.")
+
+        with transaction.atomic():
+            queryset = self.get_queryset(self.create_tasks(rows))
+
+            self.stdout.write(
+                f"{rows} rows, {page_size} per page, median of {options['repeat']} fetches\n"
+            )
+            self.stdout.write(f"{'page':>8}{'page number ms':>17}{'cursor ms':>12}")
+
+            for page in sorted({1, 10, pages // 100, pages // 10, pages // 2, pages} - {0}):
+                page_number_ms, page_number_rows = self.time_page(
+                    queryset, {"page_size": page}, options["repeat"]
+                )
+                cursor_ms, cursor_rows = self.time_page(
+                    queryset,
+                    {"pagination": "cursor", "cursor": self.get_cursor(queryset, page, page_size)},
+                    options["repeat"]
+                )
+
+                if page_number_rows != cursor_rows:
+                    raise CommandError(
+                        f"page {page} differs between page number and keyset pagination"
+                    )
+
+                self.stdout.write(f"{page:>8}{page_number_ms:>17.2f}{cursor_ms:>12.2f}")
+
+            transaction.set_rollback(True)
+
+    def create_tasks(self, rows):
+        user = User.objects.create_user(f"benchmark-pagination-{time.time_ns()}@example.com")
+        now = timezone.now()
+        UserTask.objects.bulk_create(
+            [
+                # every tenth task has no due date, they are ordered last
+                UserTask(
+                    user=user,
+                    description=f"task {index}",
+                    due_date=(
+                        None if index % 10 == 0 else now + timedelta(minutes=index * 7919 % rows)
+                    )
+                )
+                for index in range(rows)
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+        return user
+
+    @staticmethod
+    def get_queryset(user):
+        # what UserTaskListView pages through with its default ordering
+        return UserTask.objects.filter(user=user).order_by(
+            F("due_date").asc(nulls_last=True)
+        ).values("pk", "description", "due_date")
+
+    @staticmethod
+    def get_cursor(queryset, page, page_size):
+        """
+        Returns the cursor of the page, None for the first one
+        """
+        if page == 1:
+            return None
+
+        ordered = queryset.order_by(F("due_date").asc(nulls_last=True), "pk")
+        last_row = ordered[(page - 1) * page_size - 1]
+
+        return KeysetPagination.encode_cursor([last_row["due_date"], last_row["pk"]])
+
+    @staticmethod
+    def time_page(queryset, query_params, repeat):
+        factory = APIRequestFactory()
+        query_params = {name: value for name, value in query_params.items() if value is not None}
+        timings = []
+
+        for _ in range(repeat):
+            request = Request(factory.get("/", query_params))
+            started_at = time.perf_counter()
+            page = NormalDataPagination().paginate_queryset(queryset, request)
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+        return statistics.median(timings), [row["pk"] for row in page]
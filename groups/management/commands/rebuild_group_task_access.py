@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from groups.models import Group, GroupTaskAccess
+from groups.services.group_task_access import sync_group_task_access
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the materialized group task access table from roles, task creators "
+        "and task permissions, one group per transaction. Only differences are written, "
+        "so on a consistent table it is a read-only check"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group", type=int, action="append",
+            help="group pk, can be repeated, defaults to every group"
+        )
+
+    def handle(self, *args, **options):
+        group_ids = options["group"]
+
+        if group_ids is None:
+            group_ids = list(Group.objects.order_by("pk").values_list("pk", flat=True))
+        elif Group.objects.filter(pk__in=group_ids).count() != len(set(group_ids)):
+            raise CommandError("Some of the groups do not exist.")
+
+        total_created = total_updated = total_deleted = 0
+
+        for group_id in group_ids:
+            with transaction.atomic():
+                created, updated, deleted = sync_group_task_access(group_id=group_id)
+
+            total_created += created
+            total_updated += updated
+            total_deleted += deleted
+
+            if created or updated or deleted:
+                self.stdout.write(
+                    f"group {group_id}: {created} created, {updated} updated, {deleted} deleted"
+                )
+
+        self.stdout.write(
+            f"{len(group_ids)} groups, {GroupTaskAccess.objects.count()} rows: "
+            f"{total_created} created, {total_updated} updated, {total_deleted} deleted"
+        )
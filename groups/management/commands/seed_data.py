@@ -0,0 +1,243 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from groups.models import Group, GroupTask, Member, MemberTaskRelation
+from groups.services.group_task_access import sync_group_task_access
+from tasks.models import UserTask
+
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+# searchable descriptions, a few words are common and a few are rare
+WORDS = (
+    "report", "meeting", "review", "deploy", "invoice", "budget", "design", "draft",
+    "call", "email", "update", "fix", "plan", "release", "sprint", "backlog",
+    "customer", "server", "database", "migration", "docs", "onboarding", "audit", "retro",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic dataset through the real models with bulk_create: users, "
+        "groups with a skewed (Pareto) member count, personal and group tasks with "
+        "mixed due dates and closed states, task permissions and the group task "
+        "access table. Everything is written in one transaction, the same --seed "
+        "gives the same dataset"
+    )
+
+    # state of the run, set by handle
+    random = None
+    now = None
+    closed_share = 0
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="users to create")
+        parser.add_argument("--groups", type=int, default=100, help="groups to create")
+        parser.add_argument(
+            "--min-members", type=int, default=2, help="members of the smallest groups"
+        )
+        parser.add_argument(
+            "--skew", type=float, default=1.2,
+            help="Pareto shape of group sizes, lower is more skewed"
+        )
+        parser.add_argument(
+            "--user-tasks", type=int, default=20, help="mean personal tasks per user"
+        )
+        parser.add_argument(
+            "--group-tasks", type=int, default=5, help="mean group tasks per member"
+        )
+        parser.add_argument(
+            "--relations", type=int, default=2,
+            help="members related to a group task besides its creator"
+        )
+        parser.add_argument("--closed", type=float, default=0.3, help="share of closed tasks")
+        parser.add_argument(
+            "--prefix", default="seed", help="prefix of emails, nicknames and group names"
+        )
+        parser.add_argument(
+            "--password", default="seed-password", help="password of every seeded user"
+        )
+        parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+
+        if not 1 <= options["min_members"] <= options["users"]:
+            raise CommandError("--users must be at least --min-members, which must be positive.")
+
+        if User.objects.filter(email__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Users with the prefix '{prefix}' already exist, pick another --prefix."
+            )
+
+        self.random = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.closed_share = options["closed"]
+        started_at = time.perf_counter()
+
+        with transaction.atomic():
+            users = self.create_users(prefix, options["users"], options["password"])
+            groups, members_by_group = self.create_groups(prefix, users, options)
+            user_tasks = self.create_user_tasks(users, options["user_tasks"])
+            group_tasks, relations = self.create_group_tasks(
+                members_by_group, options["group_tasks"], options["relations"]
+            )
+
+            # bulk_create does not send post_save, the access table is filled per group
+            accesses = 0
+
+            for group in groups:
+                accesses += sync_group_task_access(group_id=group.pk)[0]
+
+        sizes = sorted(len(members) for members in members_by_group.values())
+        counts = {
+            "users": len(users),
+            "groups": len(groups),
+            "members": sum(sizes),
+            "user tasks": user_tasks,
+            "group tasks": group_tasks,
+            "task permissions": relations,
+            "task accesses": accesses,
+        }
+        self.write_report(counts, sizes, time.perf_counter() - started_at, options)
+
+    def write_report(self, counts, sizes, elapsed, options):
+        rows = sum(counts.values())
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name:<18}{count:>10}")
+
+        if sizes:
+            self.stdout.write(
+                f"group sizes: median {statistics.median(sizes):g}, "
+                f"p90 {sizes[int(len(sizes) * 0.9)]}, max {sizes[-1]}"
+            )
+
+        self.stdout.write(
+            f"{rows} rows in {elapsed:.1f} s ({rows / elapsed:.0f} rows/s), "
+            f"staff user {options['prefix']}-staff@example.com, "
+            f"password '{options['password']}'"
+        )
+
+    def create_users(self, prefix, count, password):
+        # hashing is slow on purpose, every seeded user shares one hash
+        password_hash = make_password(password)
+        users = [
+            User(
+                email=f"{prefix}-{index}@example.com",
+                nickname=f"{prefix}-{index}",
+                password=password_hash
+            )
+            for index in range(count)
+        ]
+        users.append(User(
+            email=f"{prefix}-staff@example.com",
+            nickname=f"{prefix}-staff",
+            password=password_hash,
+            is_staff=True
+        ))
+
+        return User.objects.bulk_create(users, batch_size=BATCH_SIZE)[:-1]
+
+    def create_groups(self, prefix, users, options):
+        groups = Group.objects.bulk_create(
+            [Group(name=f"{prefix} group {index}") for index in range(options["groups"])],
+            batch_size=BATCH_SIZE
+        )
+        members = []
+
+        for group in groups:
+            size = min(
+                len(users),
+                int(options["min_members"] * self.random.paretovariate(options["skew"]))
+            )
+            # the first sampled user owns the group, about a tenth are admins
+            for index, user in enumerate(self.random.sample(users, size)):
+                if index == 0:
+                    role = Member.RoleChoices.OWNER
+                elif index <= size // 10:
+                    role = Member.RoleChoices.ADMIN
+                else:
+                    role = Member.RoleChoices.DEFAULT
+
+                members.append(Member(group=group, user=user, role=role))
+
+        members_by_group = {group.pk: [] for group in groups}
+
+        for member in Member.objects.bulk_create(members, batch_size=BATCH_SIZE):
+            members_by_group[member.group_id].append(member)
+
+        return groups, members_by_group
+
+    def create_user_tasks(self, users, mean):
+        tasks = [
+            UserTask(user=user, **self.get_task_fields())
+            for user in users
+            for _ in range(self.random.randint(0, 2 * mean))
+        ]
+
+        return len(UserTask.objects.bulk_create(tasks, batch_size=BATCH_SIZE))
+
+    def create_group_tasks(self, members_by_group, mean_per_member, relations_per_task):
+        tasks = []
+
+        for group_id, members in members_by_group.items():
+            for _ in range(self.random.randint(0, 2 * mean_per_member * len(members))):
+                tasks.append(GroupTask(
+                    group_id=group_id,
+                    creator=self.random.choice(members),
+                    **self.get_task_fields()
+                ))
+
+        tasks = GroupTask.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+        relations = []
+
+        for task in tasks:
+            # the creator can edit, as create_group_task relates them
+            relations.append(
+                MemberTaskRelation(member=task.creator, group_task=task, can_edit=True)
+            )
+
+            members = members_by_group[task.group_id]
+            # one extra member is sampled in case the creator is among them
+            sampled = self.random.sample(members, min(len(members), relations_per_task + 1))
+            related = [
+                member for member in sampled if member.pk != task.creator_id
+            ][:relations_per_task]
+
+            for member in related:
+                relations.append(MemberTaskRelation(
+                    member=member,
+                    group_task=task,
+                    can_edit=self.random.random() < 0.3
+                ))
+
+        MemberTaskRelation.objects.bulk_create(relations, batch_size=BATCH_SIZE)
+
+        return len(tasks), len(relations)
+
+    def get_task_fields(self):
+        roll = self.random.random()
+
+        if roll < 0.2:
+            due_date = None
+        elif roll < 0.47:
+            due_date = self.now - timedelta(minutes=self.random.randint(60, 60 * 24 * 60))
+        else:
+            due_date = self.now + timedelta(minutes=self.random.randint(60, 60 * 24 * 90))
+
+        return {
+            "description": " ".join(self.random.choices(WORDS, k=self.random.randint(2, 8))),
+            "due_date": due_date,
+            "is_closed": self.random.random() < self.closed_share,
+        }
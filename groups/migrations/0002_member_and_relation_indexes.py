@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='grouptask',
+            name='creator',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='created_tasks',
+                to='groups.member',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='grouptask',
+            name='group',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='tasks',
+                to='groups.group',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['group', 'role'], name='member_group_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['group', 'joined_at'], name='member_group_joined_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membertaskrelation',
+            index=models.Index(
+                fields=['group_task', 'created_at'],
+                name='relation_task_created_at_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,176 @@
+# Moves GroupTask out of multi-table inheritance:
+# rows of tasks_task + groups_grouptask are copied into one table keeping their ids
+
+import django.db.models.deletion
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def copy_group_tasks_to_flat_table(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    task_model = apps.get_model("tasks", "Task")
+    group_task_model = apps.get_model("groups", "GroupTask")
+    group_task_flat_model = apps.get_model("groups", "GroupTaskFlat")
+
+    schema_editor.execute(
+        f"INSERT INTO {quote(group_task_flat_model._meta.db_table)} "
+        "(id, description, is_closed, due_date, created_at, updated_at, group_id, creator_id) "
+        "SELECT t.id, t.description, t.is_closed, t.due_date, t.created_at, t.updated_at, "
+        "g.group_id, g.creator_id "
+        f"FROM {quote(group_task_model._meta.db_table)} g "
+        f"INNER JOIN {quote(task_model._meta.db_table)} t ON t.id = g.task_ptr_id"
+    )
+
+    for sql in connection.ops.sequence_reset_sql(no_style(), [group_task_flat_model]):
+        schema_editor.execute(sql)
+
+
+def copy_group_tasks_to_inherited_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    task_model = apps.get_model("tasks", "Task")
+    group_task_model = apps.get_model("groups", "GroupTask")
+    group_task_flat_model = apps.get_model("groups", "GroupTaskFlat")
+
+    member_task_relation_model = apps.get_model("groups", "MemberTaskRelation")
+
+    # user tasks are back in tasks_task with their ids (tasks.0005 is unapplied first),
+    # group tasks move past both id ranges, so no relation collides while it is shifted
+    max_user_task_id = task_model.objects.aggregate(max_id=models.Max("id"))["max_id"]
+    max_group_task_id = group_task_flat_model.objects.aggregate(max_id=models.Max("id"))["max_id"]
+    offset = max(max_user_task_id, max_group_task_id or 0) if max_user_task_id is not None else 0
+
+    schema_editor.execute(
+        f"INSERT INTO {quote(task_model._meta.db_table)} "
+        "(id, description, is_closed, due_date, created_at, updated_at) "
+        "SELECT id + %s, description, is_closed, due_date, created_at, updated_at "
+        f"FROM {quote(group_task_flat_model._meta.db_table)}",
+        [offset]
+    )
+    schema_editor.execute(
+        f"INSERT INTO {quote(group_task_model._meta.db_table)} (task_ptr_id, group_id, creator_id) "
+        f"SELECT id + %s, group_id, creator_id FROM {quote(group_task_flat_model._meta.db_table)}",
+        [offset]
+    )
+
+    if offset:
+        member_task_relation_model.objects.update(group_task_id=models.F("group_task_id") + offset)
+
+    for sql in connection.ops.sequence_reset_sql(no_style(), [task_model]):
+        schema_editor.execute(sql)
+
+
+def drop_flat_table_indexes(apps, schema_editor):
+    # on SQLite the AlterFields below rebuild the flat table under its final name, unapplying
+    # them keeps the rebuilt index names, which the recreated inherited table needs
+    connection = schema_editor.connection
+    table = apps.get_model("groups", "GroupTaskFlat")._meta.db_table
+
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+
+    for name, constraint in constraints.items():
+        if constraint["index"] and not constraint["primary_key"] and not constraint["unique"]:
+            schema_editor.execute(schema_editor.sql_delete_index % {
+                "table": connection.ops.quote_name(table),
+                "name": connection.ops.quote_name(name),
+            })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_member_and_relation_indexes'),
+        ('tasks', '0004_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupTaskFlat',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('description', models.TextField()),
+                ('is_closed', models.BooleanField(default=False)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+',
+                    to='groups.group',
+                )),
+                ('creator', models.ForeignKey(
+                    null=True,
+                    on_delete=django.db.models.deletion.SET_NULL,
+                    related_name='+',
+                    to='groups.member',
+                )),
+            ],
+        ),
+        migrations.RunPython(copy_group_tasks_to_flat_table, copy_group_tasks_to_inherited_tables),
+        migrations.AlterField(
+            model_name='membertaskrelation',
+            name='group_task',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='groups.grouptaskflat',
+            ),
+        ),
+        migrations.DeleteModel(
+            name='GroupTask',
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_flat_table_indexes),
+        migrations.RenameModel(
+            old_name='GroupTaskFlat',
+            new_name='GroupTask',
+        ),
+        migrations.AlterField(
+            model_name='grouptask',
+            name='group',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='tasks',
+                to='groups.group',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='grouptask',
+            name='creator',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='created_tasks',
+                to='groups.member',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='membertaskrelation',
+            name='group_task',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='related_members',
+                to='groups.grouptask',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='grouptask',
+            index=models.Index(
+                condition=models.Q(('is_closed', False)),
+                fields=['group', 'due_date'],
+                name='grouptask_open_due_date_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='grouptask',
+            index=models.Index(fields=['group', 'due_date'], name='grouptask_group_due_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tasks.search
+from tasks.search import create_search_index, drop_search_index
+
+
+def create_group_task_search_index(apps, schema_editor):
+    group_task_model = apps.get_model("groups", "GroupTask")
+    create_search_index(schema_editor, group_task_model._meta.db_table)
+
+
+def drop_group_task_search_index(apps, schema_editor):
+    group_task_model = apps.get_model("groups", "GroupTask")
+    drop_search_index(schema_editor, group_task_model._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0003_flatten_grouptask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupTaskSearchEntry',
+            fields=[
+                ('task', models.OneToOneField(
+                    on_delete=django.db.models.deletion.DO_NOTHING,
+                    primary_key=True,
+                    related_name='search_entry',
+                    serialize=False,
+                    to='groups.grouptask',
+                )),
+                ('description', tasks.search.SearchDocumentField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'groups_grouptask_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_group_task_search_index, drop_group_task_search_index),
+    ]
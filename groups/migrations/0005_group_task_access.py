@@ -0,0 +1,98 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:57
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import groups.models
+
+AccessLevels = groups.models.GroupTaskAccess.AccessLevels
+ADMIN_ROLES = ("admin", "owner")
+
+
+def populate_group_task_access(apps, _schema_editor):
+    # same rules as groups.services.group_task_access, on historical models
+    group_task_model = apps.get_model("groups", "GroupTask")
+    group_task_access_model = apps.get_model("groups", "GroupTaskAccess")
+    member_task_relation_model = apps.get_model("groups", "MemberTaskRelation")
+
+    levels = defaultdict(int)
+    task_groups = dict(group_task_model.objects.values_list("pk", "group_id"))
+
+    for group_task_id, user_id in group_task_model.objects.filter(
+        group__members__role__in=ADMIN_ROLES
+    ).values_list("pk", "group__members__user_id"):
+        levels[(user_id, group_task_id)] |= AccessLevels.ADMIN
+
+    for group_task_id, user_id in group_task_model.objects.filter(
+        creator__isnull=False
+    ).values_list("pk", "creator__user_id"):
+        levels[(user_id, group_task_id)] |= AccessLevels.CREATOR
+
+    for group_task_id, user_id, can_edit in member_task_relation_model.objects.values_list(
+        "group_task_id", "member__user_id", "can_edit"
+    ):
+        levels[(user_id, group_task_id)] |= (
+            AccessLevels.RELATED | (AccessLevels.EDITOR if can_edit else 0)
+        )
+
+    group_task_access_model.objects.bulk_create(
+        [
+            group_task_access_model(
+                user_id=user_id,
+                group_id=task_groups[group_task_id],
+                group_task_id=group_task_id,
+                access_level=access_level
+            )
+            for (user_id, group_task_id), access_level in levels.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_grouptask_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupTaskAccess',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('access_level', groups.models.AccessLevelField()),
+                ('group', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='task_accesses',
+                    to='groups.group',
+                )),
+                ('group_task', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='accesses',
+                    to='groups.grouptask',
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='group_task_accesses',
+                    to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'group'], name='access_user_group_idx')],
+                'constraints': [models.UniqueConstraint(
+                    fields=('user', 'group_task'),
+                    name='unique_user_group_task',
+                )],
+            },
+        ),
+        migrations.RunPython(populate_group_task_access, migrations.RunPython.noop),
+    ]
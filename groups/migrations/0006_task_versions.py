@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+from tasks.search import create_search_index
+
+
+def recreate_group_task_search_index(apps, schema_editor):
+    # changing the columns remakes the table on SQLite, which drops the index triggers
+    group_task_model = apps.get_model("groups", "GroupTask")
+    create_search_index(schema_editor, group_task_model._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_group_task_access'),
+    ]
+
+    operations = [
+        # rebuilds the index after the column is removed again on unapply
+        migrations.RunPython(migrations.RunPython.noop, recreate_group_task_search_index),
+        migrations.AddField(
+            model_name='grouptask',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='membertaskrelation',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(recreate_group_task_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def demote_extra_owners(apps, _schema_editor):
+    # racing transfers could leave a group with several owners,
+    # the earliest one keeps the group and the others become admins
+    member_model = apps.get_model("groups", "Member")
+    user_model = apps.get_model("users", "User")
+
+    owners = member_model.objects.filter(role="owner").order_by("group_id", "joined_at", "pk")
+    demoted_pks = []
+    demoted_user_ids = []
+    seen_group_ids = set()
+
+    for pk, group_id, user_id in owners.values_list("pk", "group_id", "user_id"):
+        if group_id in seen_group_ids:
+            demoted_pks.append(pk)
+            demoted_user_ids.append(user_id)
+
+        seen_group_ids.add(group_id)
+
+    if demoted_pks:
+        member_model.objects.filter(pk__in=demoted_pks).update(role="admin")
+        # membership claims of the demoted users still say owner
+        user_model.objects.filter(pk__in=demoted_user_ids).update(
+            membership_version=F("membership_version") + 1
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_task_versions'),
+        ('users', '0005_user_membership_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(demote_extra_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='member',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('role', 'owner')),
+                fields=('group',),
+                name='unique_group_owner',
+            ),
+        ),
+    ]
@@ -1,7 +1,6 @@
 from django.db import models
-from django.utils import timezone
 
-from tasks.models import Task
+from tasks.models import Task, TaskSearchEntry
 
 
 class Group(models.Model):
@@ -9,12 +8,8 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def get_relevant_tasks(self):
-        return self.tasks.filter(
-            is_closed=False
-        ).filter(
-            models.Q(due_date__gte=timezone.now()) | models.Q(due_date__isnull=True)
-        )
+    def get_relevant_tasks(self, now):
+        return GroupTask.objects.filter(group=self).relevant(now).with_currentness(now)
 
     def __str__(self):
         return f"{self.pk} {self.name}"
@@ -24,10 +19,33 @@ class GroupTask(Task):
     group = models.ForeignKey("groups.Group", on_delete=models.CASCADE, related_name="tasks")
     creator = models.ForeignKey("groups.Member", null=True, on_delete=models.SET_NULL, related_name="created_tasks")
 
+    class Meta(Task.Meta):
+        indexes = [
+            # relevant (open and not expired) tasks ordered by due date
+            models.Index(
+                fields=["group", "due_date"],
+                condition=models.Q(is_closed=False),
+                name="grouptask_open_due_date_idx"
+            ),
+            models.Index(fields=["group", "due_date"], name="grouptask_group_due_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.pk}"
 
 
+class GroupTaskSearchEntry(TaskSearchEntry):
+    task = models.OneToOneField(
+        "groups.GroupTask",
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry"
+    )
+
+    class Meta(TaskSearchEntry.Meta):
+        db_table = "groups_grouptask_fts"
+
+
 class Member(models.Model):
     class RoleChoices(models.TextChoices):
         DEFAULT = "default"
@@ -44,7 +62,18 @@ class Member(models.Model):
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['user', 'group'], name='unique_user_group')
+            models.UniqueConstraint(fields=['user', 'group'], name='unique_user_group'),
+            # partial unique index, ownership transfers can not leave two owners behind
+            models.UniqueConstraint(
+                fields=["group"],
+                condition=models.Q(role="owner"),
+                name="unique_group_owner"
+            ),
+        ]
+        # (group, user) lookups are served by unique_user_group
+        indexes = [
+            models.Index(fields=["group", "role"], name="member_group_role_idx"),
+            models.Index(fields=["group", "joined_at"], name="member_group_joined_at_idx"),
         ]
 
     def __str__(self):
@@ -65,6 +94,8 @@ class MemberTaskRelation(models.Model):
     can_edit = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # bumped on every write, checked by conditional updates (core.concurrency)
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         constraints = [
@@ -73,6 +104,68 @@ class MemberTaskRelation(models.Model):
                 name="unique_member_group_task"
             )
         ]
+        # (member, group_task) lookups are served by unique_member_group_task
+        indexes = [
+            models.Index(fields=["group_task", "created_at"], name="relation_task_created_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.member}"
+
+
+class AccessLevelField(models.PositiveSmallIntegerField):
+    """
+    Bit set of GroupTaskAccess.AccessLevels, supports the __has_any lookup
+    """
+
+
+@AccessLevelField.register_lookup
+class HasAny(models.Lookup):
+    lookup_name = "has_any"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"({lhs} & {rhs}) != 0", [*lhs_params, *rhs_params]
+
+
+class GroupTaskAccess(models.Model):
+    """
+    Access of users to group tasks, derived by groups.services.group_task_access
+    """
+    class AccessLevels:
+        RELATED = 1
+        EDITOR = 2
+        CREATOR = 4
+        ADMIN = 8
+
+    VISIBLE_ACCESS = AccessLevels.RELATED | AccessLevels.ADMIN
+
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="group_task_accesses"
+    )
+    group = models.ForeignKey(
+        "groups.Group",
+        on_delete=models.CASCADE,
+        related_name="task_accesses"
+    )
+    group_task = models.ForeignKey(
+        "groups.GroupTask",
+        on_delete=models.CASCADE,
+        related_name="accesses"
+    )
+    access_level = AccessLevelField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "group_task"], name="unique_user_group_task")
+        ]
+        # (user, group_task) lookups are served by unique_user_group_task
+        indexes = [
+            models.Index(fields=["user", "group"], name="access_user_group_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.group_task_id} {self.access_level}"
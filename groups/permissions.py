@@ -1,15 +1,20 @@
 from rest_framework.permissions import BasePermission
 
-from .models import Member
+from .models import GroupTaskAccess, Member
+from .utils.membership_resolver import get_membership_resolver
+
+
+AccessLevels = GroupTaskAccess.AccessLevels
+
 
 class GroupPermissions:
     class ObjectTypes:
         GROUP = "group"
         MEMBER = "member"
 
-    object_to_group_mapper = {
-        ObjectTypes.GROUP: lambda obj: obj,
-        ObjectTypes.MEMBER: lambda obj: obj.group,
+    object_to_group_id_mapper = {
+        ObjectTypes.GROUP: lambda obj: obj.pk,
+        ObjectTypes.MEMBER: lambda obj: obj.group_id,
     }
 
     @staticmethod
@@ -19,22 +24,48 @@ class GroupPermissions:
                 return bool(request.user and request.user.is_authenticated)
 
             def has_object_permission(self, request, view, obj):
-                if request.user.is_staff:
+                group_id = self.get_group_id(request, obj)
+
+                if group_id is None:
+                    return True
+
+                return self.check_membership(
+                    get_membership_resolver(request).get_membership(group_id)
+                )
+
+            async def ahas_object_permission(self, request, view, obj):
+                group_id = self.get_group_id(request, obj)
+
+                if group_id is None:
                     return True
 
-                if object_type in GroupPermissions.object_to_group_mapper:
-                    group = GroupPermissions.object_to_group_mapper[object_type](obj)
+                return self.check_membership(
+                    await get_membership_resolver(request).aget_membership(group_id)
+                )
+
+            @staticmethod
+            def get_group_id(request, obj):
+                """
+                Returns id of the group to check membership in or None
+                """
+                if request.user.is_staff:
+                    return None
+
+                if object_type in GroupPermissions.object_to_group_id_mapper:
+                    group_id = GroupPermissions.object_to_group_id_mapper[object_type](obj)
                 else:
-                    raise NotImplementedError(f"{object_type} is not defined in group_object_mapper")
+                    raise NotImplementedError(
+                        f"{object_type} is not defined in object_to_group_id_mapper"
+                    )
 
                 if check_membership_ownership and object_type == GroupPermissions.ObjectTypes.MEMBER:
-                    if request.user == obj.user:
-                        return True
+                    if request.user.pk == obj.user_id:
+                        return None
 
-                membership = group.members.filter(
-                    user=request.user
-                ).first()
+                return group_id
 
+            @staticmethod
+            def check_membership(membership):
                 if roles is None:
                     return bool(membership)
 
@@ -85,6 +116,13 @@ class GroupTaskPermissions:
         EDITOR = "editor"
         RELATED = "related"
 
+    # group admins pass every check
+    task_relation_to_access_levels = {
+        TaskRelations.CREATOR: AccessLevels.CREATOR | AccessLevels.ADMIN,
+        TaskRelations.EDITOR: AccessLevels.EDITOR | AccessLevels.ADMIN,
+        TaskRelations.RELATED: AccessLevels.RELATED | AccessLevels.ADMIN,
+    }
+
     @staticmethod
     def __create_group_task_permission(task_relation):
         class GroupTaskPermission(BasePermission):
@@ -96,40 +134,10 @@ class GroupTaskPermissions:
                 if request.user.is_staff:
                     return True
 
-                request_user_membership = obj.group.members.filter(
-                    user=request.user
-                ).first()
+                access_level = get_membership_resolver(request).get_task_access(obj)
+                required = GroupTaskPermissions.task_relation_to_access_levels[task_relation]
 
-                if not request_user_membership:
-                    return False
-
-                # group admin
-                if request_user_membership.role in Member.ADMIN_ROLES:
-                    return True
-
-                # task creator
-                if task_relation == GroupTaskPermissions.TaskRelations.CREATOR:
-                    if obj.creator == request_user_membership:
-                        return True
-                else:
-                    request_member_relation = obj.related_members.filter(
-                        member=request_user_membership
-                    ).first()
-
-                    if not request_member_relation:
-                        return False
-
-                    # editor
-                    if task_relation == GroupTaskPermissions.TaskRelations.EDITOR:
-                        if request_member_relation.can_edit:
-                            return True
-
-                    # related
-                    elif task_relation == GroupTaskPermissions.TaskRelations.RELATED:
-                        # relation existance was previously checked
-                        return True
-
-                return False
+                return bool(access_level & required)
 
         GroupTaskPermission.__name__ = f"GroupTask{task_relation.capitalize()}Permission"
         return GroupTaskPermission
@@ -157,20 +165,13 @@ class IsTargetMemberOrTaskCreatorOrGroupAdminOrStaff(BasePermission):
         if request.user.is_staff:
             return True
 
-        request_user_membership = obj.member.group.members.filter(
-            user=request.user
-        ).first()
-
-        if not request_user_membership:
-            return False
-
-        # group admin
-        if request_user_membership.role in Member.ADMIN_ROLES:
+        # target member
+        if obj.member.user_id == request.user.pk:
             return True
 
-        # task creator
-        if obj.group_task.creator == request_user_membership:
-            return True
+        # task creator or group admin
+        access_level = get_membership_resolver(request).get_task_access(obj.group_task)
 
-        # target member
-        return request_user_membership == obj.member
+        return bool(access_level & GroupTaskPermissions.task_relation_to_access_levels[
+            GroupTaskPermissions.TaskRelations.CREATOR
+        ])
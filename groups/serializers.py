@@ -1,7 +1,10 @@
 from rest_framework import serializers
 
+from core.fast_serializers import FastSerializer
+from core.sparse_fields import SparseFieldsSerializerMixin
+
 from .models import Group, GroupTask, Member, MemberTaskRelation
-from tasks.serializers import TaskInfoSerializer
+from tasks.serializers import TaskInfoSerializer, TaskInfoFastSerializer
 
 
 # GROUP
@@ -15,6 +18,20 @@ class GroupListSerializer(serializers.ModelSerializer):
         read_only_fields = ("pk", "created_at", "updated_at")
 
 
+class GroupListFastSerializer(FastSerializer):
+    """
+    ONLY FOR SEREALIZATION, same output as GroupListSerializer from values() rows
+    """
+    fields = (
+        ("pk", "pk"),
+        ("name", "name"),
+        ("created_at", "created_at"),
+        ("updated_at", "updated_at"),
+        ("joined_at", "joined_at")
+    )
+    datetime_fields = ("created_at", "updated_at", "joined_at")
+
+
 class GroupDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Group
@@ -55,10 +72,28 @@ class UpdateMemberSerializer(serializers.ModelSerializer):
         }
 
 
-class MemberInfoSerializer(serializers.ModelSerializer):
+class BulkCreateMemberSerializer(serializers.Serializer):
+    """
+    ONLY FOR DESEREALIZATION, expects (user, role)
     """
-    ONLY FOR SERIALIZATION\n
-    returns (pk, user, nickname, group, role, joined_at, updated_at)
+    user = serializers.IntegerField()
+    role = serializers.ChoiceField(choices=Member.RoleChoices.choices)
+
+
+class BulkCreateMemberRequestSerializer(serializers.Serializer):
+    """
+    ONLY FOR DESEREALIZATION, expects (members)
+    """
+    members = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class MemberInfoSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """
+    ONLY FOR SERIALIZATION, returns (pk, nickname, group, role, joined_at, updated_at)
     """
     nickname = serializers.CharField(source="user.nickname", read_only=True)
 
@@ -68,20 +103,47 @@ class MemberInfoSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class MemberInfoFastSerializer(FastSerializer):
+    """
+    ONLY FOR SEREALIZATION, same output as MemberInfoSerializer from values() rows
+    """
+    fields = (
+        ("pk", "pk"),
+        ("nickname", "user__nickname"),
+        ("group", "group_id"),
+        ("role", "role"),
+        ("joined_at", "joined_at"),
+        ("updated_at", "updated_at")
+    )
+    datetime_fields = ("joined_at", "updated_at")
+
+
 # GROUP TASK
 
 class GroupTaskInfoSerializer(TaskInfoSerializer):
     """
-    ONLY FOR SEREALIZATION\n
-    returns (pk, description, is_closed, is_current, due_date, creator, created_at, updated_at)
+    ONLY FOR SEREALIZATION, takes optional fields and expand (creator)
     """
     creator = MemberInfoSerializer(read_only=True)
 
+    collapsible_fields = {"creator": "creator_id"}
+
     class Meta(TaskInfoSerializer.Meta):
         model = GroupTask
         fields = TaskInfoSerializer.Meta.fields + ("group_id", "creator")
 
 
+class GroupTaskInfoFastSerializer(FastSerializer):
+    """
+    ONLY FOR SEREALIZATION, same output as GroupTaskInfoSerializer from values() rows
+    """
+    fields = TaskInfoFastSerializer.fields + (
+        ("group_id", "group_id"),
+        ("creator", (MemberInfoFastSerializer, "creator"))
+    )
+    datetime_fields = TaskInfoFastSerializer.datetime_fields
+
+
 # MemberTaskRelation
 
 class MemberTaskRelationCreateSerializer(serializers.ModelSerializer):
@@ -98,6 +160,26 @@ class MemberTaskRelationCreateSerializer(serializers.ModelSerializer):
         }
 
 
+class BulkMemberTaskRelationCreateSerializer(serializers.Serializer):
+    """
+    ONLY FOR DESEREALIZATION, expects (members or role, can_edit)
+    """
+    members = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=1000,
+        required=False
+    )
+    role = serializers.ChoiceField(choices=Member.RoleChoices.choices, required=False)
+    can_edit = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if ("members" in attrs) == ("role" in attrs):
+            raise serializers.ValidationError("Provide either members or role.")
+
+        return attrs
+
+
 class MemberTaskRelationUpdateSerializer(serializers.ModelSerializer):
     """
     ONLY FOR DESEREALIZATION\n
@@ -0,0 +1,187 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from groups.models import GroupTask, GroupTaskAccess, Member, MemberTaskRelation
+
+
+AccessLevels = GroupTaskAccess.AccessLevels
+
+WRITE_BATCH_SIZE = 500
+
+# scopes waiting for the commit of the thread's transaction
+pending_syncs = threading.local()
+
+# a relation moved to another task leaves both tasks untouched,
+# the new relation's updated_at changes
+RELATION_FINGERPRINT = {
+    "count": Count("pk"),
+    "updated_at": Max("updated_at"),
+    "version": Sum("version")
+}
+
+
+def filter_visible_group_tasks(queryset, user, group_id):
+    """
+    Keeps the group tasks the user is related to or administers
+    """
+    return queryset.filter(
+        pk__in=GroupTaskAccess.objects.filter(
+            user=user,
+            group_id=group_id,
+            access_level__has_any=GroupTaskAccess.VISIBLE_ACCESS
+        ).values("group_task_id")
+    )
+
+
+def get_relation_fingerprint(member):
+    """
+    Expects a non-admin Member object, returns aggregates of its task relations
+    """
+    relations = MemberTaskRelation.objects.filter(member_id=member.pk)
+
+    return relations.aggregate(**RELATION_FINGERPRINT)
+
+
+async def aget_relation_fingerprint(member):
+    relations = MemberTaskRelation.objects.filter(member_id=member.pk)
+
+    return await relations.aaggregate(**RELATION_FINGERPRINT)
+
+
+def get_access_levels(tasks, user_ids=None):
+    """
+    Returns {(user_id, group_task_id): (group_id, access_level)} of the tasks
+    """
+    admin_filter = {"group__members__role__in": Member.ADMIN_ROLES}
+    creator_filter = {"creator__isnull": False}
+    relation_filter = {"group_task__in": tasks.values("pk")}
+
+    if user_ids is not None:
+        admin_filter["group__members__user_id__in"] = user_ids
+        creator_filter["creator__user_id__in"] = user_ids
+        relation_filter["member__user_id__in"] = user_ids
+
+    levels = defaultdict(int)
+    task_groups = {}
+
+    for group_task_id, group_id, user_id in tasks.filter(**admin_filter).values_list(
+        "pk", "group_id", "group__members__user_id"
+    ):
+        levels[(user_id, group_task_id)] |= AccessLevels.ADMIN
+        task_groups[group_task_id] = group_id
+
+    for group_task_id, group_id, user_id in tasks.filter(**creator_filter).values_list(
+        "pk", "group_id", "creator__user_id"
+    ):
+        levels[(user_id, group_task_id)] |= AccessLevels.CREATOR
+        task_groups[group_task_id] = group_id
+
+    relations = MemberTaskRelation.objects.filter(**relation_filter)
+
+    for group_task_id, group_id, user_id, can_edit in relations.values_list(
+        "group_task_id", "group_task__group_id", "member__user_id", "can_edit"
+    ):
+        levels[(user_id, group_task_id)] |= (
+            AccessLevels.RELATED | (AccessLevels.EDITOR if can_edit else 0)
+        )
+        task_groups[group_task_id] = group_id
+
+    return {
+        (user_id, group_task_id): (task_groups[group_task_id], access_level)
+        for (user_id, group_task_id), access_level in levels.items()
+    }
+
+
+def sync_group_task_access(group_id=None, group_task_ids=None, user_ids=None):
+    """
+    Brings GroupTaskAccess rows of the scope in line with the source tables
+    """
+    tasks = GroupTask.objects.all()
+    accesses = GroupTaskAccess.objects.all()
+
+    if group_id is not None:
+        tasks = tasks.filter(group_id=group_id)
+        accesses = accesses.filter(group_id=group_id)
+
+    if group_task_ids is not None:
+        tasks = tasks.filter(pk__in=group_task_ids)
+        accesses = accesses.filter(group_task_id__in=group_task_ids)
+
+    if user_ids is not None:
+        accesses = accesses.filter(user_id__in=user_ids)
+
+    levels = get_access_levels(tasks, user_ids)
+
+    changed_accesses = []
+    deleted_pks = []
+
+    for pk, user_id, group_task_id, access_level in accesses.values_list(
+        "pk", "user_id", "group_task_id", "access_level"
+    ):
+        if (user_id, group_task_id) not in levels:
+            deleted_pks.append(pk)
+            continue
+
+        new_access_level = levels.pop((user_id, group_task_id))[1]
+
+        if new_access_level != access_level:
+            changed_accesses.append(GroupTaskAccess(pk=pk, access_level=new_access_level))
+
+    # the levels left have no row yet
+    new_accesses = [
+        GroupTaskAccess(
+            user_id=user_id,
+            group_id=task_group_id,
+            group_task_id=group_task_id,
+            access_level=access_level
+        )
+        for (user_id, group_task_id), (task_group_id, access_level) in levels.items()
+    ]
+
+    for start in range(0, len(deleted_pks), WRITE_BATCH_SIZE):
+        GroupTaskAccess.objects.filter(pk__in=deleted_pks[start:start + WRITE_BATCH_SIZE]).delete()
+
+    GroupTaskAccess.objects.bulk_update(
+        changed_accesses, ["access_level"], batch_size=WRITE_BATCH_SIZE
+    )
+    # a concurrent sync may have inserted some of the rows since they were read
+    GroupTaskAccess.objects.bulk_create(
+        new_accesses,
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["user", "group_task"],
+        update_fields=["access_level"]
+    )
+
+    return len(new_accesses), len(changed_accesses), len(deleted_pks)
+
+
+def sync_group_task_access_on_commit(group_id=None, group_task_ids=None, user_ids=None):
+    """
+    Syncs the scope once the transaction commits, scopes of one transaction are merged
+    """
+    scopes = pending_syncs.__dict__.setdefault("scopes", {})
+    key = (group_id, None if group_task_ids is None else frozenset(group_task_ids))
+
+    if user_ids is None:
+        scopes[key] = None
+    elif scopes.get(key, ()) is not None:
+        scopes[key] = {*scopes.get(key, ()), *user_ids}
+
+    # registered for every scope, a rolled back savepoint drops its callbacks
+    # and the scopes left behind are synced by the next one
+    transaction.on_commit(sync_pending_group_task_access)
+
+
+def sync_pending_group_task_access():
+    scopes = pending_syncs.__dict__.pop("scopes", {})
+
+    # the request's transaction has committed, the writes of all scopes share one
+    with transaction.atomic():
+        for (group_id, group_task_ids), user_ids in scopes.items():
+            sync_group_task_access(
+                group_id=group_id, group_task_ids=group_task_ids, user_ids=user_ids
+            )
@@ -3,10 +3,9 @@ from django.db import transaction
 from rest_framework.exceptions import PermissionDenied
 
 
-def create_group_task(request_user, group, task_data):
-    request_user_membership = group.members.filter(
-        user=request_user
-    ).first()
+def create_group_task(membership_resolver, group, task_data):
+    request_user = membership_resolver.user
+    request_user_membership = membership_resolver.get_membership(group.pk)
 
     if not request_user.is_staff:
         if not request_user_membership:
@@ -1,8 +1,15 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from core.concurrency import WRITE_ATTEMPTS, WriteConflict, save_versioned
 from groups.exceptions import GroupError
+from groups.models import Member, MemberTaskRelation
+from groups.services.group_task_access import sync_group_task_access_on_commit
+from groups.utils.group_snapshot import GroupSnapshotCache
 
 
 def create_member_task_relation(group_task, target_member, can_edit):
-    if target_member.group != group_task.group:
+    if target_member.group_id != group_task.group_id:
         raise GroupError("This member is from another group.", "another_group_member")
 
     if group_task.related_members.filter(
@@ -10,7 +17,109 @@ def create_member_task_relation(group_task, target_member, can_edit):
     ).exists():
         raise GroupError("This member already has permission for this task.", "already_has_permission")
 
-    return group_task.related_members.create(
-        member=target_member,
-        can_edit=can_edit
+    try:
+        with transaction.atomic():
+            return group_task.related_members.create(
+                member=target_member,
+                can_edit=can_edit
+            )
+    except IntegrityError as error:
+        # a concurrent request related the member after the check
+        raise GroupError(
+            "This member already has permission for this task.", "already_has_permission"
+        ) from error
+
+
+def update_member_task_relation(member_task_relation, fields):
+    """
+    Expects MemberTaskRelation object and field dict
+    """
+    if not fields:
+        return member_task_relation
+
+    for field, value in fields.items():
+        setattr(member_task_relation, field, value)
+
+    return save_versioned(member_task_relation, ["updated_at", *fields.keys()])
+
+
+def create_member_task_relations(group_task, can_edit, member_ids=None, role=None):
+    """
+    Returns {member_id: (relation, error)} of the targeted members
+    """
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        results, new_relations = plan_new_relations(group_task, can_edit, member_ids, role)
+
+        try:
+            with transaction.atomic():
+                MemberTaskRelation.objects.bulk_create(new_relations)
+                # bulk_create does not send post_save
+                sync_group_task_access_on_commit(
+                    group_task_ids=[group_task.pk],
+                    user_ids=[relation.member.user_id for relation in new_relations]
+                )
+        except IntegrityError as error:
+            # unique_member_group_task, a concurrent request related some of the
+            # members after they were read, the next plan reads them again
+            if attempt == WRITE_ATTEMPTS:
+                raise WriteConflict() from error
+
+            continue
+
+        GroupSnapshotCache.invalidate(group_task.group_id)
+
+        return results
+
+
+def plan_new_relations(group_task, can_edit, member_ids, role):
+    """
+    Returns ({member_id: (relation, error)}, unsaved MemberTaskRelation objects)
+    """
+    members = group_task.group.members.select_related("user").annotate(
+        has_relation=Exists(
+            MemberTaskRelation.objects.filter(
+                group_task=group_task,
+                member=OuterRef("pk")
+            )
+        )
     )
+
+    if member_ids is not None:
+        members = members.filter(pk__in=member_ids)
+    else:
+        members = members.filter(role=role)
+
+    results = {}
+    new_relations = []
+
+    for member in members:
+        if member.has_relation:
+            results[member.pk] = (None, GroupError(
+                "This member already has permission for this task.", "already_has_permission"
+            ))
+            continue
+
+        relation = MemberTaskRelation(
+            member=member,
+            group_task=group_task,
+            can_edit=can_edit
+        )
+        new_relations.append(relation)
+        results[member.pk] = (relation, None)
+
+    missing_member_ids = [member_id for member_id in member_ids or () if member_id not in results]
+    # only the ids outside the group are looked up again
+    other_group_member_ids = set(
+        Member.objects.filter(pk__in=missing_member_ids).values_list("pk", flat=True)
+    ) if missing_member_ids else set()
+
+    for member_id in missing_member_ids:
+        if member_id in other_group_member_ids:
+            results[member_id] = (
+                None,
+                GroupError("This member is from another group.", "another_group_member")
+            )
+        else:
+            results[member_id] = (None, GroupError("Member not found.", "member_not_found"))
+
+    return results, new_relations
@@ -1,65 +1,127 @@
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.exceptions import NotFound, ValidationError, PermissionDenied
 
+from core.concurrency import WRITE_ATTEMPTS, WriteConflict, update_returning
 from groups.exceptions import GroupError
 from groups.models import Member
+from groups.services.group_task_access import sync_group_task_access_on_commit
+from groups.utils.group_snapshot import GroupSnapshotCache
+from groups.utils.membership_claims import bump_membership_versions
 
 
-def transfer_group_ownership(new_owner):
+User = get_user_model()
+
+
+def request_user_has_role(request_user, *roles):
     """
-    Takes in a Member object
+    Returns a condition true while the request user has one of the roles in the group
     """
-    with transaction.atomic():
-        group = new_owner.group
-        current_owner = group.members.select_for_update().filter(
-            role=Member.RoleChoices.OWNER
-        ).first()
+    return Exists(Member.objects.filter(
+        group_id=OuterRef("group_id"),
+        user_id=request_user.pk,
+        role__in=roles
+    ))
 
-        if current_owner:
-            current_owner.role = Member.RoleChoices.ADMIN
-            current_owner.save()
 
-        new_owner.role = Member.RoleChoices.OWNER
-        new_owner.save()
+def apply_member_changes(group_id, user_ids):
+    """
+    Does what Member receivers would for members written by bulk_create or update()
+    """
+    GroupSnapshotCache.invalidate(group_id)
+    sync_group_task_access_on_commit(group_id=group_id, user_ids=user_ids)
+    bump_membership_versions(*user_ids)
 
 
-def create_member(request_user, group, target_user_id, role):
-    if not request_user.is_staff:
-        request_user_membership = group.members.filter(
-            user=request_user,
-            group=group
-        ).first()
+def transfer_group_ownership(new_owner, current_owner_user_id=None):
+    """
+    Demotes the owner to admin and promotes the member, call inside a transaction
+    """
+    now = timezone.now()
+    owners = Member.objects.filter(
+        group_id=new_owner.group_id,
+        role=Member.RoleChoices.OWNER
+    ).exclude(pk=new_owner.pk)
 
-        if not request_user_membership:
-            raise PermissionDenied("You are not a member of this group.")
+    if current_owner_user_id is not None:
+        owners = owners.filter(user_id=current_owner_user_id)
 
-        if request_user_membership.role not in Member.ADMIN_ROLES:
-            raise PermissionDenied("You are not allowed to add members to this group.")
+    # unique_group_owner is checked row by row, so one UPDATE ... CASE swapping
+    # both roles would fail whenever it reaches the new owner first
+    demoted_user_ids = [
+        user_id for user_id, in update_returning(
+            owners, ["user_id"], role=Member.RoleChoices.ADMIN, updated_at=now
+        )
+    ]
 
-        if request_user_membership.role == Member.RoleChoices.ADMIN:
-            if role in Member.ADMIN_ROLES:
-                raise PermissionDenied("You are not allowed to assign this role.")
+    if current_owner_user_id is not None and not demoted_user_ids:
+        raise PermissionDenied("You are not allowed to manage roles in this group.")
+
+    promoted = Member.objects.filter(pk=new_owner.pk).update(
+        role=Member.RoleChoices.OWNER, updated_at=now
+    )
+
+    if not promoted:
+        raise NotFound("Member not found.")
+
+    new_owner.role = Member.RoleChoices.OWNER
+    new_owner.updated_at = now
+    apply_member_changes(new_owner.group_id, [*demoted_user_ids, new_owner.user_id])
+
+
+def check_member_can_be_created(membership_resolver, group_id, role):
+    request_user = membership_resolver.user
+
+    if request_user.is_staff:
+        return
+
+    request_user_membership = membership_resolver.get_membership(group_id)
+
+    if not request_user_membership:
+        raise PermissionDenied("You are not a member of this group.")
 
-    if group.members.filter(user_id=target_user_id).exists():
-        raise GroupError("This user is already a member of this group", "already_member")
+    if request_user_membership.role not in Member.ADMIN_ROLES:
+        raise PermissionDenied("You are not allowed to add members to this group.")
+
+    if request_user_membership.role == Member.RoleChoices.ADMIN:
+        if role in Member.ADMIN_ROLES:
+            raise PermissionDenied("You are not allowed to assign this role.")
+
+
+def create_member(membership_resolver, group, target_user_id, role):
+    request_user = membership_resolver.user
+    check_member_can_be_created(membership_resolver, group.pk, role)
 
     with transaction.atomic():
-        new_member = group.members.create(
-            user_id=target_user_id,
-            role=role
-        )
+        try:
+            # the new owner is inserted as admin and promoted by transfer_group_ownership
+            new_member = group.members.create(
+                user_id=target_user_id,
+                role=Member.RoleChoices.ADMIN if role == Member.RoleChoices.OWNER else role
+            )
+        except IntegrityError as error:
+            # unique_user_group, checked by the INSERT instead of a read before it
+            raise GroupError(
+                "This user is already a member of this group", "already_member"
+            ) from error
+
+        bump_membership_versions(target_user_id)
+
         if role == Member.RoleChoices.OWNER:
-            transfer_group_ownership(new_member)
+            transfer_group_ownership(new_member, None if request_user.is_staff else request_user.pk)
+            membership_resolver.forget(group.pk)
 
     return new_member
 
 
-def update_member_role(request_user, target_member, role):
+def check_member_role_can_be_updated(membership_resolver, target_member, role):
+    request_user = membership_resolver.user
+
     if not request_user.is_staff:
-        request_user_membership = target_member.group.members.filter(
-            user=request_user
-        ).first()
+        request_user_membership = membership_resolver.get_membership(target_member.group_id)
 
         if not request_user_membership:
             raise PermissionDenied("You are not a member of this group.")
@@ -71,27 +133,56 @@ def update_member_role(request_user, target_member, role):
         if role != Member.RoleChoices.OWNER:
             raise ValidationError({"detail":"A group should always have an owner. Transfer ownership instead."})
 
+
+def update_member_role(membership_resolver, target_member, role):
+    """
+    Expects membership resolver, Member object and the new role
+    """
+    request_user = membership_resolver.user
+    check_member_role_can_be_updated(membership_resolver, target_member, role)
+
+    if target_member.role == role:
+        return target_member
+
     with transaction.atomic():
-        if role == Member.RoleChoices.OWNER and target_member.role != Member.RoleChoices.OWNER:
-            transfer_group_ownership(target_member)
+        if role == Member.RoleChoices.OWNER:
+            transfer_group_ownership(
+                target_member, None if request_user.is_staff else request_user.pk
+            )
         else:
-            if target_member.role != role:
-                target_member.role = role
-                target_member.save()
+            members = Member.objects.filter(pk=target_member.pk).exclude(
+                role=Member.RoleChoices.OWNER
+            )
+
+            if not request_user.is_staff:
+                members = members.filter(
+                    request_user_has_role(request_user, Member.RoleChoices.OWNER)
+                )
+
+            now = timezone.now()
+
+            if not members.update(role=role, updated_at=now):
+                raise_member_conflict(
+                    membership_resolver, target_member, check_member_role_can_be_updated, role
+                )
+
+            target_member.role = role
+            target_member.updated_at = now
+            apply_member_changes(target_member.group_id, [target_member.user_id])
+
+    membership_resolver.forget(target_member.group_id)
 
     return target_member
 
-def delete_member(request_user, target_member):
-    is_trying_to_leave = request_user == target_member.user
 
-    if is_trying_to_leave and target_member.role != Member.RoleChoices.OWNER:
-        target_member.delete()
+def check_member_can_be_removed(membership_resolver, target_member):
+    request_user = membership_resolver.user
+
+    if request_user.pk == target_member.user_id and target_member.role != Member.RoleChoices.OWNER:
         return
 
     if not request_user.is_staff:
-        request_user_membership = target_member.group.members.filter(
-            user=request_user
-        ).first()
+        request_user_membership = membership_resolver.get_membership(target_member.group_id)
 
         if not request_user_membership:
             raise PermissionDenied("You are not a member of this group.")
@@ -106,4 +197,144 @@ def delete_member(request_user, target_member):
     if target_member.role == Member.RoleChoices.OWNER:
         raise ValidationError({"detail":"A group should always have an owner. Transfer ownership first."})
 
-    target_member.delete()
+
+def delete_member(membership_resolver, target_member):
+    """
+    Expects membership resolver and Member object
+    """
+    request_user = membership_resolver.user
+    check_member_can_be_removed(membership_resolver, target_member)
+
+    members = Member.objects.filter(pk=target_member.pk).exclude(role=Member.RoleChoices.OWNER)
+
+    if request_user.pk != target_member.user_id and not request_user.is_staff:
+        # owners remove anyone but themselves, admins only default members
+        members = members.filter(
+            request_user_has_role(request_user, Member.RoleChoices.OWNER)
+            | (
+                request_user_has_role(request_user, Member.RoleChoices.ADMIN)
+                & Q(role=Member.RoleChoices.DEFAULT)
+            )
+        )
+
+    with transaction.atomic():
+        # the guards are part of the DELETE, the row is read again only if it matched nothing
+        _, deleted = members.delete()
+
+        if not deleted.get(Member._meta.label):
+            raise_member_conflict(membership_resolver, target_member, check_member_can_be_removed)
+
+        bump_membership_versions(target_member.user_id)
+
+    membership_resolver.forget(target_member.group_id)
+
+
+def raise_member_conflict(membership_resolver, target_member, check, *args):
+    """
+    Raises what the repeated check raises now, NotFound or WriteConflict
+    """
+    membership_resolver.forget(target_member.group_id)
+    current = Member.objects.filter(pk=target_member.pk).first()
+
+    if current is None:
+        raise NotFound("Member not found.")
+
+    check(membership_resolver, current, *args)
+
+    raise WriteConflict()
+
+
+def create_members(membership_resolver, group, entries):
+    """
+    Returns {index: (member, error)} of the validated entries
+    """
+    request_user = membership_resolver.user
+    request_user_role = None
+
+    if not request_user.is_staff:
+        request_user_membership = membership_resolver.get_membership(group.pk)
+
+        if not request_user_membership:
+            raise PermissionDenied("You are not a member of this group.")
+
+        if request_user_membership.role not in Member.ADMIN_ROLES:
+            raise PermissionDenied("You are not allowed to add members to this group.")
+
+        request_user_role = request_user_membership.role
+
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        results, new_members, new_owner = plan_new_members(group, entries, request_user_role)
+
+        try:
+            with transaction.atomic():
+                Member.objects.bulk_create(new_members)
+                apply_member_changes(group.pk, [member.user_id for member in new_members])
+
+                if new_owner is not None:
+                    transfer_group_ownership(
+                        new_owner, None if request_user.is_staff else request_user.pk
+                    )
+                    membership_resolver.forget(group.pk)
+        except IntegrityError as error:
+            # unique_user_group, a concurrent request added some of the users (or
+            # removed one) after they were read, the next plan reads them again
+            if attempt == WRITE_ATTEMPTS:
+                raise WriteConflict() from error
+
+            continue
+
+        return results
+
+
+def plan_new_members(group, entries, request_user_role):
+    """
+    Returns ({index: (member, error)}, unsaved Member objects, the new owner or None)
+    """
+    user_ids = {entry["user"] for entry in entries}
+    users = User.objects.in_bulk(user_ids)
+    existing_user_ids = set(
+        group.members.filter(user_id__in=user_ids).values_list("user_id", flat=True)
+    )
+
+    results = {}
+    new_members = []
+    new_owner = None
+    seen_user_ids = set()
+
+    for entry in entries:
+        index, user_id, role = entry["index"], entry["user"], entry["role"]
+
+        if user_id not in users:
+            results[index] = (None, GroupError("User does not exist.", "user_not_found"))
+        elif user_id in existing_user_ids:
+            results[index] = (None, GroupError(
+                "This user is already a member of this group", "already_member"
+            ))
+        elif user_id in seen_user_ids:
+            results[index] = (None, GroupError(
+                "This user is listed more than once.", "duplicate_user"
+            ))
+        elif request_user_role == Member.RoleChoices.ADMIN and role in Member.ADMIN_ROLES:
+            results[index] = (None, GroupError(
+                "You are not allowed to assign this role.", "role_not_allowed"
+            ))
+        elif role == Member.RoleChoices.OWNER and new_owner is not None:
+            results[index] = (None, GroupError(
+                "A group can only have one owner.", "multiple_owners"
+            ))
+        else:
+            seen_user_ids.add(user_id)
+            # the new owner is inserted as admin and promoted by transfer_group_ownership
+            member = Member(
+                group=group,
+                user=users[user_id],
+                role=Member.RoleChoices.ADMIN if role == Member.RoleChoices.OWNER else role
+            )
+
+            if role == Member.RoleChoices.OWNER:
+                new_owner = member
+
+            new_members.append(member)
+            results[index] = (member, None)
+
+    return results, new_members, new_owner
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Group, GroupTask, Member, MemberTaskRelation
+from .services.group_task_access import sync_group_task_access_on_commit
+from .utils.group_snapshot import GroupSnapshotCache
+
+
+User = get_user_model()
+
+
+def is_group_cascade(instance, origin):
+    # a group, task or member the deletion started from invalidates and syncs the group itself
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+
+    return origin_model in (Group, GroupTask, Member) and not isinstance(instance, origin_model)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(instance, **kwargs):
+    GroupSnapshotCache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=GroupTask)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=GroupTask)
+@receiver(post_delete, sender=Member)
+def invalidate_group_of_instance(instance, origin=None, **kwargs):
+    if is_group_cascade(instance, origin):
+        return
+
+    GroupSnapshotCache.invalidate(instance.group_id)
+
+
+@receiver(post_save, sender=MemberTaskRelation)
+@receiver(post_delete, sender=MemberTaskRelation)
+def invalidate_group_of_relation(instance, origin=None, **kwargs):
+    if is_group_cascade(instance, origin):
+        return
+
+    group_task_field = MemberTaskRelation._meta.get_field("group_task")
+    member_field = MemberTaskRelation._meta.get_field("member")
+
+    if group_task_field.is_cached(instance):
+        group_id = instance.group_task.group_id
+    elif member_field.is_cached(instance):
+        group_id = instance.member.group_id
+    else:
+        group_id = Member.objects.filter(pk=instance.member_id).values_list(
+            "group_id", flat=True
+        ).first()
+
+    if group_id is not None:
+        GroupSnapshotCache.invalidate(group_id)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def sync_access_of_member(instance, origin=None, **kwargs):
+    # deleting a group or task removes its accesses through the foreign key
+    if is_group_cascade(instance, origin):
+        return
+
+    sync_group_task_access_on_commit(group_id=instance.group_id, user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=GroupTask)
+def sync_access_of_group_task(instance, created, **kwargs):
+    # admins and the creator get access, later saves do not change either
+    if created:
+        sync_group_task_access_on_commit(group_task_ids=[instance.pk])
+
+
+@receiver(post_save, sender=MemberTaskRelation)
+@receiver(post_delete, sender=MemberTaskRelation)
+def sync_access_of_relation(instance, origin=None, **kwargs):
+    if is_group_cascade(instance, origin):
+        return
+
+    if MemberTaskRelation._meta.get_field("member").is_cached(instance):
+        user_id = instance.member.user_id
+    else:
+        user_id = Member.objects.filter(pk=instance.member_id).values_list(
+            "user_id", flat=True
+        ).first()
+
+    if user_id is not None:
+        sync_group_task_access_on_commit(
+            group_task_ids=[instance.group_task_id], user_ids=[user_id]
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_groups_of_user(instance, created, update_fields=None, **kwargs):
+    # snapshots show nicknames of members and task creators
+    if created or (update_fields is not None and "nickname" not in update_fields):
+        return
+
+    group_ids = list(instance.memberships.values_list("group_id", flat=True))
+
+    if group_ids:
+        GroupSnapshotCache.invalidate(*group_ids)
@@ -1,3 +1,996 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models import Count, F
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+from tasks.models import UserTask
+from tasks.serializers import TaskInfoFastSerializer, TaskInfoSerializer
+from tasks.tests import (
+    CommitCallbacksClient, clear_caches, get_async_client, get_client, get_query_plans,
+    get_response_body, get_sync_and_async_responses
+)
+from users.authentication import CachedJWTAuthentication
+
+from .serializers import (
+    GroupListFastSerializer, GroupListSerializer, GroupTaskInfoFastSerializer,
+    GroupTaskInfoSerializer, MemberInfoFastSerializer, MemberInfoSerializer
+)
+from .views import GroupDetailView
+from .models import Group, GroupTask, GroupTaskAccess, Member, MemberTaskRelation
+from .services import group_task_access, member_task_relation_management, membership_management
+
+
+User = get_user_model()
+
+
+def create_user(name, **extra_fields):
+    return User.objects.create_user(f"{name}@example.com", nickname=name, **extra_fields)
+
+
+# requests over their query_budget fail the test
+@override_settings(QUERY_BUDGET_MODE="raise")
+class GroupTestCase(TestCase):
+    def setUp(self):
+        # snapshots and cached JWT users would hide queries between requests
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+        self.owner = create_user("owner")
+        self.group = Group.objects.create(name="group")
+        self.owner_member = Member.objects.create(
+            user=self.owner, group=self.group, role=Member.RoleChoices.OWNER
+        )
+        self.user_count = 0
+
+    def add_user(self):
+        self.user_count += 1
+
+        return create_user(f"user-{self.user_count}")
+
+    def add_members(self, count, group=None, role=Member.RoleChoices.DEFAULT):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                Member.objects.create(user=self.add_user(), group=group or self.group, role=role)
+                for _ in range(count)
+            ]
+
+    def add_tasks(self, count, creator, related=()):
+        tasks = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(count):
+                task = GroupTask.objects.create(
+                    group_id=creator.group_id,
+                    creator=creator,
+                    description=f"task {index}",
+                    due_date=timezone.now() + timedelta(days=index + 1)
+                )
+
+                for member in related:
+                    MemberTaskRelation.objects.create(member=member, group_task=task)
+
+                tasks.append(task)
+
+        return tasks
+
+    def assert_access_consistent(self):
+        expected = {
+            (user_id, group_task_id, group_id, access_level)
+            for (user_id, group_task_id), (group_id, access_level) in
+            group_task_access.get_access_levels(GroupTask.objects.all()).items()
+        }
+        rows = set(GroupTaskAccess.objects.values_list(
+            "user_id", "group_task_id", "group_id", "access_level"
+        ))
+
+        self.assertEqual(rows, expected)
+
+    def count_queries(self, user, url):
+        clear_caches()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = get_client(user).get(url)
+
+        self.assertEqual(response.status_code, 200, response.content)
+
+        return len(queries)
+
+
+class GroupQueryCountTests(GroupTestCase):
+    """
+    Group list and detail resolve the caller's membership once,
+    their query count does not depend on the group's size
+    """
+    def test_group_list(self):
+        member = self.add_members(1)[0]
+        queries = self.count_queries(member.user, "/api/groups/")
+
+        for index in range(5):
+            group = Group.objects.create(name=f"group {index}")
+            Member.objects.create(user=member.user, group=group)
+            self.add_members(10, group)
+
+        self.assertEqual(self.count_queries(member.user, "/api/groups/"), queries)
+
+    def test_group_detail_as_admin(self):
+        url = f"/api/groups/{self.group.pk}/"
+        queries = self.count_queries(self.owner, url)
+
+        members = self.add_members(20)
+        self.add_tasks(15, self.owner_member, members[:3])
+
+        self.assertEqual(self.count_queries(self.owner, url), queries)
+
+    def test_group_detail_as_member(self):
+        url = f"/api/groups/{self.group.pk}/"
+        member = self.add_members(1)[0]
+        queries = self.count_queries(member.user, url)
+
+        members = self.add_members(20)
+        self.add_tasks(15, self.owner_member, [member, *members[:2]])
+
+        self.assertEqual(self.count_queries(member.user, url), queries)
+
+
+class GroupTaskIndexTests(GroupTestCase):
+    """
+    Group task lists and group detail seek the (group, due_date) indexes (counts may
+    seek any index), plain members' visible tasks the access table
+    """
+    def setUp(self):
+        super().setUp()
+        self.member = self.add_members(1)[0]
+        self.add_tasks(20, self.owner_member, [self.member])
+        GroupTask.objects.filter(pk__in=GroupTask.objects.values("pk")[:5]).update(is_closed=True)
+
+        self.urls = (
+            f"/api/groups/{self.group.pk}/tasks/",
+            f"/api/groups/{self.group.pk}/tasks/?current=true",
+            f"/api/groups/{self.group.pk}/tasks/?current=false",
+            f"/api/groups/{self.group.pk}/",
+        )
+
+    def test_admin_uses_due_date_indexes(self):
+        index_names = [index.name for index in GroupTask._meta.indexes]
+
+        for url in self.urls:
+            clear_caches()
+            plans = get_query_plans(get_client(self.owner), url, GroupTask._meta.db_table)
+            self.assertTrue(plans)
+
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    self.assertTrue(any(
+                        detail.startswith(f"SEARCH {GroupTask._meta.db_table} USING")
+                        and ("COUNT(" in sql or any(name in detail for name in index_names))
+                        for detail in plan
+                    ), plan)
+
+    def test_member_does_not_scan(self):
+        for url in self.urls:
+            clear_caches()
+
+            plans = get_query_plans(get_client(self.member.user), url, GroupTask._meta.db_table)
+
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    # subqueries name the access table by an alias, no table is scanned
+                    self.assertFalse(any(detail.startswith("SCAN ") for detail in plan), plan)
+
+
+class MemberBulkCreateTests(GroupTestCase):
+    def test_concurrently_added_user_is_reported(self):
+        users = [create_user(f"invited-{index}") for index in range(3)]
+        plan_new_members = membership_management.plan_new_members
+
+        def plan_then_add_member(*args):
+            plan = plan_new_members(*args)
+
+            # another request adds the second user after the batch read the members
+            if not Member.objects.filter(user=users[1], group=self.group).exists():
+                Member.objects.create(user=users[1], group=self.group)
+
+            return plan
+
+        with mock.patch.object(
+            membership_management, "plan_new_members", side_effect=plan_then_add_member
+        ) as plan:
+            response = get_client(self.owner).post(
+                f"/api/groups/{self.group.pk}/members/bulk/",
+                {"members": [
+                    {"user": user.pk, "role": Member.RoleChoices.DEFAULT} for user in users
+                ]},
+                format="json"
+            )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        # the first INSERT hit unique_user_group and rolled back, the second plan saw the member
+        self.assertEqual(plan.call_count, 2)
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], ["ok", "error", "ok"])
+        self.assertEqual(results[1]["errors"]["code"], "already_member")
+        self.assertEqual(
+            set(self.group.members.values_list("user_id", flat=True)),
+            {self.owner.pk, *(user.pk for user in users)}
+        )
+
+
+    def test_repeated_conflicts(self):
+        user = create_user("invited")
+
+        with mock.patch.object(Member.objects, "bulk_create", side_effect=IntegrityError):
+            response = get_client(self.owner).post(
+                f"/api/groups/{self.group.pk}/members/bulk/",
+                {"members": [{"user": user.pk, "role": Member.RoleChoices.DEFAULT}]},
+                format="json"
+            )
+
+        # the request sent no precondition, the conflict is not a 412
+        self.assertEqual(response.status_code, 409, response.content)
+
+
+class MemberDeleteTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin, self.member = self.add_members(2)
+        Member.objects.filter(pk=self.admin.pk).update(role=Member.RoleChoices.ADMIN)
+        self.url = f"/api/members/{self.member.pk}/"
+
+    def test_delete(self):
+        response = get_client(self.admin.user).delete(self.url)
+
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assertFalse(Member.objects.filter(pk=self.member.pk).exists())
+
+    def test_target_changed_after_the_check(self):
+        check_member_can_be_removed = membership_management.check_member_can_be_removed
+
+        def check_then_promote(membership_resolver, target_member):
+            check_member_can_be_removed(membership_resolver, target_member)
+
+            # another request makes the member an admin, admins can not remove admins
+            if check.call_count == 1:
+                Member.objects.filter(pk=target_member.pk).update(role=Member.RoleChoices.ADMIN)
+
+        with mock.patch.object(
+            membership_management, "check_member_can_be_removed", side_effect=check_then_promote
+        ) as check:
+            response = get_client(self.admin.user).delete(self.url)
+
+        self.assertEqual(response.status_code, 403, response.content)
+        self.assertEqual(check.call_count, 2)
+        self.assertTrue(Member.objects.filter(pk=self.member.pk).exists())
+
+    def test_target_deleted_after_the_check(self):
+        check_member_can_be_removed = membership_management.check_member_can_be_removed
+
+        def check_then_delete(membership_resolver, target_member):
+            check_member_can_be_removed(membership_resolver, target_member)
+            Member.objects.filter(pk=target_member.pk).delete()
+
+        with mock.patch.object(
+            membership_management, "check_member_can_be_removed", side_effect=check_then_delete
+        ):
+            response = get_client(self.admin.user).delete(self.url)
+
+        self.assertEqual(response.status_code, 404, response.content)
+
+
+class MemberTaskRelationBulkCreateTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group_task = self.add_tasks(1, self.owner_member)[0]
+        self.url = f"/api/group-tasks/{self.group_task.pk}/permissions/bulk/"
+
+    def post(self, data):
+        response = get_client(self.owner).post(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        return {result["member"]: result for result in response.json()["results"]}
+
+    def test_role_targets_its_members(self):
+        members = self.add_members(2)
+        admin = self.add_members(1, role=Member.RoleChoices.ADMIN)[0]
+
+        results = self.post({"role": Member.RoleChoices.DEFAULT, "can_edit": True})
+
+        self.assertEqual(set(results), {member.pk for member in members})
+        self.assertTrue(all(result["status"] == "ok" for result in results.values()))
+        self.assertEqual(
+            set(self.group_task.related_members.values_list("member_id", "can_edit")),
+            {(member.pk, True) for member in members}
+        )
+        self.assertFalse(self.group_task.related_members.filter(member=admin).exists())
+
+    def test_existing_relations_are_skipped(self):
+        related, unrelated = self.add_members(2)
+        relation = MemberTaskRelation.objects.create(member=related, group_task=self.group_task)
+
+        results = self.post({"role": Member.RoleChoices.DEFAULT, "can_edit": True})
+
+        self.assertEqual(results[related.pk]["status"], "skipped")
+        self.assertEqual(results[related.pk]["errors"]["code"], "already_has_permission")
+        self.assertEqual(results[unrelated.pk]["status"], "ok")
+        # the skipped relation keeps its own permissions
+        relation.refresh_from_db()
+        self.assertFalse(relation.can_edit)
+
+    def test_mixed_member_ids(self):
+        related, unrelated = self.add_members(2)
+        MemberTaskRelation.objects.create(member=related, group_task=self.group_task)
+        other_group = Group.objects.create(name="other group")
+        other_group_member = self.add_members(1, other_group)[0]
+        missing_member_id = other_group_member.pk + 1000
+
+        results = self.post({
+            "members": [related.pk, unrelated.pk, other_group_member.pk, missing_member_id]
+        })
+
+        self.assertEqual(
+            {member_id: result["status"] for member_id, result in results.items()},
+            {
+                related.pk: "skipped",
+                unrelated.pk: "ok",
+                other_group_member.pk: "error",
+                missing_member_id: "error"
+            }
+        )
+        self.assertEqual(results[other_group_member.pk]["errors"]["code"], "another_group_member")
+        self.assertEqual(results[missing_member_id]["errors"]["code"], "member_not_found")
+        self.assertEqual(
+            set(self.group_task.related_members.values_list("member_id", flat=True)),
+            {related.pk, unrelated.pk}
+        )
+
+    def test_repeated_conflicts(self):
+        member = self.add_members(1)[0]
+
+        with mock.patch.object(
+            MemberTaskRelation.objects, "bulk_create", side_effect=IntegrityError
+        ):
+            response = get_client(self.owner).post(
+                self.url, {"members": [member.pk], "can_edit": False}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 409, response.content)
+
+
+class GroupTaskListConditionalGetTests(GroupTestCase):
+    def test_swapped_relation_changes_etag(self):
+        member = self.add_members(1)[0]
+        tasks = self.add_tasks(3, self.owner_member)
+        with self.captureOnCommitCallbacks(execute=True):
+            relation = MemberTaskRelation.objects.create(member=member, group_task=tasks[2])
+        client = get_client(member.user)
+        url = f"/api/groups/{self.group.pk}/tasks/"
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        # the member sees another task, no task row is touched
+        with self.captureOnCommitCallbacks(execute=True):
+            relation.delete()
+            MemberTaskRelation.objects.create(member=member, group_task=tasks[0])
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row["pk"] for row in response.json()["results"]], [tasks[0].pk])
+
+
+class GroupDetailConditionalGetTests(GroupTestCase):
+    def test_conditional_get(self):
+        client = get_client(self.owner)
+        url = f"/api/groups/{self.group.pk}/"
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        for headers in ({"HTTP_IF_NONE_MATCH": etag}, {"HTTP_IF_MODIFIED_SINCE": last_modified}):
+            with self.subTest(headers=headers):
+                not_modified = client.get(url, **headers)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified["ETag"], etag)
+
+        response = client.patch(url, {"name": "renamed"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["name"], "renamed")
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertGreater(
+            parse_http_date(response["Last-Modified"]), parse_http_date(last_modified)
+        )
+
+        # Last-Modified is kept where every worker reads it, not in the local cache
+        caches["default"].clear()
+        self.assertEqual(
+            client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304
+        )
+
+
+class GroupSnapshotTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.owner)
+        self.url = f"/api/groups/{self.group.pk}/"
+
+    def get_detail(self, etag=None):
+        if etag is None:
+            response = self.client.get(self.url)
+        else:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertIn(response.status_code, (200, 304), response.content)
+
+        return response
+
+    def test_member_change_invalidates_snapshot(self):
+        etag = self.get_detail()["ETag"]
+        self.assertEqual(self.get_detail(etag).status_code, 304)
+
+        member = self.add_members(1)[0]
+
+        response = self.get_detail(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(member.pk, [row["pk"] for row in response.json()["members"]])
+
+        etag = response["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.delete()
+
+        response = self.get_detail(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(member.pk, [row["pk"] for row in response.json()["members"]])
+
+    def test_task_change_invalidates_snapshot(self):
+        task = self.add_tasks(1, self.owner_member)[0]
+        etag = self.get_detail()["ETag"]
+
+        task.description = "changed"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+
+        response = self.get_detail(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["description"] for row in response.json()["tasks"]], ["changed"])
+
+    def test_invalidation_waits_for_the_commit(self):
+        task = self.add_tasks(1, self.owner_member)[0]
+        etag = self.get_detail()["ETag"]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            task.description = "changed"
+            task.save()
+
+            # a request before the commit must not cache the uncommitted rows
+            self.assertEqual(self.get_detail(etag).status_code, 304)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.get_detail(etag).status_code, 200)
+
+
+class FastSerializerTests(GroupTestCase):
+    """
+    Fast serializers over values() rows return what the DRF serializers return
+    """
+    def assert_same_output(self, queryset, serializer_class, fast_serializer_class):
+        self.assertTrue(queryset.exists())
+        self.assertEqual(
+            fast_serializer_class(fast_serializer_class.get_values(queryset)).data,
+            serializer_class(queryset, many=True).data
+        )
+
+    def test_task(self):
+        user_task = UserTask.objects.create(user=self.owner, description="task")
+        UserTask.objects.create(user=self.owner, description="no due date", is_closed=True)
+        UserTask.objects.filter(pk=user_task.pk).update(due_date=timezone.now() - timedelta(days=1))
+
+        self.assert_same_output(
+            UserTask.objects.with_currentness(timezone.now()).order_by("pk"),
+            TaskInfoSerializer,
+            TaskInfoFastSerializer
+        )
+
+    def test_group_task(self):
+        member = self.add_members(1)[0]
+        self.add_tasks(2, member)
+        GroupTask.objects.create(group=self.group, description="no creator")
+
+        self.assert_same_output(
+            GroupTask.objects.with_currentness(timezone.now()).select_related(
+                "creator__user"
+            ).order_by("pk"),
+            GroupTaskInfoSerializer,
+            GroupTaskInfoFastSerializer
+        )
+
+    def test_member(self):
+        self.add_members(2, role=Member.RoleChoices.ADMIN)
+
+        self.assert_same_output(
+            self.group.members.select_related("user").order_by("pk"),
+            MemberInfoSerializer,
+            MemberInfoFastSerializer
+        )
+
+    def test_group_row(self):
+        other_group = Group.objects.create(name="other group")
+        Member.objects.create(user=self.owner, group=other_group)
+
+        self.assert_same_output(
+            Group.objects.filter(members__user=self.owner).annotate(
+                joined_at=F("members__joined_at")
+            ).order_by("pk"),
+            GroupListSerializer,
+            GroupListFastSerializer
+        )
+
+
+class SparseFieldsTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.owner)
+        self.group_task = self.add_tasks(1, self.owner_member)[0]
+        self.list_url = f"/api/groups/{self.group.pk}/tasks/"
+        self.detail_url = f"/api/group-tasks/{self.group_task.pk}/"
+
+    def get(self, url, status_code=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code, response.content)
+
+        return response.json()
+
+    def test_fields(self):
+        for url, fields in (
+            (f"{self.list_url}?fields=pk,description", {"pk", "description"}),
+            (f"/api/groups/{self.group.pk}/members/?fields=pk,role", {"pk", "role"}),
+        ):
+            with self.subTest(url=url):
+                rows = self.get(url)["results"]
+                self.assertTrue(rows)
+                self.assertTrue(all(set(row) == fields for row in rows), rows)
+
+        self.assertEqual(
+            self.get(f"{self.detail_url}?fields=pk,is_current"),
+            {"pk": self.group_task.pk, "is_current": True}
+        )
+
+    def test_expand_creator(self):
+        for url, get_creator in (
+            (self.list_url, lambda data: data["results"][0]["creator"]),
+            (self.detail_url, lambda data: data["creator"]),
+        ):
+            with self.subTest(url=url):
+                creator = get_creator(self.get(url))
+                self.assertEqual(creator["nickname"], self.owner.nickname)
+
+                # a field that is not expanded is the related pk
+                self.assertEqual(
+                    get_creator(self.get(f"{url}?fields=pk,creator")), self.owner_member.pk
+                )
+                self.assertEqual(
+                    get_creator(self.get(f"{url}?fields=pk,creator&expand=creator")), creator
+                )
+
+    def test_unknown_names(self):
+        for url in (self.list_url, self.detail_url):
+            for query, param in (("fields=pk,secret", "fields"), ("expand=description", "expand")):
+                with self.subTest(url=url, query=query):
+                    self.assertIn(param, self.get(f"{url}?{query}", status_code=400))
+
+    def test_task_list_is_limited_to_the_url_group(self):
+        other_group = Group.objects.create(name="other group")
+        other_owner_member = Member.objects.create(
+            user=self.owner, group=other_group, role=Member.RoleChoices.OWNER
+        )
+        self.add_tasks(2, other_owner_member)
+        staff = create_user("staff", is_staff=True)
+
+        for user in (self.owner, staff):
+            with self.subTest(user=user.nickname):
+                response = get_client(user).get(self.list_url)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(
+                    [row["pk"] for row in response.json()["results"]], [self.group_task.pk]
+                )
+
+
+class AsyncViewTests(GroupTestCase):
+    """
+    The async group, member and group task views answer what their sync twins answer
+    """
+    def setUp(self):
+        super().setUp()
+        self.member, self.admin = self.add_members(2)
+        Member.objects.filter(pk=self.admin.pk).update(role=Member.RoleChoices.ADMIN)
+        tasks = self.add_tasks(4, self.owner_member, [self.member])
+        self.add_tasks(2, self.owner_member)
+        GroupTask.objects.filter(pk=tasks[0].pk).update(is_closed=True)
+        self.outsider = create_user("outsider")
+        self.staff = create_user("staff", is_staff=True)
+
+    async def test_same_response_as_sync_view(self):
+        group_pk = self.group.pk
+
+        for path in (
+            f"groups/{group_pk}/",
+            f"groups/{group_pk}/members/",
+            f"groups/{group_pk}/members/?fields=pk,nickname&ordering=-nickname",
+            f"groups/{group_pk}/tasks/",
+            f"groups/{group_pk}/tasks/?closed=false&fields=pk,creator&expand=creator",
+            f"groups/{group_pk}/tasks/?pagination=cursor",
+            f"groups/{group_pk + 1}/tasks/",
+        ):
+            for user in (self.owner, self.admin.user, self.member.user, self.outsider, self.staff):
+                with self.subTest(path=path, user=user.nickname):
+                    response, async_response = await get_sync_and_async_responses(user, path)
+
+                    self.assertNotEqual(response.status_code, 401, response.content)
+                    self.assertEqual(async_response.status_code, response.status_code)
+                    self.assertEqual(
+                        get_response_body(async_response), get_response_body(response)
+                    )
+
+
+class MembershipClaimTests(GroupTestCase):
+    def test_claims_replace_the_membership_query(self):
+        admin = self.add_members(1, role=Member.RoleChoices.ADMIN)[0]
+        url = f"/api/groups/{self.group.pk}/tasks/"
+        claims_client = get_client(admin.user)
+        plain_client = CommitCallbacksClient()
+        plain_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(admin.user).access_token}"
+        )
+        query_counts = []
+
+        for client in (claims_client, plain_client):
+            clear_caches()
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(url).status_code, 200)
+
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1] - 1)
+
+    def test_demoted_admin_with_old_token(self):
+        admin = self.add_members(1, role=Member.RoleChoices.ADMIN)[0]
+        client = get_client(admin.user)
+        url = f"/api/groups/{self.group.pk}/members/"
+        cache_key = CachedJWTAuthentication.get_cache_key(admin.user.pk)
+
+        # the token claims the admin role, the cached request user its version
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertIsNotNone(CachedJWTAuthentication.get_cache().get(cache_key))
+
+        response = get_client(self.owner).patch(
+            f"/api/members/{admin.pk}/",
+            {"role": Member.RoleChoices.DEFAULT},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        # every worker reads the user from the shared cache the bump removed it from
+        self.assertIsNone(CachedJWTAuthentication.get_cache().get(cache_key))
+
+        response = client.post(
+            url, {"user": create_user("invited").pk, "role": Member.RoleChoices.DEFAULT}
+        )
+        self.assertEqual(response.status_code, 403, response.content)
+        self.assertEqual(self.group.members.count(), 2)
+
+
+class ConcurrentAccessWriteTests(GroupTestCase):
+    def test_sync_with_concurrently_inserted_access(self):
+        member = self.add_members(1)[0]
+        task = self.add_tasks(1, self.owner_member)[0]
+        MemberTaskRelation.objects.bulk_create([
+            MemberTaskRelation(member=member, group_task=task, can_edit=True)
+        ])
+        bulk_update = GroupTaskAccess.objects.bulk_update
+
+        def insert_access_then_update(*args, **kwargs):
+            # another sync inserts the row after this one read the access rows
+            GroupTaskAccess.objects.create(
+                user=member.user, group=self.group, group_task=task, access_level=1
+            )
+            return bulk_update(*args, **kwargs)
+
+        with mock.patch.object(
+            GroupTaskAccess.objects, "bulk_update", side_effect=insert_access_then_update
+        ):
+            group_task_access.sync_group_task_access(
+                group_task_ids=[task.pk], user_ids=[member.user_id]
+            )
+
+        access = GroupTaskAccess.objects.get(user=member.user, group_task=task)
+        self.assertEqual(
+            access.access_level,
+            GroupTaskAccess.AccessLevels.RELATED | GroupTaskAccess.AccessLevels.EDITOR
+        )
+
+    def test_concurrently_related_member_is_skipped(self):
+        members = self.add_members(3)
+        task = self.add_tasks(1, self.owner_member)[0]
+        plan_new_relations = member_task_relation_management.plan_new_relations
+
+        def plan_then_relate_member(*args):
+            plan = plan_new_relations(*args)
+
+            # another request relates the second member after the batch read the relations
+            if not MemberTaskRelation.objects.filter(member=members[1], group_task=task).exists():
+                MemberTaskRelation.objects.create(member=members[1], group_task=task)
+
+            return plan
+
+        with mock.patch.object(
+            member_task_relation_management,
+            "plan_new_relations",
+            side_effect=plan_then_relate_member
+        ):
+            response = get_client(self.owner).post(
+                f"/api/group-tasks/{task.pk}/permissions/bulk/",
+                {"members": [member.pk for member in members], "can_edit": False},
+                format="json"
+            )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        results = {result["member"]: result["status"] for result in response.json()["results"]}
+        self.assertEqual(
+            results, {members[0].pk: "ok", members[1].pk: "skipped", members[2].pk: "ok"}
+        )
+        self.assertEqual(MemberTaskRelation.objects.filter(group_task=task).count(), 3)
+
+
+class GroupTaskAccessSyncTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.members = self.add_members(3)
+        self.tasks = self.add_tasks(2, self.members[0], related=self.members[1:2])
+        self.client = get_client(self.owner)
+
+    def test_role_change(self):
+        for role in (Member.RoleChoices.ADMIN, Member.RoleChoices.DEFAULT):
+            response = self.client.patch(
+                f"/api/members/{self.members[2].pk}/", {"role": role}, format="json"
+            )
+
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assert_access_consistent()
+
+    def test_relation_changes(self):
+        response = self.client.post(
+            f"/api/group-tasks/{self.tasks[0].pk}/permissions/",
+            {"member": self.members[2].pk, "can_edit": False},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assert_access_consistent()
+
+        relation_url = f"/api/group-task-permissions/{response.json()['pk']}/"
+        response = self.client.patch(relation_url, {"can_edit": True}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_access_consistent()
+
+        response = self.client.delete(relation_url)
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assert_access_consistent()
+
+    def test_deletes(self):
+        # the creator's tasks lose it, its relations go with it
+        response = self.client.delete(f"/api/members/{self.members[0].pk}/")
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assert_access_consistent()
+
+        response = self.client.delete(f"/api/group-tasks/{self.tasks[0].pk}/")
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assert_access_consistent()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.filter(pk=self.members[1].pk).delete()
+
+        self.assert_access_consistent()
+
+    def test_cascade_syncs_once(self):
+        with mock.patch.object(
+            group_task_access,
+            "sync_group_task_access",
+            wraps=group_task_access.sync_group_task_access
+        ) as sync:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.members[1].delete()
+
+        # the member's relations are deleted with it and synced by the member's scope
+        sync.assert_called_once_with(
+            group_id=self.group.pk, group_task_ids=None, user_ids={self.members[1].user_id}
+        )
+        self.assert_access_consistent()
+
+    def test_sync_waits_for_the_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            MemberTaskRelation.objects.create(member=self.members[2], group_task=self.tasks[1])
+            MemberTaskRelation.objects.create(member=self.members[2], group_task=self.tasks[0])
+
+            self.assertFalse(
+                GroupTaskAccess.objects.filter(user=self.members[2].user).exists()
+            )
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(GroupTaskAccess.objects.filter(user=self.members[2].user).count(), 2)
+        self.assert_access_consistent()
+
+
+class RebuildGroupTaskAccessTests(GroupTestCase):
+    def test_repairs_the_table(self):
+        members = self.add_members(2)
+        tasks = self.add_tasks(2, self.owner_member, related=members[:1])
+        Group.objects.create(name="other group")
+
+        GroupTaskAccess.objects.filter(user=members[0].user, group_task=tasks[0]).delete()
+        GroupTaskAccess.objects.filter(user=self.owner, group_task=tasks[1]).update(
+            access_level=GroupTaskAccess.AccessLevels.RELATED
+        )
+        GroupTaskAccess.objects.create(
+            user=members[1].user,
+            group=self.group,
+            group_task=tasks[1],
+            access_level=GroupTaskAccess.AccessLevels.RELATED
+        )
+        stdout = StringIO()
+
+        call_command("rebuild_group_task_access", stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            [
+                f"group {self.group.pk}: 1 created, 1 updated, 1 deleted",
+                "2 groups, 4 rows: 1 created, 1 updated, 1 deleted"
+            ]
+        )
+        self.assert_access_consistent()
+
+    def test_unknown_group(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_group_task_access", group=[self.group.pk, 0])
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+    def test_seed_data_then_benchmark(self):
+        stdout = StringIO()
+        call_command(
+            "seed_data", users=8, groups=2, user_tasks=2, group_tasks=1, stdout=stdout
+        )
+
+        self.assertIn("users                      8", stdout.getvalue())
+        self.assertEqual(Group.objects.count(), 2)
+        group = Group.objects.annotate(count=Count("members")).order_by("-count").first()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            stdout, stderr = StringIO(), StringIO()
+            call_command(
+                "benchmark_endpoints", requests=2, warmup=1, only="GET groups:group-detail",
+                output=path, stdout=stdout, stderr=stderr
+            )
+
+            with open(path, encoding="utf-8") as file:
+                baseline = json.load(file)
+
+        # every URL has a scenario and the read stayed within its budget
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertEqual(list(baseline["results"]), ["GET groups:group-detail"])
+        result = baseline["results"]["GET groups:group-detail"]
+        self.assertEqual(result["url"], f"/api/groups/{group.pk}/")
+        self.assertEqual(result["errors"], 0)
+        self.assertLessEqual(result["max_queries"], result["budget"])
+        self.assertEqual(baseline["dataset"]["users"], User.objects.count())
+        self.assertIn("GET groups:group-detail", stdout.getvalue())
+        # the benchmark rolls its objects back
+        self.assertEqual(Group.objects.count(), 2)
+
+
+class QueryBudgetTests(GroupTestCase):
+    def setUp(self):
+        super().setUp()
+        self.members = self.add_members(10)
+        self.tasks = self.add_tasks(10, self.owner_member, self.members[:2])
+
+    def test_budgeted_views_stay_within_budget(self):
+        urls = (
+            "/api/groups/",
+            f"/api/groups/{self.group.pk}/",
+            f"/api/groups/{self.group.pk}/members/",
+            f"/api/groups/{self.group.pk}/tasks/",
+            f"/api/members/{self.members[0].pk}/",
+            f"/api/group-tasks/{self.tasks[0].pk}/",
+            f"/api/group-tasks/{self.tasks[0].pk}/permissions/",
+        )
+
+        for user in (self.owner, self.members[0].user):
+            for url in urls:
+                with self.subTest(user=user.nickname, url=url):
+                    clear_caches()
+                    response = get_client(user).get(url)
+                    self.assertEqual(response.status_code, 200, response.content)
+
+    def test_n_plus_one_exceeds_budget(self):
+        # without joins every listed member and task creator loads its user separately
+        with mock.patch.object(QuerySet, "select_related", lambda queryset, *fields: queryset):
+            with (
+                self.assertRaises(QueryBudgetExceeded),
+                self.assertLogs("core.query_budget", "WARNING")
+            ):
+                get_client(self.owner).get(f"/api/groups/{self.group.pk}/")
+
+    async def test_async_request(self):
+        client = await sync_to_async(get_async_client)(self.owner)
+        url = f"/api/async/groups/{self.group.pk}/"
+        # the snapshot is cached by the first request
+        await sync_to_async(clear_caches)()
+
+        response = await client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertGreater(response.asgi_request.query_recorder.count, 1)
+
+        await sync_to_async(clear_caches)()
+
+        # the async view inherits the budget of its sync twin
+        with (
+            mock.patch.object(GroupDetailView, "query_budget", {"GET": 1}),
+            self.assertRaises(QueryBudgetExceeded)
+        ):
+            await client.get(url)
+
+    def test_middleware_follows_the_handler_mode(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(QueryBudgetMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(QueryBudgetMiddleware(lambda request: None)))
+
+    def test_failed_request_keeps_its_error(self):
+        def query_then_fail(*args):
+            for member in self.members:
+                Member.objects.get(pk=member.pk)
+
+            raise ValueError("snapshot failed")
+
+        with (
+            mock.patch.object(GroupDetailView, "build_snapshot", side_effect=query_then_fail),
+            self.assertLogs("core.query_budget", "WARNING") as logs,
+            self.assertRaisesMessage(ValueError, "snapshot failed")
+        ):
+            get_client(self.owner).get(f"/api/groups/{self.group.pk}/")
+
+        self.assertIn("its budget is", logs.output[-1])
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class GroupSnapshotStats:
+    """
+    Process-wide hit / miss counters and latency of snapshot lookups
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.hit_seconds = 0.0
+            self.miss_seconds = 0.0
+
+    def record(self, hit, seconds):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def as_dict(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "average_hit_ms": self.hit_seconds * 1000 / self.hits if self.hits else None,
+                "average_miss_ms": self.miss_seconds * 1000 / self.misses if self.misses else None
+            }
+
+
+stats = GroupSnapshotStats()
+
+
+class GroupSnapshotCache:
+    """
+    Caches the GroupDetailView payload per group and per visibility
+    """
+    cache_prefix = "group-snapshot"
+
+    @staticmethod
+    def get_cache():
+        return caches[settings.GROUP_SNAPSHOT_CACHE]
+
+    @classmethod
+    def get_version_key(cls, group_id):
+        return f"{cls.cache_prefix}:version:{group_id}"
+
+    @classmethod
+    def invalidate(cls, *group_ids):
+        """
+        Makes the groups' snapshots stale once the transaction commits
+        """
+        # a snapshot built between the write and the commit would
+        # keep the old rows under the new version
+        transaction.on_commit(lambda: cls.get_cache().set_many({
+            cls.get_version_key(group_id): time.time_ns()
+            for group_id in group_ids
+        }, timeout=None))
+
+    @classmethod
+    def get(cls, group_id, visibility, build):
+        """
+        Returns (payload, etag), build() returns (payload, expires_at) on a miss
+        """
+        started_at = time.perf_counter()
+        key, snapshot = cls.lookup(group_id, visibility)
+
+        if snapshot is None:
+            snapshot = cls.store(key, *build())
+            stats.record(False, time.perf_counter() - started_at)
+        else:
+            stats.record(True, time.perf_counter() - started_at)
+
+        return snapshot
+
+    @classmethod
+    async def aget(cls, group_id, visibility, abuild):
+        """
+        Same as get(), abuild is a coroutine function
+        """
+        started_at = time.perf_counter()
+        key, snapshot = cls.lookup(group_id, visibility)
+
+        if snapshot is None:
+            snapshot = cls.store(key, *await abuild())
+            stats.record(False, time.perf_counter() - started_at)
+        else:
+            stats.record(True, time.perf_counter() - started_at)
+
+        return snapshot
+
+    @classmethod
+    def lookup(cls, group_id, visibility):
+        """
+        Returns (key, snapshot), snapshot is None on a miss
+        """
+        cache = cls.get_cache()
+        version = cache.get_or_set(cls.get_version_key(group_id), time.time_ns, timeout=None)
+        key = f"{cls.cache_prefix}:{group_id}:{version}:{visibility}"
+
+        return key, cache.get(key)
+
+    @classmethod
+    def store(cls, key, payload, expires_at):
+        timeout = settings.GROUP_SNAPSHOT_TIMEOUT
+
+        if expires_at is not None:
+            timeout = max(0, min(timeout, (expires_at - timezone.now()).total_seconds()))
+
+        snapshot = (payload, cls.get_etag(payload))
+
+        if timeout:
+            cls.get_cache().set(key, snapshot, timeout)
+
+        return snapshot
+
+    @staticmethod
+    def get_etag(payload):
+        return hashlib.sha1(
+            json.dumps(payload, cls=JSONEncoder, sort_keys=True).encode()
+        ).hexdigest()
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from groups.models import Member
+from users.authentication import CachedJWTAuthentication
+
+
+User = get_user_model()
+
+MEMBERSHIPS_CLAIM = "memberships"
+MEMBERSHIP_VERSION_CLAIM = "membership_version"
+
+CLAIMED_MEMBER_FIELDS = ("id", "user_id", "group_id", "role")
+
+
+def add_membership_claims(token, user):
+    """
+    Adds {group_id: [member_pk, role]} and user's membership version to the token
+    """
+    if not settings.MEMBERSHIP_CLAIMS_ENABLED:
+        return
+
+    max_groups = settings.MEMBERSHIP_CLAIMS_MAX_GROUPS
+    memberships = list(
+        Member.objects.filter(user=user).values_list("group_id", "pk", "role")[:max_groups + 1]
+    )
+
+    if len(memberships) > max_groups:
+        return
+
+    token[MEMBERSHIPS_CLAIM] = {
+        str(group_id): [member_pk, role]
+        for group_id, member_pk, role in memberships
+    }
+    token[MEMBERSHIP_VERSION_CLAIM] = user.membership_version
+
+
+def get_claimed_memberships(request):
+    """
+    Returns {group_id: Member object} from the token's claims or None
+    """
+    token = request.auth
+
+    if token is None or not hasattr(token, "get"):
+        return None
+
+    claims = token.get(MEMBERSHIPS_CLAIM)
+
+    # the request user is read through the shared JWT user cache,
+    # a bump deletes the user from it once the transaction commits
+    if claims is None or token.get(MEMBERSHIP_VERSION_CLAIM) != request.user.membership_version:
+        return None
+
+    return {
+        int(group_id): Member.from_db(
+            Member.objects.db,
+            CLAIMED_MEMBER_FIELDS,
+            (member_pk, request.user.pk, int(group_id), role)
+        )
+        for group_id, (member_pk, role) in claims.items()
+    }
+
+
+def bump_membership_versions(*user_ids):
+    """
+    Makes membership claims of the users stale
+    """
+    User.objects.filter(pk__in=user_ids).update(membership_version=F("membership_version") + 1)
+
+    # update() skips signals, the cached request user must see the new version
+    transaction.on_commit(lambda: CachedJWTAuthentication.invalidate(*user_ids))
@@ -0,0 +1,70 @@
+from groups.models import GroupTaskAccess, Member
+from groups.utils.membership_claims import get_claimed_memberships
+
+
+class MembershipResolver:
+    """
+    Loads the request user's memberships and task access levels once per request
+    """
+    def __init__(self, user, claimed_memberships=None):
+        self.user = user
+        self._memberships = {}
+        self._task_accesses = {}
+        self._claimed_memberships = claimed_memberships or {}
+
+    def get_membership(self, group_id):
+        """
+        Returns request user's Member object for the group or None
+        """
+        if group_id in self._claimed_memberships:
+            return self._claimed_memberships[group_id]
+
+        if group_id not in self._memberships:
+            self._memberships[group_id] = Member.objects.filter(
+                group_id=group_id,
+                user=self.user
+            ).first()
+
+        return self._memberships[group_id]
+
+    async def aget_membership(self, group_id):
+        if group_id in self._claimed_memberships:
+            return self._claimed_memberships[group_id]
+
+        if group_id not in self._memberships:
+            self._memberships[group_id] = await Member.objects.filter(
+                group_id=group_id,
+                user=self.user
+            ).afirst()
+
+        return self._memberships[group_id]
+
+    def get_task_access(self, group_task):
+        """
+        Returns request user's access level for the group task, 0 without access
+        """
+        if group_task.pk not in self._task_accesses:
+            self._task_accesses[group_task.pk] = GroupTaskAccess.objects.filter(
+                user=self.user,
+                group_task_id=group_task.pk
+            ).values_list("access_level", flat=True).first() or 0
+
+        return self._task_accesses[group_task.pk]
+
+    def forget(self, group_id):
+        """
+        Drops cached membership and task access levels of the group
+        """
+        self._memberships.pop(group_id, None)
+        self._claimed_memberships.pop(group_id, None)
+        self._task_accesses = {}
+
+
+def get_membership_resolver(request):
+    resolver = getattr(request, "membership_resolver", None)
+
+    if resolver is None or resolver.user != request.user:
+        resolver = MembershipResolver(request.user, get_claimed_memberships(request))
+        request.membership_resolver = resolver
+
+    return resolver
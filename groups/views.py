@@ -1,6 +1,6 @@
 from django.db import transaction
-from django.db.models import F
-from django.shortcuts import get_object_or_404
+from django.db.models import F, Max
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.contrib.auth import get_user_model
 
 from rest_framework import status
@@ -12,20 +12,32 @@ from rest_framework.filters import OrderingFilter
 
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.async_views import AsyncAPIViewMixin
+from core.clock import get_request_now
+from core.concurrency import check_if_match, get_version_etag, retry_on_conflict
+from core.conditional import ConditionalGet
+from core.fast_serializers import aget_fast_list_response, get_fast_list_response
+from core.sparse_fields import get_only_fields, get_sparse_fields
 from core.pagination import NormalDataPagination
 from tasks.filters import TaskOrderingFilter
 from tasks.views import TaskCloseView, TaskReissueView
 from tasks.serializers import InputTaskSerializer, TaskInfoSerializer
 from tasks.services.task_management import delete_task, update_task
+from tasks.utils.task_fingerprint import aget_task_fingerprint, get_task_fingerprint
 
 from .models import Group, GroupTask, Member, MemberTaskRelation
-from .serializers import GroupDetailSerializer, GroupListSerializer, MemberInfoSerializer, CreateMemberSerializer, MemberTaskRelationCreateSerializer, MemberTaskRelationMinimalDetailSerializer, MemberTaskRelationUpdateSerializer, UpdateMemberSerializer, GroupTaskInfoSerializer, MemberTaskRelationListSerializer, MemberTaskRelationDetailSerializer
+from .serializers import GroupDetailSerializer, GroupListSerializer, MemberInfoSerializer, CreateMemberSerializer, MemberTaskRelationCreateSerializer, MemberTaskRelationMinimalDetailSerializer, MemberTaskRelationUpdateSerializer, UpdateMemberSerializer, GroupTaskInfoSerializer, MemberTaskRelationListSerializer, MemberTaskRelationDetailSerializer, BulkCreateMemberSerializer, BulkCreateMemberRequestSerializer, BulkMemberTaskRelationCreateSerializer, GroupListFastSerializer, MemberInfoFastSerializer, GroupTaskInfoFastSerializer
 from .permissions import GroupPermissions, GroupTaskPermissions, IsTargetMemberOrTaskCreatorOrGroupAdminOrStaff
 from .filters import GroupFilter, GroupTaskFilter, MemberFilter, MemberTaskRelationFilter
+from .utils.membership_resolver import get_membership_resolver
+from .utils.group_snapshot import GroupSnapshotCache, stats as group_snapshot_stats
 
-from .services.membership_management import create_member, update_member_role, delete_member
+from .services.membership_management import create_member, update_member_role, delete_member, create_members
+from .services.group_task_access import (
+    aget_relation_fingerprint, filter_visible_group_tasks, get_relation_fingerprint
+)
 from .services.group_task_management import create_group_task
-from .services.member_task_relation_management import create_member_task_relation
+from .services.member_task_relation_management import create_member_task_relation, create_member_task_relations, update_member_task_relation
 
 
 User = get_user_model()
@@ -44,6 +56,8 @@ class GroupListView(GenericAPIView):
     ordering_fields = ["name", "joined_at"]
     ordering = ["-joined_at"]
 
+    query_budget = {"GET": 4, "POST": 10}
+
     def get_permissions(self):
         if self.is_admin_route:
             permission_classes = [IsAdminUser]
@@ -68,15 +82,9 @@ class GroupListView(GenericAPIView):
         queryset = self.get_queryset()
         queryset = self.filter_queryset(queryset)
 
-        page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
+        serializer_class = GroupListFastSerializer.sparse(*get_sparse_fields(request))
 
-        return Response(serializer.data)
+        return get_fast_list_response(self, serializer_class, queryset)
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -105,6 +113,9 @@ class GroupDetailView(GenericAPIView):
     queryset = Group.objects.all()
     serializer_class = GroupDetailSerializer
 
+    # deleting a group cascades to its members and tasks in batches
+    query_budget = {"GET": 5, "PATCH": 4}
+
     def get_permissions(self):
         if self.request.method == "GET":
             permission_classes =  [GroupPermissions.IsGroupMemberOrStaff]
@@ -116,12 +127,11 @@ class GroupDetailView(GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
-        group_tasks = instance.get_relevant_tasks()
+        group_tasks = instance.get_relevant_tasks(get_request_now(request))
+        visibility = "all"
 
         if not request.user.is_staff:
-            request_user_membership = instance.members.filter(
-                user=request.user
-            ).first()
+            request_user_membership = get_membership_resolver(request).get_membership(instance.pk)
 
             if not request_user_membership:
                 raise PermissionDenied("You are not a member of this group.")
@@ -129,21 +139,42 @@ class GroupDetailView(GenericAPIView):
             # if not staff and not group admin, can see only related tasks
             # otherwise can se all tasks
             if not request_user_membership.role in Member.ADMIN_ROLES:
-                group_tasks = group_tasks.filter(
-                    related_members__member=request_user_membership
-                )
+                group_tasks = filter_visible_group_tasks(group_tasks, request.user, instance.pk)
+                visibility = f"member:{request_user_membership.pk}"
+
+        payload, etag = GroupSnapshotCache.get(
+            instance.pk,
+            visibility,
+            lambda: self.build_snapshot(instance, group_tasks)
+        )
 
-        group_tasks = group_tasks.select_related("creator__user").order_by("due_date")
+        conditional_get = ConditionalGet(request, etag)
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
+
+        return conditional_get.patch_response(Response(payload))
+
+    def build_snapshot(self, instance, group_tasks):
+        """
+        Returns (payload, expires_at)
+        """
+        group_tasks = list(group_tasks.select_related("creator__user").order_by("due_date")[:10])
         members = instance.members.select_related("user").order_by("user__nickname")
 
-        return Response(
-            {
-                **self.get_serializer(instance).data,
-                "tasks": GroupTaskInfoSerializer(group_tasks[:10], many=True).data,
-                "members": MemberInfoSerializer(members[:10], many=True).data
-            }
+        payload = {
+            **self.get_serializer(instance).data,
+            "tasks": GroupTaskInfoSerializer(group_tasks, many=True).data,
+            "members": MemberInfoSerializer(members[:10], many=True).data
+        }
+        expires_at = min(
+            (group_task.due_date for group_task in group_tasks if group_task.due_date is not None),
+            default=None
         )
 
+        return payload, expires_at
+
     def patch(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
@@ -159,6 +190,79 @@ class GroupDetailView(GenericAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class AsyncGroupDetailView(AsyncAPIViewMixin, GroupDetailView):
+    """
+    GroupDetailView.get on the async request path (ASGI)
+    """
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        instance = await self.aget_object()
+        group_tasks = instance.get_relevant_tasks(get_request_now(request))
+        visibility = "all"
+
+        if not request.user.is_staff:
+            membership_resolver = get_membership_resolver(request)
+            request_user_membership = await membership_resolver.aget_membership(instance.pk)
+
+            if not request_user_membership:
+                raise PermissionDenied("You are not a member of this group.")
+
+            if not request_user_membership.role in Member.ADMIN_ROLES:
+                group_tasks = filter_visible_group_tasks(group_tasks, request.user, instance.pk)
+                visibility = f"member:{request_user_membership.pk}"
+
+        payload, etag = await GroupSnapshotCache.aget(
+            instance.pk,
+            visibility,
+            lambda: self.abuild_snapshot(instance, group_tasks)
+        )
+
+        conditional_get = ConditionalGet(request, etag)
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
+
+        return conditional_get.patch_response(Response(payload))
+
+    async def abuild_snapshot(self, instance, group_tasks):
+        group_tasks = [
+            group_task
+            async for group_task in group_tasks.select_related(
+                "creator__user"
+            ).order_by("due_date")[:10]
+        ]
+        members = [
+            member
+            async for member in instance.members.select_related(
+                "user"
+            ).order_by("user__nickname")[:10]
+        ]
+
+        payload = {
+            **self.get_serializer(instance).data,
+            "tasks": GroupTaskInfoSerializer(group_tasks, many=True).data,
+            "members": MemberInfoSerializer(members, many=True).data
+        }
+        expires_at = min(
+            (group_task.due_date for group_task in group_tasks if group_task.due_date is not None),
+            default=None
+        )
+
+        return payload, expires_at
+
+
+class GroupSnapshotStatsView(GenericAPIView):
+    """
+    Hit ratio and latency of GroupDetailView snapshot lookups in this process
+    """
+    permission_classes = [IsAdminUser]
+
+    query_budget = 1
+
+    def get(self, request, *args, **kwargs):
+        return Response(group_snapshot_stats.as_dict())
+
+
 class MemberListView(GenericAPIView):
     queryset = Member.objects.all()
     serializer_class = MemberInfoSerializer
@@ -170,6 +274,9 @@ class MemberListView(GenericAPIView):
     ordering_fields = ["nickname", "joined_at"]
     ordering = ["joined_at"]
 
+    # adding admins and owners writes their task access rows in batches
+    query_budget = {"GET": 5}
+
     def get_permissions(self):
         if self.request.method == "GET":
             permission_classes = [GroupPermissions.IsGroupMemberOrStaff]
@@ -188,20 +295,23 @@ class MemberListView(GenericAPIView):
         group = get_object_or_404(Group, pk=self.kwargs["pk"])
         self.check_object_permissions(request, group)
 
-        queryset = group.members.select_related("user").annotate(
-            nickname=F("user__nickname")
-        )
-        queryset = self.filter_queryset(queryset)
+        queryset = self.filter_queryset(self.get_group_members(group))
 
-        page = self.paginate_queryset(queryset)
+        serializer_class = MemberInfoFastSerializer.sparse(*get_sparse_fields(request))
 
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        return get_fast_list_response(self, serializer_class, queryset)
 
-        serializer = self.get_serializer(queryset, many=True)
+    def get_group_members(self, group):
+        queryset = group.members.all()
 
-        return Response(serializer.data)
+        # users are only joined for ordering by nickname when it is requested,
+        # the serializer selects the nickname itself
+        ordering = OrderingFilter().get_ordering(self.request, queryset, self) or []
+
+        if any(field.lstrip("-") == "nickname" for field in ordering):
+            queryset = queryset.annotate(nickname=F("user__nickname"))
+
+        return queryset
 
     def post(self, request, *args, **kwargs):
         group = get_object_or_404(Group, pk=self.kwargs["pk"])
@@ -211,7 +321,7 @@ class MemberListView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         new_member = create_member(
-            request_user=request.user,
+            membership_resolver=get_membership_resolver(request),
             group=group,
             target_user_id=serializer.validated_data["user"].id,
             role=serializer.validated_data["role"]
@@ -226,10 +336,84 @@ class MemberListView(GenericAPIView):
         )
 
 
+class AsyncMemberListView(AsyncAPIViewMixin, MemberListView):
+    """
+    MemberListView.get on the async request path (ASGI)
+    """
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        group = await aget_object_or_404(Group, pk=self.kwargs["pk"])
+        await self.acheck_object_permissions(request, group)
+
+        queryset = self.filter_queryset(self.get_group_members(group))
+
+        serializer_class = MemberInfoFastSerializer.sparse(*get_sparse_fields(request))
+
+        return await aget_fast_list_response(self, serializer_class, queryset)
+
+
+class MemberBulkCreateView(GenericAPIView):
+    """
+    Adds up to 1000 members to a group in one transaction
+    """
+    serializer_class = BulkCreateMemberRequestSerializer
+    permission_classes = [GroupPermissions.IsGroupAdminOrStaff]
+
+    def post(self, request, *args, **kwargs):
+        group = get_object_or_404(Group, pk=self.kwargs["pk"])
+        self.check_object_permissions(request, group)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        entries = []
+        results = {}
+
+        for index, item in enumerate(serializer.validated_data["members"]):
+            member_serializer = BulkCreateMemberSerializer(data=item)
+
+            if not member_serializer.is_valid():
+                results[index] = {"status": "error", "errors": member_serializer.errors}
+                continue
+
+            entries.append({"index": index, **member_serializer.validated_data})
+
+        created = create_members(
+            membership_resolver=get_membership_resolver(request),
+            group=group,
+            entries=entries
+        )
+
+        for index, (member, error) in created.items():
+            if error is not None:
+                results[index] = {
+                    "status": "error",
+                    "errors": {"detail": error.message, "code": error.code}
+                }
+            else:
+                results[index] = {"status": "ok", "member": MemberInfoSerializer(member).data}
+
+        return Response({
+            "results": [
+                {"index": index, **results[index]}
+                for index in sorted(results)
+            ]
+        })
+
+
 class MemberDetailView(GenericAPIView):
-    queryset = Member.objects.select_related("user")
     serializer_class = MemberInfoSerializer
 
+    # role changes and removals rewrite task access rows in batches
+    query_budget = {"GET": 3}
+
+    def get_queryset(self):
+        fields = get_sparse_fields(self.request)[0] if self.request.method == "GET" else None
+
+        if fields is None or "nickname" in fields:
+            return Member.objects.select_related("user")
+
+        return Member.objects.only(*get_only_fields(Member, fields, required=("group", "user")))
+
     def get_permissions(self):
         if self.request.method == "GET":
             permission_classes = [GroupPermissions.IsMembersGroupMemberOrStaff]
@@ -248,7 +432,8 @@ class MemberDetailView(GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        fields, _ = get_sparse_fields(request)
+        serializer = self.get_serializer(instance, fields=fields)
 
         return Response(serializer.data)
 
@@ -259,7 +444,7 @@ class MemberDetailView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         member = update_member_role(
-            request_user=request.user,
+            membership_resolver=get_membership_resolver(request),
             target_member=instance,
             role=serializer.validated_data["role"]
         )
@@ -270,7 +455,7 @@ class MemberDetailView(GenericAPIView):
         instance = self.get_object()
 
         delete_member(
-            request_user=request.user,
+            membership_resolver=get_membership_resolver(request),
             target_member=instance
         )
 
@@ -290,6 +475,8 @@ class GroupTaskListView(GenericAPIView):
     ordering_fields = ["due_date", "created_at"]
     ordering = ["due_date"]
 
+    query_budget = {"GET": 7, "POST": 18}
+
     def get_serializer_class(self):
         if self.request.method == "POST":
             return InputTaskSerializer
@@ -299,34 +486,68 @@ class GroupTaskListView(GenericAPIView):
         queryset = self.get_queryset()
         queryset = self.filter_queryset(queryset)
 
-        page = self.paginate_queryset(queryset)
+        request_user_membership = None
+        relation_fingerprint = None
 
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        if not request.user.is_staff:
+            membership_resolver = get_membership_resolver(request)
+            request_user_membership = membership_resolver.get_membership(kwargs["pk"])
 
-        serializer = self.get_serializer(queryset, many=True)
+        if self.is_filtered_by_access(request_user_membership):
+            relation_fingerprint = get_relation_fingerprint(request_user_membership)
 
-        return Response(serializer.data)
+        conditional_get = ConditionalGet(
+            request,
+            # role decides which tasks are visible, relations which of them a member sees
+            None if request_user_membership is None else request_user_membership.role,
+            relation_fingerprint,
+            get_task_fingerprint(
+                queryset,
+                get_request_now(request),
+                creator_updated_at=Max("creator__updated_at"),
+                creator_user_updated_at=Max("creator__user__updated_at")
+            )
+        )
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
+
+        serializer_class = GroupTaskInfoFastSerializer.sparse(*get_sparse_fields(request))
+
+        return conditional_get.patch_response(
+            get_fast_list_response(self, serializer_class, queryset)
+        )
 
     def get_queryset(self):
         group = get_object_or_404(Group, pk=self.kwargs["pk"])
         self.check_object_permissions(self.request, group)
 
-        queryset = self.queryset
+        request_user_membership = None
 
         if not self.request.user.is_staff:
-            request_user_membership = group.members.filter(
-                user=self.request.user
-            ).first()
+            request_user_membership = get_membership_resolver(self.request).get_membership(group.pk)
 
-            if not request_user_membership.role in Member.ADMIN_ROLES:
-                queryset = queryset.filter(
-                    related_members__member=request_user_membership
-                )
+        return self.get_visible_tasks(group, request_user_membership)
+
+    def get_visible_tasks(self, group, request_user_membership):
+        """
+        Expects the group and request user's Member object (None for staff)
+        """
+        queryset = self.queryset.filter(group=group).with_currentness(get_request_now(self.request))
+
+        if self.is_filtered_by_access(request_user_membership):
+            queryset = filter_visible_group_tasks(queryset, self.request.user, group.pk)
 
         return queryset
 
+    @staticmethod
+    def is_filtered_by_access(request_user_membership):
+        return (
+            request_user_membership is not None
+            and not request_user_membership.role in Member.ADMIN_ROLES
+        )
+
     def post(self, request, *args, **kwargs):
         group = get_object_or_404(Group, pk=kwargs["pk"])
         self.check_object_permissions(request, group)
@@ -335,7 +556,7 @@ class GroupTaskListView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         new_group_task = create_group_task(
-            request_user=request.user,
+            membership_resolver=get_membership_resolver(request),
             group=group,
             task_data=serializer.validated_data
         )
@@ -346,15 +567,82 @@ class GroupTaskListView(GenericAPIView):
         )
 
 
+class AsyncGroupTaskListView(AsyncAPIViewMixin, GroupTaskListView):
+    """
+    GroupTaskListView.get on the async request path (ASGI)
+    """
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        group = await aget_object_or_404(Group, pk=kwargs["pk"])
+        await self.acheck_object_permissions(request, group)
+
+        request_user_membership = None
+        relation_fingerprint = None
+
+        if not request.user.is_staff:
+            membership_resolver = get_membership_resolver(request)
+            request_user_membership = await membership_resolver.aget_membership(group.pk)
+
+        if self.is_filtered_by_access(request_user_membership):
+            relation_fingerprint = await aget_relation_fingerprint(request_user_membership)
+
+        queryset = self.get_visible_tasks(group, request_user_membership)
+        queryset = self.filter_queryset(queryset)
+
+        conditional_get = ConditionalGet(
+            request,
+            None if request_user_membership is None else request_user_membership.role,
+            relation_fingerprint,
+            await aget_task_fingerprint(
+                queryset,
+                get_request_now(request),
+                creator_updated_at=Max("creator__updated_at"),
+                creator_user_updated_at=Max("creator__user__updated_at")
+            )
+        )
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
+
+        serializer_class = GroupTaskInfoFastSerializer.sparse(*get_sparse_fields(request))
+
+        return conditional_get.patch_response(
+            await aget_fast_list_response(self, serializer_class, queryset)
+        )
+
+
 class GroupTaskDetailView(GenericAPIView):
-    queryset = GroupTask.objects.select_related(
-        "group",
-        "creator__user"
-    ).prefetch_related(
-        "related_members__member__user"
-    )
     serializer_class = GroupTaskInfoSerializer
 
+    query_budget = {"GET": 6, "PATCH": 7, "DELETE": 11}
+
+    def get_queryset(self):
+        queryset = GroupTask.objects.with_currentness(get_request_now(self.request))
+        fields, expand = (
+            get_sparse_fields(self.request) if self.request.method == "GET" else (None, None)
+        )
+
+        if fields is None:
+            return queryset.select_related(
+                "group",
+                "creator__user"
+            ).prefetch_related(
+                "related_members__member__user"
+            )
+
+        # permissions only read group_id and creator_id, version makes the ETag
+        queryset = queryset.only(
+            *get_only_fields(GroupTask, fields, required=("group", "creator", "version"))
+        )
+
+        if "creator" in fields and "creator" in expand:
+            queryset = queryset.select_related("creator__user")
+
+        if "related_members" in fields:
+            queryset = queryset.prefetch_related("related_members__member__user")
+
+        return queryset
+
     def get_permissions(self):
         if self.request.method in ("PATCH", "PUT"):
             permission_classes = [GroupTaskPermissions.IsTaskEditorOrGroupAdminOrStaff]
@@ -373,31 +661,49 @@ class GroupTaskDetailView(GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         group_task = self.get_object()
-        serializer = self.get_serializer(group_task)
+        fields, expand = get_sparse_fields(request)
 
-        return Response(
-            {
-                **serializer.data,
+        if fields is None:
+            serializer = self.get_serializer(group_task, expand=expand)
+        else:
+            # related_members is added by the view, not by the serializer
+            serializer = self.get_serializer(
+                group_task, fields=fields - {"related_members"}, expand=expand
+            )
+
+        data = serializer.data
+
+        if fields is None or "related_members" in fields:
+            data = {
+                **data,
                 "related_members": MemberTaskRelationListSerializer(
                     group_task.related_members.all()[:10],
                     many=True
                 ).data
             }
-        )
 
-    def patch(self, request, *args, **kwargs):
-        with transaction.atomic():
-            queryset = self.get_queryset().select_for_update()
-            instance = get_object_or_404(queryset, pk=kwargs["pk"])
+        return Response(data, headers={"ETag": get_version_etag(group_task)})
 
-            self.check_object_permissions(request, instance)
+    @retry_on_conflict
+    def patch(self, request, *args, **kwargs):
+        instance = self.get_object()
+        version_pinned = check_if_match(request, instance)
 
-            serializer = self.get_serializer(instance, data=request.data, partial=True)
-            serializer.is_valid(raise_exception=True)
+        serializer = self.get_serializer(instance, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
 
-            group_task = update_task(instance, serializer.validated_data)
+        # no row lock, one UPDATE ... WHERE the task is still open and current
+        group_task = update_task(
+            instance,
+            serializer.validated_data,
+            check_version=version_pinned,
+            now=get_request_now(request)
+        )
 
-        return Response(TaskInfoSerializer(group_task).data)
+        return Response(
+            TaskInfoSerializer(group_task).data,
+            headers={"ETag": get_version_etag(group_task)}
+        )
 
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -407,22 +713,30 @@ class GroupTaskDetailView(GenericAPIView):
 
 
 class GroupTaskCloseView(TaskCloseView):
+    query_budget = 4
+
     def get_permissions(self):
         return [GroupTaskPermissions.IsTaskEditorOrGroupAdminOrStaff()]
 
     def get_queryset(self):
-        return GroupTask.objects.select_related("group")
+        return GroupTask.objects.select_related("group").with_currentness(
+            get_request_now(self.request)
+        )
 
     def get_serializer_class(self):
         return TaskInfoSerializer
 
 
 class GroupTaskReissueView(TaskReissueView):
+    query_budget = 4
+
     def get_permissions(self):
         return [GroupTaskPermissions.IsTaskEditorOrGroupAdminOrStaff()]
 
     def get_queryset(self):
-        return GroupTask.objects.select_related("group")
+        return GroupTask.objects.select_related("group").with_currentness(
+            get_request_now(self.request)
+        )
 
     def get_serializer_class(self):
         return TaskInfoSerializer
@@ -440,6 +754,8 @@ class MemberTaskRelationListView(GenericAPIView):
     ordering_fields = ["created_at", "updated_at", "nickname"]
     ordering = ["created_at"]
 
+    query_budget = {"GET": 5, "POST": 13}
+
     def get_permissions(self):
         if self.request.method == "POST":
             permission_classes = [GroupTaskPermissions.IsTaskCreatorOrGroupAdminOrStaff]
@@ -498,6 +814,49 @@ class MemberTaskRelationListView(GenericAPIView):
         )
 
 
+class MemberTaskRelationBulkCreateView(GenericAPIView):
+    """
+    Relates up to 1000 members (or every member with a role) to a group task
+    """
+    serializer_class = BulkMemberTaskRelationCreateSerializer
+    permission_classes = [GroupTaskPermissions.IsTaskCreatorOrGroupAdminOrStaff]
+
+    def post(self, request, *args, **kwargs):
+        group_task = get_object_or_404(
+            GroupTask.objects.select_related("group"),
+            pk=kwargs["pk"]
+        )
+        self.check_object_permissions(request, group_task)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        created = create_member_task_relations(
+            group_task=group_task,
+            can_edit=serializer.validated_data["can_edit"],
+            member_ids=serializer.validated_data.get("members"),
+            role=serializer.validated_data.get("role")
+        )
+
+        results = []
+
+        for member_id, (relation, error) in created.items():
+            if relation is not None:
+                results.append({
+                    "member": member_id,
+                    "status": "ok",
+                    "relation": MemberTaskRelationListSerializer(relation).data
+                })
+            else:
+                results.append({
+                    "member": member_id,
+                    "status": "skipped" if error.code == "already_has_permission" else "error",
+                    "errors": {"detail": error.message, "code": error.code}
+                })
+
+        return Response({"results": results})
+
+
 class MemberTaskRelationDetailView(GenericAPIView):
     queryset = MemberTaskRelation.objects.all().select_related(
         "group_task__group",
@@ -505,6 +864,8 @@ class MemberTaskRelationDetailView(GenericAPIView):
     )
     serializer_class = MemberTaskRelationMinimalDetailSerializer
 
+    query_budget = {"GET": 3, "PATCH": 10, "DELETE": 10}
+
     def get_permissions(self):
         if self.request.method in ("PATCH", "PUT"):
             permission_classes = [GroupTaskPermissions.IsTaskCreatorOrGroupAdminOrStaff]
@@ -536,28 +897,32 @@ class MemberTaskRelationDetailView(GenericAPIView):
 
         serializer = self.get_serializer(member_task_relation)
 
-        return Response(serializer.data)
+        return Response(serializer.data, headers={"ETag": get_version_etag(member_task_relation)})
 
+    @retry_on_conflict
     def patch(self, request, *args, **kwargs):
-        with transaction.atomic():
-            queryset = self.get_queryset().select_for_update()
-            instance = get_object_or_404(queryset, pk=kwargs["pk"])
+        instance = get_object_or_404(self.get_queryset(), pk=kwargs["pk"])
+        self.check_object_permissions(request, instance.group_task)
+        check_if_match(request, instance)
 
-            self.check_object_permissions(request, instance.group_task)
+        serializer = self.get_serializer(
+            instance,
+            data=request.data,
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
 
-            serializer = self.get_serializer(
-                instance,
-                data=request.data,
-                partial=True
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+        # no row lock, only written if the relation is unchanged since it was read
+        member_task_relation = update_member_task_relation(instance, serializer.validated_data)
 
-        return Response(self.serializer_class(instance).data)
+        return Response(
+            self.serializer_class(member_task_relation).data,
+            headers={"ETag": get_version_etag(member_task_relation)}
+        )
 
     def delete(self, request, *args, **kwargs):
         instance = get_object_or_404(self.get_queryset(), pk=kwargs["pk"])
-        self.check_object_permissions(request, instance.group_task)
+        self.check_object_permissions(request, instance)
 
         instance.delete()
 
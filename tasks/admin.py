@@ -1,7 +1,6 @@
 from django.contrib import admin
 
-from .models import Task, UserTask
+from .models import UserTask
 
 
-admin.site.register(Task)
 admin.site.register(UserTask)
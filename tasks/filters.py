@@ -1,4 +1,3 @@
-from django.utils import timezone
 from django.db.models import Q, F
 
 from rest_framework.filters import OrderingFilter
@@ -6,7 +5,10 @@ from rest_framework.filters import OrderingFilter
 import django_filters
 from django_filters.rest_framework import FilterSet
 
+from core.clock import get_request_now
+
 from .models import Task
+from .search import SEARCH_RANK_ANNOTATION, search_tasks
 
 
 class TaskFilter(FilterSet):
@@ -17,19 +19,18 @@ class TaskFilter(FilterSet):
     due_date_before = django_filters.DateTimeFilter(field_name="due_date", lookup_expr="lt")
     no_due_date = django_filters.BooleanFilter(field_name="due_date", lookup_expr="isnull")
     description = django_filters.CharFilter(field_name="description", lookup_expr="icontains")
+    search = django_filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Task
         fields = []
 
     def filter_current(self, queryset, name, value):
-        now = timezone.now()
+        now = get_request_now(self.request)
 
         if value:
-            return queryset.filter(
-                Q(due_date__gte=now) | Q(due_date__isnull=True)
-            )
-        return queryset.filter(due_date__lt=now)
+            return queryset.current(now)
+        return queryset.expired(now)
 
     def filter_due_date_after(self, queryset, name, value):
         if value:
@@ -38,10 +39,19 @@ class TaskFilter(FilterSet):
             )
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_tasks(queryset, value)
+
 class TaskOrderingFilter(OrderingFilter):
     # treats due_date=None as bigger date (no due date)
     def filter_queryset(self, request, queryset, view):
-        ordering = self.get_ordering(request, queryset, view)
+        # search results keep relevance order unless ordering is requested explicitly
+        if SEARCH_RANK_ANNOTATION in queryset.query.annotations:
+            if self.ordering_param not in request.query_params:
+                return queryset
+
+        # copied so the view's default ordering is not rewritten in place
+        ordering = list(self.get_ordering(request, queryset, view) or [])
 
         if ordering:
             for idx, field in enumerate(ordering):
@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    Predicates of task currentness against one request-level now
+    """
+    @staticmethod
+    def get_current_condition(now):
+        return models.Q(due_date__gte=now) | models.Q(due_date__isnull=True)
+
+    @staticmethod
+    def get_expired_condition(now):
+        return models.Q(due_date__lt=now)
+
+    def current(self, now):
+        return self.filter(self.get_current_condition(now))
+
+    def expired(self, now):
+        return self.filter(self.get_expired_condition(now))
+
+    def relevant(self, now):
+        return self.filter(is_closed=False).current(now)
+
+    def with_currentness(self, now):
+        """
+        Annotates is_current computed by the database against now
+        """
+        return self.annotate(
+            is_current=models.ExpressionWrapper(
+                self.get_current_condition(now),
+                output_field=models.BooleanField()
+            )
+        )
+
+
+TaskManager = models.Manager.from_queryset(TaskQuerySet)
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_remove_task_status_task_is_closed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(
+                condition=models.Q(('is_closed', False)),
+                fields=['due_date'],
+                name='task_open_due_date_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['is_closed', 'due_date'], name='task_closed_due_date_idx'),
+        ),
+    ]
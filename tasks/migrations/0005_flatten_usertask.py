@@ -0,0 +1,116 @@
+# Moves UserTask out of multi-table inheritance:
+# rows of tasks_task + tasks_usertask are copied into one table keeping their ids,
+# Task becomes an abstract model once GroupTask no longer inherits from it
+
+import django.db.models.deletion
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def copy_user_tasks_to_flat_table(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    task_model = apps.get_model("tasks", "Task")
+    user_task_model = apps.get_model("tasks", "UserTask")
+    user_task_flat_model = apps.get_model("tasks", "UserTaskFlat")
+
+    schema_editor.execute(
+        f"INSERT INTO {quote(user_task_flat_model._meta.db_table)} "
+        "(id, description, is_closed, due_date, created_at, updated_at, user_id) "
+        "SELECT t.id, t.description, t.is_closed, t.due_date, t.created_at, t.updated_at, "
+        "u.user_id "
+        f"FROM {quote(user_task_model._meta.db_table)} u "
+        f"INNER JOIN {quote(task_model._meta.db_table)} t ON t.id = u.task_ptr_id"
+    )
+
+    for sql in connection.ops.sequence_reset_sql(no_style(), [user_task_flat_model]):
+        schema_editor.execute(sql)
+
+
+def copy_user_tasks_to_inherited_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+
+    task_model = apps.get_model("tasks", "Task")
+    user_task_model = apps.get_model("tasks", "UserTask")
+    user_task_flat_model = apps.get_model("tasks", "UserTaskFlat")
+
+    schema_editor.execute(
+        f"INSERT INTO {quote(task_model._meta.db_table)} "
+        "(id, description, is_closed, due_date, created_at, updated_at) "
+        "SELECT id, description, is_closed, due_date, created_at, updated_at "
+        f"FROM {quote(user_task_flat_model._meta.db_table)}"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {quote(user_task_model._meta.db_table)} (task_ptr_id, user_id) "
+        f"SELECT id, user_id FROM {quote(user_task_flat_model._meta.db_table)}"
+    )
+
+    for sql in connection.ops.sequence_reset_sql(no_style(), [task_model]):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_indexes'),
+        ('groups', '0003_flatten_grouptask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskFlat',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('description', models.TextField()),
+                ('is_closed', models.BooleanField(default=False)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+',
+                    to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+        ),
+        migrations.RunPython(copy_user_tasks_to_flat_table, copy_user_tasks_to_inherited_tables),
+        migrations.DeleteModel(
+            name='UserTask',
+        ),
+        migrations.DeleteModel(
+            name='Task',
+        ),
+        migrations.RenameModel(
+            old_name='UserTaskFlat',
+            new_name='UserTask',
+        ),
+        migrations.AlterField(
+            model_name='usertask',
+            name='user',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='usertask',
+            index=models.Index(
+                condition=models.Q(('is_closed', False)),
+                fields=['user', 'due_date'],
+                name='usertask_open_due_date_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='usertask',
+            index=models.Index(fields=['user', 'due_date'], name='usertask_user_due_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tasks.search
+from tasks.search import create_search_index, drop_search_index
+
+
+def create_user_task_search_index(apps, schema_editor):
+    user_task_model = apps.get_model("tasks", "UserTask")
+    create_search_index(schema_editor, user_task_model._meta.db_table)
+
+
+def drop_user_task_search_index(apps, schema_editor):
+    user_task_model = apps.get_model("tasks", "UserTask")
+    drop_search_index(schema_editor, user_task_model._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_flatten_usertask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskSearchEntry',
+            fields=[
+                ('task', models.OneToOneField(
+                    on_delete=django.db.models.deletion.DO_NOTHING,
+                    primary_key=True,
+                    related_name='search_entry',
+                    serialize=False,
+                    to='tasks.usertask',
+                )),
+                ('description', tasks.search.SearchDocumentField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'tasks_usertask_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_user_task_search_index, drop_user_task_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+from tasks.search import create_search_index
+
+
+def recreate_user_task_search_index(apps, schema_editor):
+    # changing the columns remakes the table on SQLite, which drops the index triggers
+    user_task_model = apps.get_model("tasks", "UserTask")
+    create_search_index(schema_editor, user_task_model._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_usertask_search_index'),
+    ]
+
+    operations = [
+        # rebuilds the index after the column is removed again on unapply
+        migrations.RunPython(migrations.RunPython.noop, recreate_user_task_search_index),
+        migrations.AddField(
+            model_name='usertask',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(recreate_user_task_search_index, migrations.RunPython.noop),
+    ]
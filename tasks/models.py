@@ -1,6 +1,9 @@
 from django.db import models
 from django.utils import timezone
 
+from .managers import TaskManager
+from .search import SearchDocumentField
+
 
 class Task(models.Model):
     description = models.TextField()
@@ -8,14 +11,65 @@ class Task(models.Model):
     due_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # bumped on every write, checked by conditional updates (core.concurrency)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = TaskManager()
+
+    class Meta:
+        # every task kind is stored in its own table without joins
+        abstract = True
 
     @property
     def is_current(self):
+        # annotated by TaskQuerySet.with_currentness or set by state transitions
+        if "_is_current" in self.__dict__:
+            return self._is_current
+
         return self.due_date is None or self.due_date >= timezone.now()
 
+    @is_current.setter
+    def is_current(self, value):
+        self._is_current = value
+
     def __str__(self):
         return f"{self.pk} {self.description[:20]}"
 
 
 class UserTask(Task):
     user = models.ForeignKey("users.User", on_delete=models.CASCADE)
+
+    class Meta(Task.Meta):
+        indexes = [
+            # relevant (open and not expired) tasks ordered by due date
+            models.Index(
+                fields=["user", "due_date"],
+                condition=models.Q(is_closed=False),
+                name="usertask_open_due_date_idx"
+            ),
+            models.Index(fields=["user", "due_date"], name="usertask_user_due_date_idx"),
+        ]
+
+
+class TaskSearchEntry(models.Model):
+    """
+    Read-only FTS5 index over the descriptions of a task kind (tasks.search)
+    """
+    description = SearchDocumentField()
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class UserTaskSearchEntry(TaskSearchEntry):
+    task = models.OneToOneField(
+        "tasks.UserTask",
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry"
+    )
+
+    class Meta(TaskSearchEntry.Meta):
+        db_table = "tasks_usertask_fts"
@@ -6,7 +6,7 @@ class IsTaskOwner(permissions.BasePermission):
         return request.user and request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
 
 
 class IsTaskOwnerOrStaff(permissions.BasePermission):
@@ -17,4 +17,4 @@ class IsTaskOwnerOrStaff(permissions.BasePermission):
         if request.user.is_staff:
             return True
 
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
@@ -0,0 +1,100 @@
+import re
+
+from django.db import connections, models
+
+
+SEARCH_RANK_ANNOTATION = "search_rank"
+
+
+class SearchDocumentField(models.TextField):
+    """
+    Column of an FTS5 table, supports the __match lookup
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+def get_search_table(table):
+    return f"{table}_fts"
+
+
+def create_search_index(schema_editor, table):
+    """
+    Creates an FTS5 index over table.description kept in sync by triggers
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    drop_search_index(schema_editor, table)
+
+    search_table = get_search_table(table)
+
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE "{search_table}" USING fts5(description, task_id UNINDEXED)'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER "{search_table}_insert" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{search_table}"(rowid, description, task_id) '
+        "VALUES (new.id, new.description, new.id); "
+        "END"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER "{search_table}_delete" AFTER DELETE ON "{table}" BEGIN '
+        f'DELETE FROM "{search_table}" WHERE rowid = old.id; '
+        "END"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER "{search_table}_update" AFTER UPDATE OF description ON "{table}" BEGIN '
+        f'UPDATE "{search_table}" SET description = new.description WHERE rowid = old.id; '
+        "END"
+    )
+    schema_editor.execute(
+        f'INSERT INTO "{search_table}"(rowid, description, task_id) '
+        f'SELECT id, description, id FROM "{table}"'
+    )
+
+
+def drop_search_index(schema_editor, table):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    search_table = get_search_table(table)
+
+    for action in ("insert", "delete", "update"):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS "{search_table}_{action}"')
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{search_table}"')
+
+
+def build_match_query(text):
+    """
+    Turns user input into an FTS5 query of quoted prefixes
+    """
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+def search_tasks(queryset, text):
+    """
+    Filters tasks matching the text ordered by search_rank
+    """
+    match_query = build_match_query(text)
+
+    if not match_query:
+        return queryset.none()
+
+    if connections[queryset.db].vendor != "sqlite":
+        return queryset.filter(description__icontains=text)
+
+    return queryset.filter(
+        search_entry__description__match=match_query
+    ).annotate(**{
+        SEARCH_RANK_ANNOTATION: models.F("search_entry__rank")
+    }).order_by(SEARCH_RANK_ANNOTATION)
@@ -1,14 +1,19 @@
 from rest_framework import serializers
 
-from .models import UserTask, Task
+from core.fast_serializers import FastSerializer
+from core.sparse_fields import SparseFieldsSerializerMixin
+
+from .models import UserTask
 from .validators import validate_future_date
+from .services.bulk_task_management import BulkTaskActions
 
 
 class BaseTaskSerializer(serializers.ModelSerializer):
     is_current = serializers.ReadOnlyField()
 
     class Meta:
-        model = Task
+        # Task is abstract, its fields are the same on every concrete task model
+        model = UserTask
         fields = ("pk", "description", "is_closed", "is_current", "due_date", "created_at", "updated_at")
         read_only_fields = ("pk", "created_at", "updated_at")
 
@@ -16,21 +21,36 @@ class BaseTaskSerializer(serializers.ModelSerializer):
         return validate_future_date(value, "Task's due date must be in the future")
 
 
-class TaskInfoSerializer(BaseTaskSerializer):
+class TaskInfoSerializer(SparseFieldsSerializerMixin, BaseTaskSerializer):
     """
-    ONLY FOR SEREALIZATION\n
-    returns (pk, description, is_closed, is_current, due_date, created_at, updated_at)
+    ONLY FOR SEREALIZATION, takes optional fields and expand
     """
     class Meta(BaseTaskSerializer.Meta):
         read_only_fields = BaseTaskSerializer.Meta.fields
 
 
+class TaskInfoFastSerializer(FastSerializer):
+    """
+    ONLY FOR SEREALIZATION, same output as TaskInfoSerializer from values() rows
+    """
+    fields = (
+        ("pk", "pk"),
+        ("description", "description"),
+        ("is_closed", "is_closed"),
+        ("is_current", "is_current"),
+        ("due_date", "due_date"),
+        ("created_at", "created_at"),
+        ("updated_at", "updated_at")
+    )
+    datetime_fields = ("due_date", "created_at", "updated_at")
+
+
 class UserTaskInfoSerializer(TaskInfoSerializer):
     """
     ONLY FOR SEREALIZATION\n
     returns (pk, description, is_closed, is_current, due_date, user_id, created_at, updated_at)
     """
-    user_id = serializers.IntegerField(source="user.pk", read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
 
     class Meta(TaskInfoSerializer.Meta):
         model = UserTask
@@ -62,3 +82,28 @@ class TaskReissueSerializer(BaseTaskSerializer):
         extra_kwargs = {
             "due_date": {"write_only": True}
         }
+
+
+class BulkTaskOperationSerializer(serializers.Serializer):
+    """
+    ONLY FOR DESEREALIZATION, expects (action, pk, fields)
+    """
+    action = serializers.ChoiceField(choices=BulkTaskActions.choices)
+    pk = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs["action"] != BulkTaskActions.CREATE and "pk" not in attrs:
+            raise serializers.ValidationError({"pk": "This field is required."})
+
+        return attrs
+
+
+class BulkTaskRequestSerializer(serializers.Serializer):
+    """
+    ONLY FOR DESEREALIZATION, expects (operations)
+    """
+    operations = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000
+    )
@@ -0,0 +1,108 @@
+from django.db import models, transaction
+
+from tasks.exceptions import TaskError
+from tasks.models import UserTask
+from tasks.services.task_management import check_task_can_be_updated, check_task_can_be_closed
+
+
+class BulkTaskActions(models.TextChoices):
+    CREATE = "create"
+    UPDATE = "update"
+    CLOSE = "close"
+    DELETE = "delete"
+
+
+def change_task(task, action, fields):
+    """
+    Applies an update or close to the task in memory, returns False if nothing changed
+    """
+    if action == BulkTaskActions.CLOSE:
+        check_task_can_be_closed(task)
+        task.is_closed = True
+
+        return True
+
+    if not fields:
+        return False
+
+    check_task_can_be_updated(task, fields)
+
+    for field, value in fields.items():
+        setattr(task, field, value)
+
+    if "due_date" in fields:
+        task.is_current = True
+
+    return True
+
+
+def apply_user_task_operations(user, operations, now):
+    """
+    Returns {index: (task, error)} of the operations applied in one transaction
+    """
+    results = {}
+
+    target_pks = {
+        operation["pk"]
+        for operation in operations
+        if operation["action"] != BulkTaskActions.CREATE
+    }
+
+    with transaction.atomic():
+        tasks = UserTask.objects.select_for_update().filter(
+            user=user
+        ).with_currentness(now).in_bulk(target_pks) if target_pks else {}
+
+        new_tasks = []
+        changed_tasks = {}
+        deleted_pks = set()
+
+        for operation in operations:
+            index, action = operation["index"], operation["action"]
+
+            if action == BulkTaskActions.CREATE:
+                task = UserTask(user=user, **operation["fields"])
+                new_tasks.append(task)
+                results[index] = (task, None)
+                continue
+
+            task = tasks.get(operation["pk"])
+
+            if task is None:
+                results[index] = (None, TaskError("Task not found.", "not_found"))
+                continue
+
+            if action == BulkTaskActions.DELETE:
+                del tasks[task.pk]
+                changed_tasks.pop(task.pk, None)
+                deleted_pks.add(task.pk)
+                results[index] = (None, None)
+                continue
+
+            try:
+                changed = change_task(task, action, operation["fields"])
+            except TaskError as error:
+                results[index] = (None, error)
+                continue
+
+            if changed:
+                task.updated_at = now
+                # bulk_update skips save_versioned, stale If-Match headers must still fail
+                task.version += 1
+                changed_tasks[task.pk] = task
+
+            results[index] = (task, None)
+
+        if new_tasks:
+            UserTask.objects.bulk_create(new_tasks)
+
+        if changed_tasks:
+            UserTask.objects.bulk_update(
+                changed_tasks.values(),
+                ["description", "due_date", "is_closed", "updated_at", "version"]
+            )
+
+        if deleted_pks:
+            UserTask.objects.filter(pk__in=deleted_pks).delete()
+
+    return results
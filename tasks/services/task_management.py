@@ -1,13 +1,17 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from rest_framework.exceptions import NotFound
+
+from core.concurrency import PreconditionFailed, update_conditionally
 from tasks.exceptions import TaskStatusError, TaskError
+from tasks.managers import TaskQuerySet
 
 
-def update_task(task, fields):
+def check_task_can_be_updated(task, fields):
     """
-    Expects Task Object and field dict
+    Raises TaskError if the fields can not be applied to the task
     """
-    if not fields:
-        return task
-
     if task.is_closed:
         raise TaskStatusError("Task is closed and can not be updated. Reissue this task to update it.", "closed")
 
@@ -17,10 +21,75 @@ def update_task(task, fields):
     if "is_closed" in fields:
         raise TaskError("Task status can not be changed manually.")
 
+
+def check_task_can_be_closed(task):
+    """
+    Raises TaskError if the task can not be closed
+    """
+    if task.is_closed:
+        raise TaskStatusError("Task is already closed.", "closed")
+
+    # if not task.is_current:
+    #     raise TaskStatusError("Task is expired and can not be closed.", "expired")
+
+
+def check_task_can_be_reissued(task):
+    """
+    Raises TaskError if the task can not be reissued
+    """
+    if not task.is_closed and task.is_current:
+        raise TaskStatusError("Task is currenty active and can not be reissued.", "active")
+
+
+def write_task(task, update_fields, condition, check_version, now):
+    """
+    Writes with one conditional UPDATE, returns False if no row matched
+    """
+    if not update_conditionally(task, update_fields, condition, check_version):
+        return False
+
+    # without the version check the row may have got another due date
+    task.is_current = task.due_date is None or task.due_date >= now
+
+    return True
+
+
+def raise_write_conflict(task, check):
+    """
+    Raises NotFound for a deleted task, TaskError for a state change, PreconditionFailed otherwise
+    """
+    manager = type(task)._meta.default_manager
+    current = manager.filter(pk=task.pk).only("is_closed", "due_date").first()
+
+    if current is None:
+        raise NotFound()
+
+    check(current)
+
+    raise PreconditionFailed()
+
+
+def update_task(task, fields, check_version=True, now=None):
+    """
+    Expects Task Object and field dict
+    """
+    if not fields:
+        return task
+
+    check_task_can_be_updated(task, fields)
+    now = now or timezone.now()
+
     for field, value in fields.items():
         setattr(task, field, value)
 
-    task.save(update_fields=["updated_at", *fields.keys()])
+    if not write_task(
+        task,
+        ["updated_at", *fields.keys()],
+        Q(is_closed=False) & TaskQuerySet.get_current_condition(now),
+        check_version,
+        now
+    ):
+        raise_write_conflict(task, lambda current: check_task_can_be_updated(current, {}))
 
     return task
 
@@ -33,31 +102,41 @@ def delete_task(task):
     task.delete()
 
 
-def close_task(task):
+def close_task(task, check_version=True, now=None):
     """
     Expects Task Object
     """
-    if task.is_closed:
-        raise TaskStatusError("Task is already closed.", "closed")
-
-    # if not task.is_current:
-    #     raise TaskStatusError("Task is expired and can not be closed.", "expired")
+    check_task_can_be_closed(task)
 
     task.is_closed = True
-    task.save(update_fields=["is_closed", "updated_at"])
+
+    written = write_task(
+        task, ["is_closed", "updated_at"], Q(is_closed=False), check_version, now or timezone.now()
+    )
+
+    if not written:
+        raise_write_conflict(task, check_task_can_be_closed)
 
     return task
 
 
-def reissue_task(task, new_due_date):
+def reissue_task(task, new_due_date, check_version=True, now=None):
     """
     Expects Task Object and validated datetime
     """
-    if not task.is_closed and task.is_current:
-        raise TaskStatusError("Task is currenty active and can not be reissued.", "active")
+    check_task_can_be_reissued(task)
+    now = now or timezone.now()
 
     task.is_closed = False
-    task.due_date=new_due_date
-    task.save(update_fields=["is_closed", "due_date", "updated_at"])
+    task.due_date = new_due_date
+
+    if not write_task(
+        task,
+        ["is_closed", "due_date", "updated_at"],
+        Q(is_closed=True) | TaskQuerySet.get_expired_condition(now),
+        check_version,
+        now
+    ):
+        raise_write_conflict(task, check_task_can_be_reissued)
 
     return task
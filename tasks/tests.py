@@ -1,3 +1,1001 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient
+
+from core import clock, concurrency, tracing
+from core.concurrency import PreconditionFailed
+from core.metrics import CONTENT_TYPE, MetricsMiddleware, RequestMetrics, request_metrics
+from core.profiling import ProfilingMiddleware, StackSampler, list_profiles, store_profile
+from core.query_budget import QueryRecorder
+from core.tracing import TracingMiddleware, export_trace
+from users.tokens import MembershipRefreshToken
+
+from .exceptions import TaskError, TaskStatusError
+from .models import UserTask
+from .services import task_management
+from .views import UserTaskListView
+
+
+User = get_user_model()
+
+
+def get_query_plans(client, url, table):
+    """
+    Returns [(sql, plan details)] of the statements on the table the request runs
+    """
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        response = client.get(url)
+
+    assert response.status_code == 200, response.content
+    plans = []
+
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            if f'FROM "{table}"' in sql:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plans.append((sql, [row[3] for row in cursor.fetchall()]))
+
+    return plans
+
+
+class CommitCallbacksClient(APIClient):
+    """
+    Runs the on_commit callbacks of each request, the test case's transaction never commits
+    """
+    def request(self, **kwargs):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            return super().request(**kwargs)
+
+
+def get_access_token(user):
+    return str(MembershipRefreshToken.for_user(user).access_token)
+
+
+def get_client(user):
+    client = CommitCallbacksClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_access_token(user)}")
+
+    return client
+
+
+async def get_sync_and_async_responses(user, path):
+    # the responses of a view and of its async twin under /api/async/
+    client = await sync_to_async(get_async_client)(user)
+
+    return await client.get(f"/api/{path}"), await client.get(f"/api/async/{path}")
+
+
+async def get_empty_response(request):
+    return HttpResponse()
+
+
+def get_async_client(user):
+    # AsyncClient(headers=...) keeps WSGI names, which reach the view as HTTP_HTTP_AUTHORIZATION,
+    # other defaults are sent as ASGI headers
+    return AsyncClient(authorization=f"Bearer {get_access_token(user)}")
+
+
+def get_response_body(response):
+    body = response.json()
+
+    # exception handler's time of the error
+    if isinstance(body, dict):
+        body.pop("timestampz", None)
+
+    return body
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+# requests over their query_budget fail the test
+@override_settings(QUERY_BUDGET_MODE="raise")
+class UserTaskTestCase(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+        self.user = User.objects.create_user("user@example.com", nickname="user")
+        self.client = get_client(self.user)
+
+    def add_tasks(self, count, **fields):
+        now = timezone.now()
+
+        return UserTask.objects.bulk_create([
+            UserTask(
+                user=self.user,
+                description=f"task {index}",
+                due_date=now + timedelta(days=index),
+                **fields
+            )
+            for index in range(count)
+        ])
+
+
+class KeysetPaginationTests(UserTaskTestCase):
+    url = "/api/user-tasks/?pagination=cursor"
+
+    def test_pages_follow_the_ordering(self):
+        tasks = self.add_tasks(15)
+        UserTask.objects.create(user=self.user, description="no due date")
+
+        first_page = self.client.get(self.url).json()
+        second_page = self.client.get(first_page["next"]).json()
+
+        self.assertEqual(
+            [row["pk"] for row in first_page["results"]], [task.pk for task in tasks[:10]]
+        )
+        # tasks without a due date come last
+        self.assertEqual(len(second_page["results"]), 6)
+        self.assertEqual(second_page["results"][-1]["description"], "no due date")
+        self.assertIsNone(second_page["next"])
+
+    def test_tampered_cursor(self):
+        self.add_tasks(3)
+
+        for cursor in (
+            "not base64!",
+            base64.urlsafe_b64encode(b"not json").decode(),
+            encode_cursor({"due_date": None}),
+            encode_cursor([None]),
+            encode_cursor([{"due_date": 1}, 1]),
+            encode_cursor(["not a date", 1]),
+            encode_cursor(["2026-13-40T00:00:00", 1]),
+            encode_cursor([None, "not a pk"]),
+            encode_cursor([None, [1]]),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f"{self.url}&cursor={cursor}")
+
+                self.assertEqual(response.status_code, 404, response.content)
+                self.assertEqual(response.json()["detail"], "Invalid cursor")
+
+
+class TaskIndexTests(UserTaskTestCase):
+    """
+    Current and expired task lists seek the (user, due_date) indexes, counts any user index
+    """
+    def test_task_lists_use_due_date_indexes(self):
+        self.add_tasks(20)
+        self.add_tasks(5, is_closed=True)
+        index_names = [index.name for index in UserTask._meta.indexes]
+
+        for url in (
+            "/api/user-tasks/",
+            "/api/user-tasks/?current=true",
+            "/api/user-tasks/?current=false",
+            "/api/user-tasks/?closed=false&current=true",
+        ):
+            plans = get_query_plans(self.client, url, UserTask._meta.db_table)
+            self.assertTrue(plans)
+
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    self.assertTrue(any(
+                        detail.startswith(f"SEARCH {UserTask._meta.db_table} USING")
+                        and ("COUNT(" in sql or any(name in detail for name in index_names))
+                        for detail in plan
+                    ), plan)
+
+
+class TaskSearchTests(UserTaskTestCase):
+    """
+    ?search= matches quoted word prefixes through the FTS5 index kept in sync by triggers
+    """
+    url = "/api/user-tasks/?search="
+
+    def search(self, text):
+        response = self.client.get(f"{self.url}{text}")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        return sorted(row["description"] for row in response.json()["results"])
+
+    def test_matches_word_prefixes(self):
+        UserTask.objects.create(user=self.user, description="buy milk")
+        UserTask.objects.create(user=self.user, description="buy bread OR milk")
+        UserTask.objects.create(user=self.user, description="call mom")
+
+        self.assertEqual(self.search("bu"), ["buy bread OR milk", "buy milk"])
+        self.assertEqual(self.search("buy bread"), ["buy bread OR milk"])
+        # FTS5 operators in the input are plain words
+        self.assertEqual(self.search("milk OR"), ["buy bread OR milk"])
+        self.assertEqual(self.search("*"), [])
+
+    def test_index_follows_writes(self):
+        task = UserTask.objects.create(user=self.user, description="buy milk")
+
+        UserTask.objects.filter(pk=task.pk).update(description="call mom")
+        self.assertEqual(self.search("milk"), [])
+        self.assertEqual(self.search("mom"), ["call mom"])
+
+        task.delete()
+        self.assertEqual(self.search("mom"), [])
+
+    def test_search_starts_from_the_index(self):
+        self.add_tasks(20)
+        table = UserTask._meta.db_table
+
+        for url in (f"{self.url}task", f"{self.url}task&pagination=cursor&ordering=due_date"):
+            plans = get_query_plans(self.client, url, table)
+            self.assertTrue(plans)
+
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    self.assertTrue(plan[0].startswith(f"SCAN {table}_fts VIRTUAL TABLE"), plan)
+                    self.assertIn(f"SEARCH {table} USING INTEGER PRIMARY KEY (rowid=?)", plan)
+
+    def test_query_count_does_not_depend_on_matches(self):
+        self.add_tasks(2)
+        # the first request caches the authenticated user
+        self.search("task")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.search("task")
+
+        self.add_tasks(30)
+
+        with self.assertNumQueries(len(queries)):
+            self.search("task")
+
+
+class UserTaskBulkTests(UserTaskTestCase):
+    url = "/api/user-tasks/bulk/"
+
+    def post(self, operations, client=None, url=None):
+        response = (client or self.client).post(
+            url or self.url, {"operations": operations}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+        return response.json()["results"]
+
+    def test_mixed_batch(self):
+        # the first task is due now, it expires during the request
+        updated, closed, deleted = self.add_tasks(4)[1:]
+        due_date = (timezone.now() + timedelta(days=30)).isoformat()
+
+        results = self.post([
+            {"action": "create", "description": "new"},
+            {"action": "update", "pk": updated.pk, "description": "updated", "due_date": due_date},
+            {"action": "close", "pk": closed.pk},
+            {"action": "delete", "pk": deleted.pk},
+        ])
+
+        self.assertEqual([result["status"] for result in results], ["ok"] * 4)
+        self.assertEqual(results[0]["task"]["description"], "new")
+        self.assertEqual(results[1]["task"]["description"], "updated")
+        self.assertTrue(results[2]["task"]["is_closed"])
+        self.assertNotIn("task", results[3])
+
+        self.assertEqual(
+            set(UserTask.objects.exclude(description="task 0").values_list(
+                "description", "is_closed"
+            )),
+            {("new", False), ("updated", False), (closed.description, True)}
+        )
+
+    def test_failed_items_leave_the_others_applied(self):
+        task, closed_task = self.add_tasks(3)[1:]
+        UserTask.objects.filter(pk=closed_task.pk).update(is_closed=True)
+        other_task = UserTask.objects.create(
+            user=User.objects.create_user("other@example.com", nickname="other"),
+            description="other"
+        )
+
+        results = self.post([
+            {"action": "archive", "pk": task.pk},
+            {"action": "update", "description": "no pk"},
+            {"action": "create", "due_date": "2000-01-01T00:00:00Z"},
+            {"action": "update", "pk": closed_task.pk, "description": "closed"},
+            {"action": "close", "pk": closed_task.pk},
+            {"action": "delete", "pk": other_task.pk},
+            {"action": "update", "pk": task.pk, "description": "updated"},
+        ])
+
+        self.assertEqual([result["status"] for result in results], ["error"] * 6 + ["ok"])
+        self.assertIn("action", results[0]["errors"])
+        self.assertIn("pk", results[1]["errors"])
+        self.assertIn("due_date", results[2]["errors"])
+        self.assertEqual(results[3]["errors"]["code"], "task_status_closed")
+        self.assertEqual(results[4]["errors"]["code"], "task_status_closed")
+        self.assertEqual(results[5]["errors"]["code"], "not_found")
+
+        self.assertTrue(UserTask.objects.filter(pk=other_task.pk).exists())
+        self.assertEqual(UserTask.objects.get(pk=task.pk).description, "updated")
+
+    def test_batch_size_is_capped(self):
+        operation = {"action": "create", "description": "new"}
+        response = self.client.post(self.url, {"operations": [operation] * 1001}, format="json")
+
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertFalse(UserTask.objects.exists())
+
+        self.assertEqual(len(self.post([operation] * 1000)), 1000)
+
+    def test_staff_route(self):
+        url = f"/api/users/{self.user.pk}/tasks/bulk/"
+        operations = [{"action": "create", "description": "new"}]
+
+        response = self.client.post(url, {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 403, response.content)
+
+        staff_client = get_client(
+            User.objects.create_user("staff@example.com", nickname="staff", is_staff=True)
+        )
+        self.assertEqual(self.post(operations, staff_client, url)[0]["status"], "ok")
+        self.assertEqual(UserTask.objects.get().user, self.user)
+
+        response = staff_client.post(
+            "/api/users/0/tasks/bulk/", {"operations": operations}, format="json"
+        )
+        self.assertEqual(response.status_code, 404, response.content)
+
+
+class UserTaskIfMatchTests(UserTaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.add_tasks(2)[1]
+        self.url = f"/api/user-tasks/{self.task.pk}/"
+
+    def patch(self, **headers):
+        return self.client.patch(self.url, {"description": "updated"}, format="json", **headers)
+
+    def test_etag_is_sent_on_reads_and_writes(self):
+        self.assertEqual(self.client.get(self.url)["ETag"], '"0"')
+        self.assertEqual(self.patch()["ETag"], '"1"')
+        self.assertEqual(self.client.post(f"{self.url}close/")["ETag"], '"2"')
+
+    def test_if_match(self):
+        response = self.patch(HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412, response.content)
+        self.assertEqual(UserTask.objects.get(pk=self.task.pk).description, self.task.description)
+
+        # a weak ETag never matches a strong comparison
+        response = self.patch(HTTP_IF_MATCH='W/"0"')
+        self.assertEqual(response.status_code, 412, response.content)
+
+        response = self.patch(HTTP_IF_MATCH='"5", "0"')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response["ETag"], '"1"')
+
+        response = self.patch(HTTP_IF_MATCH="*")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response["ETag"], '"2"')
+
+    # the injected writes and retries are outside the happy path the budgets cover
+    @override_settings(QUERY_BUDGET_MODE="off")
+    def test_version_changed_after_the_read(self):
+        check_if_match = concurrency.check_if_match
+
+        def check_then_write(request, instance):
+            version_pinned = check_if_match(request, instance)
+            # another request writes the task between the read and the UPDATE
+            UserTask.objects.filter(pk=instance.pk).update(version=F("version") + 1)
+            return version_pinned
+
+        with mock.patch("tasks.views.check_if_match", side_effect=check_then_write):
+            response = self.patch(HTTP_IF_MATCH='"0"')
+
+        self.assertEqual(response.status_code, 412, response.content)
+        self.assertEqual(UserTask.objects.get(pk=self.task.pk).description, self.task.description)
+
+    @override_settings(QUERY_BUDGET_MODE="off")
+    def test_conflicts_are_retried_without_if_match(self):
+        update_conditionally = task_management.update_conditionally
+        path = "tasks.services.task_management.update_conditionally"
+
+        def conflict_once(*args):
+            # the first UPDATE matches no row, the state check of the re-read passes
+            return update.call_count > 1 and update_conditionally(*args)
+
+        with mock.patch(path, side_effect=conflict_once) as update:
+            response = self.patch()
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response["ETag"], '"1"')
+        self.assertEqual(update.call_count, 2)
+
+        with mock.patch(path, return_value=False) as update:
+            response = self.patch()
+
+        self.assertEqual(response.status_code, 409, response.content)
+        self.assertEqual(update.call_count, concurrency.WRITE_ATTEMPTS)
+
+        with mock.patch(path, return_value=False) as update:
+            response = self.patch(HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, 412, response.content)
+        self.assertEqual(update.call_count, 1)
+
+    def test_bulk_update_bumps_the_version(self):
+        response = self.client.post(
+            "/api/user-tasks/bulk/",
+            {"operations": [{"action": "update", "pk": self.task.pk, "description": "bulk"}]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(self.patch(HTTP_IF_MATCH='"0"').status_code, 412)
+        self.assertEqual(self.patch(HTTP_IF_MATCH='"1"').status_code, 200)
+
+
+class TaskTransitionTests(UserTaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.task = self.add_tasks(2)[1]
+
+    def get_task(self):
+        return UserTask.objects.with_currentness(self.now).get(pk=self.task.pk)
+
+    def write_row(self, **fields):
+        # another request writes the row after this one read it
+        UserTask.objects.filter(pk=self.task.pk).update(version=F("version") + 1, **fields)
+
+    def assert_status(self, status, transition, *args, **kwargs):
+        with self.assertRaises(TaskStatusError) as context:
+            transition(*args, **kwargs)
+
+        self.assertEqual(context.exception.code, f"task_status_{status}")
+
+    def test_close(self):
+        task = task_management.close_task(self.get_task(), now=self.now)
+
+        self.assertTrue(task.is_closed)
+        self.assertEqual(task.version, 1)
+        self.assertTrue(self.get_task().is_closed)
+
+        # already closed, checked before the UPDATE and by the re-read after it
+        self.assert_status("closed", task_management.close_task, self.get_task(), now=self.now)
+
+    def test_close_conflicts(self):
+        task = self.get_task()
+        self.write_row(is_closed=True)
+        self.assert_status(
+            "closed", task_management.close_task, task, check_version=False, now=self.now
+        )
+
+        UserTask.objects.filter(pk=self.task.pk).update(is_closed=False)
+        task = self.get_task()
+        self.write_row()
+        with self.assertRaises(PreconditionFailed):
+            task_management.close_task(task, now=self.now)
+
+        # the version is not pinned, the open row is closed
+        task = self.get_task()
+        self.write_row()
+        task = task_management.close_task(task, check_version=False, now=self.now)
+        self.assertTrue(task.is_closed)
+
+        UserTask.objects.filter(pk=self.task.pk).update(is_closed=False)
+        task = self.get_task()
+        UserTask.objects.filter(pk=task.pk).delete()
+        with self.assertRaises(NotFound):
+            task_management.close_task(task, now=self.now)
+
+    def test_reissue(self):
+        due_date = self.now + timedelta(days=5)
+
+        self.assert_status(
+            "active", task_management.reissue_task, self.get_task(), due_date, now=self.now
+        )
+
+        for fields in ({"is_closed": True}, {"due_date": self.now - timedelta(days=1)}):
+            UserTask.objects.filter(pk=self.task.pk).update(**fields)
+            task = task_management.reissue_task(self.get_task(), due_date, now=self.now)
+
+            self.assertFalse(task.is_closed)
+            self.assertTrue(task.is_current)
+            self.assertEqual(self.get_task().due_date, due_date)
+
+    def test_reissue_conflicts(self):
+        due_date = self.now + timedelta(days=5)
+        UserTask.objects.filter(pk=self.task.pk).update(is_closed=True)
+
+        # reissued by another request
+        task = self.get_task()
+        self.write_row(is_closed=False)
+        self.assert_status(
+            "active", task_management.reissue_task, task, due_date, check_version=False,
+            now=self.now
+        )
+
+        UserTask.objects.filter(pk=self.task.pk).update(is_closed=True)
+        task = self.get_task()
+        self.write_row()
+        with self.assertRaises(PreconditionFailed):
+            task_management.reissue_task(task, due_date, now=self.now)
+
+        task = self.get_task()
+        UserTask.objects.filter(pk=task.pk).delete()
+        with self.assertRaises(NotFound):
+            task_management.reissue_task(task, due_date, now=self.now)
+
+    def test_update(self):
+        task = task_management.update_task(
+            self.get_task(), {"description": "updated"}, now=self.now
+        )
+
+        self.assertEqual(task.version, 1)
+        self.assertEqual(self.get_task().description, "updated")
+
+        with self.assertRaises(TaskError):
+            task_management.update_task(self.get_task(), {"is_closed": True}, now=self.now)
+
+        for fields, status in (
+            ({"is_closed": True}, "closed"),
+            ({"is_closed": False, "due_date": self.now - timedelta(days=1)}, "expired")
+        ):
+            UserTask.objects.filter(pk=self.task.pk).update(**fields)
+            self.assert_status(
+                status, task_management.update_task, self.get_task(), {"description": "new"},
+                now=self.now
+            )
+
+    def test_update_conflicts(self):
+        fields = {"description": "updated"}
+
+        for row_fields, status in (
+            ({"is_closed": True}, "closed"),
+            ({"due_date": self.now - timedelta(days=1)}, "expired")
+        ):
+            task = self.get_task()
+            self.write_row(**row_fields)
+            self.assert_status(
+                status, task_management.update_task, task, fields, check_version=False,
+                now=self.now
+            )
+            UserTask.objects.filter(pk=self.task.pk).update(
+                is_closed=False, due_date=self.task.due_date
+            )
+
+        task = self.get_task()
+        self.write_row()
+        with self.assertRaises(PreconditionFailed):
+            task_management.update_task(task, fields, now=self.now)
+
+        task = self.get_task()
+        UserTask.objects.filter(pk=task.pk).delete()
+        with self.assertRaises(NotFound):
+            task_management.update_task(task, fields, now=self.now)
+
+
+class UserTaskConditionalGetTests(UserTaskTestCase):
+    url = "/api/user-tasks/"
+
+    def test_conditional_get(self):
+        task = self.add_tasks(2)[1]
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        for headers in ({"HTTP_IF_NONE_MATCH": etag}, {"HTTP_IF_MODIFIED_SINCE": last_modified}):
+            with self.subTest(headers=headers):
+                not_modified = self.client.get(self.url, **headers)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified["ETag"], etag)
+
+        response = self.client.patch(f"{self.url}{task.pk}/", {"description": "updated"})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertGreater(
+            parse_http_date(response["Last-Modified"]), parse_http_date(last_modified)
+        )
+
+    def test_query_string_has_its_own_validators(self):
+        self.add_tasks(2, is_closed=True)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(f"{self.url}?closed=false", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+
+class TaskCurrentnessTests(UserTaskTestCase):
+    """
+    is_current computed in SQL against the request's now agrees with the Python fallback
+    """
+    def test_sql_matches_python_fallback(self):
+        now = timezone.now()
+        tasks = {
+            "due now": UserTask(due_date=now),
+            "due a microsecond ago": UserTask(due_date=now - timedelta(microseconds=1)),
+            "due in a microsecond": UserTask(due_date=now + timedelta(microseconds=1)),
+            "no due date": UserTask(due_date=None),
+            "closed, due now": UserTask(due_date=now, is_closed=True),
+            "closed, expired": UserTask(due_date=now - timedelta(days=1), is_closed=True),
+        }
+
+        for description, task in tasks.items():
+            task.user = self.user
+            task.description = description
+
+        UserTask.objects.bulk_create(tasks.values())
+        annotated = {
+            task.description: task.is_current
+            for task in UserTask.objects.with_currentness(now)
+        }
+        current = set(UserTask.objects.current(now).values_list("description", flat=True))
+        expired = set(UserTask.objects.expired(now).values_list("description", flat=True))
+
+        with mock.patch("tasks.models.timezone.now", return_value=now):
+            fallback = {task.description: task.is_current for task in UserTask.objects.all()}
+
+        self.assertEqual(annotated, fallback)
+        self.assertEqual(annotated, {
+            "due now": True,
+            "due a microsecond ago": False,
+            "due in a microsecond": True,
+            "no due date": True,
+            "closed, due now": True,
+            "closed, expired": False,
+        })
+        self.assertEqual(current, {name for name, is_current in annotated.items() if is_current})
+        self.assertEqual(expired, set(annotated) - current)
+
+    def test_request_reads_the_clock_once(self):
+        task = self.add_tasks(2)[1]
+
+        for method, url in (
+            ("get", "/api/user-tasks/?current=true"),
+            ("get", f"/api/user-tasks/{task.pk}/"),
+            ("post", f"/api/user-tasks/{task.pk}/close/"),
+        ):
+            with self.subTest(url=url), mock.patch.object(
+                clock, "timezone", wraps=timezone
+            ) as clock_timezone:
+                response = getattr(self.client, method)(url)
+
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(clock_timezone.now.call_count, 1)
+
+
+class AsyncTaskListTests(UserTaskTestCase):
+    """
+    The async task lists answer what their sync twins answer
+    """
+    def setUp(self):
+        super().setUp()
+        self.add_tasks(3)
+        self.add_tasks(2, is_closed=True)
+        self.staff = User.objects.create_user("staff@example.com", nickname="staff", is_staff=True)
+
+    async def test_same_response_as_sync_view(self):
+        for user, path in (
+            (self.user, "user-tasks/"),
+            (self.user, "user-tasks/?closed=false&ordering=-created_at&fields=pk,description"),
+            (self.user, "user-tasks/?pagination=cursor"),
+            (self.user, "user-tasks/?fields=secret"),
+            (self.user, f"users/{self.user.pk}/tasks/"),
+            (self.staff, f"users/{self.user.pk}/tasks/"),
+        ):
+            with self.subTest(user=user.nickname, path=path):
+                response, async_response = await get_sync_and_async_responses(user, path)
+
+                self.assertNotEqual(response.status_code, 401, response.content)
+                self.assertEqual(async_response.status_code, response.status_code)
+                self.assertEqual(get_response_body(async_response), get_response_body(response))
+
+
+class MetricsTests(UserTaskTestCase):
+    def setUp(self):
+        super().setUp()
+        request_metrics.reset()
+        self.addCleanup(request_metrics.reset)
+        self.add_tasks(2)
+        self.staff = User.objects.create_user("staff@example.com", nickname="staff", is_staff=True)
+        self.staff_client = get_client(self.staff)
+
+    def get_metrics(self):
+        response = self.staff_client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE)
+
+        return response.content.decode().splitlines()
+
+    def test_requests_are_recorded_per_route(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/user-tasks/").status_code, 200)
+
+        response = self.client.get("/api/user-tasks/0/")
+        self.client.get("/api/no-such-page/")
+        lines = self.get_metrics()
+
+        labels = 'route="tasks:my-task-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', lines)
+        labels = 'route="tasks:task-detail",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="404"}} 1', lines)
+        queries = response.wsgi_request.query_recorder.count
+        self.assertGreater(queries, 0)
+        self.assertIn(f"http_request_db_queries_total{{{labels}}} {queries}", lines)
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', lines)
+
+    async def test_async_requests_are_recorded(self):
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_empty_response)))
+        client = await sync_to_async(get_async_client)(self.user)
+
+        response = await client.get("/api/async/user-tasks/")
+        self.assertEqual(response.status_code, 200, response.content)
+        lines = await sync_to_async(self.get_metrics)()
+
+        # the queries ran in the thread sync_to_async runs the ORM in
+        queries = response.asgi_request.query_recorder.count
+        self.assertGreater(queries, 1)
+        labels = 'route="tasks:async-my-task-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', lines)
+        self.assertIn(f"http_request_db_queries_total{{{labels}}} {queries}", lines)
+
+    def test_processes_are_summed(self):
+        self.client.get("/api/user-tasks/")
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            METRICS_MULTIPROCESS_DIR=directory
+        ):
+            # a file flushed by another worker
+            other_worker = RequestMetrics()
+            other_worker.observe(("tasks:my-task-list", "GET"), 200, 0.1, QueryRecorder(5))
+            other_worker.flush(directory)
+
+            lines = self.get_metrics()
+
+        labels = 'route="tasks:my-task-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', lines)
+
+    def test_staff_only(self):
+        self.assertEqual(CommitCallbacksClient().get("/api/metrics/").status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.get_metrics()
+
+
+@override_settings(TRACING_SAMPLE_RATE=0)
+class TracingTests(UserTaskTestCase):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    traceparent = f"00-{trace_id}-00f067aa0ba902b7-01"
+
+    def setUp(self):
+        super().setUp()
+        self.add_tasks(2)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.export_path = os.path.join(directory, "traces.jsonl")
+        self.enterContext(self.settings(TRACING_EXPORT_PATH=self.export_path))
+
+    def get_traces(self):
+        if not os.path.exists(self.export_path):
+            return []
+
+        with open(self.export_path, encoding="utf-8") as file:
+            return [json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"] for line in file]
+
+    def get_trace(self, response):
+        # the spans of the response's trace, checked to form one tree
+        [spans] = self.get_traces()
+        span_ids = {span["spanId"] for span in spans}
+
+        self.assertEqual({span["traceId"] for span in spans}, {response["X-Trace-Id"]})
+        # the root is exported last, its parent is the caller's span
+        self.assertTrue({span["parentSpanId"] for span in spans[:-1]} <= span_ids)
+        self.assertNotIn(spans[-1]["parentSpanId"], span_ids)
+
+        return spans
+
+    def test_unsampled_requests_are_not_traced(self):
+        for headers in ({}, {"traceparent": f"00-{self.trace_id}-00f067aa0ba902b7-00"}):
+            self.assertNotIn("X-Trace-Id", self.client.get("/api/user-tasks/", headers=headers))
+
+        self.assertEqual(self.get_traces(), [])
+
+    def test_traceparent_is_continued(self):
+        response = self.client.get("/api/user-tasks/", headers={"traceparent": self.traceparent})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Trace-Id"], self.trace_id)
+        spans = self.get_trace(response)
+        root = spans[-1]
+        self.assertEqual(root["name"], "GET tasks:my-task-list")
+        self.assertEqual(root["kind"], tracing.SERVER)
+        self.assertEqual(root["parentSpanId"], "00f067aa0ba902b7")
+        self.assertIn({"key": "http.status_code", "value": {"intValue": "200"}}, root["attributes"])
+
+        names = {span["name"] for span in spans}
+        self.assertTrue({"authenticate", "view UserTaskListView.get", "render"} <= names, names)
+        self.assertTrue(any(name.startswith("permission ") for name in names), names)
+        self.assertTrue(any(name.startswith("serialize ") for name in names), names)
+        db_spans = [span for span in spans if span["name"] == "db"]
+        self.assertEqual(len(db_spans), response.wsgi_request.query_recorder.count)
+        self.assertTrue(all(span["kind"] == tracing.CLIENT for span in db_spans))
+
+    @override_settings(TRACING_SAMPLE_RATE=1)
+    def test_sampled_requests_start_a_trace(self):
+        response = self.client.get("/api/user-tasks/0/")
+
+        self.assertEqual(response.status_code, 404)
+        root = self.get_trace(response)[-1]
+        self.assertEqual((root["name"], root["parentSpanId"]), ("GET tasks:task-detail", ""))
+
+    async def test_async_requests_are_traced(self):
+        self.assertTrue(iscoroutinefunction(TracingMiddleware(get_empty_response)))
+        client = await sync_to_async(get_async_client)(self.user)
+
+        response = await client.get("/api/async/user-tasks/", headers={
+            "traceparent": self.traceparent
+        })
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response["X-Trace-Id"], self.trace_id)
+        spans = self.get_trace(response)
+        self.assertEqual(spans[-1]["name"], "GET tasks:async-my-task-list")
+        # the queries ran in the thread sync_to_async runs the ORM in
+        db_spans = [span for span in spans if span["name"] == "db"]
+        self.assertGreater(len(db_spans), 1)
+        self.assertEqual(len(db_spans), response.asgi_request.query_recorder.count)
+
+    def test_export_waits_for_the_lock(self):
+        with tracing.export_lock:
+            thread = threading.Thread(target=export_trace, args=([],))
+            thread.start()
+            thread.join(0.1)
+
+            self.assertTrue(thread.is_alive())
+            self.assertFalse(os.path.exists(self.export_path))
+
+        thread.join()
+        self.assertEqual(self.get_traces(), [[]])
+
+
+class ProfilingTests(UserTaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_tasks(2)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.enterContext(override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0))
+        self.staff = User.objects.create_user("staff@example.com", nickname="staff", is_staff=True)
+        self.staff_client = get_client(self.staff)
+
+        original_get = UserTaskListView.get
+
+        def slow_get(view, request, *args, **kwargs):
+            # long enough for a few samples
+            time.sleep(0.05)
+            return original_get(view, request, *args, **kwargs)
+
+        self.enterContext(mock.patch.object(UserTaskListView, "get", slow_get))
+
+    def get_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.directory)
+            for root, _, names in os.walk(self.directory) for name in names
+        )
+
+    def test_staff_requests_are_profiled(self):
+        response = self.staff_client.get("/api/user-tasks/?profile=1")
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-Id"]
+        self.assertEqual(self.get_files(), [profile_id])
+        [profile] = self.staff_client.get("/api/profiles/?route=tasks:my-task-list").json()
+        self.assertEqual(
+            (profile["id"], profile["method"], profile["status"]), (profile_id, "GET", 200)
+        )
+        self.assertGreaterEqual(profile["duration_ms"], 50)
+
+        response = self.staff_client.get(f"/api/profiles/{profile_id}/")
+        self.assertIn("slow_get", response.content.decode())
+
+    def test_other_requests_are_not_profiled(self):
+        for client, path in (
+            (self.staff_client, "/api/user-tasks/"),
+            (self.client, "/api/user-tasks/?profile=1"),
+            (CommitCallbacksClient(), "/api/user-tasks/?profile=1"),
+        ):
+            self.assertNotIn("X-Profile-Id", client.get(path))
+
+        self.assertEqual(self.get_files(), [])
+
+    async def test_async_requests_are_not_profiled(self):
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(get_empty_response)))
+        client = await sync_to_async(get_async_client)(self.staff)
+
+        response = await client.get("/api/async/user-tasks/?profile=1")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotIn("X-Profile-Id", response)
+
+    def test_staff_only(self):
+        profile_id = store_profile("tasks:my-task-list", "GET", 200, 0.1, Counter({"a;b": 1}))
+
+        for path in ("/api/profiles/", f"/api/profiles/{profile_id}/"):
+            with self.subTest(path=path):
+                self.assertEqual(CommitCallbacksClient().get(path).status_code, 401)
+                self.assertEqual(self.client.get(path).status_code, 403)
+                self.assertEqual(self.staff_client.get(path).status_code, 200)
+
+        self.assertEqual(self.staff_client.get(f"/api/profiles/{profile_id}x/").status_code, 404)
+
+    @override_settings(PROFILING_MAX_PER_ROUTE=2)
+    def test_old_profiles_are_removed(self):
+        profile_ids = [
+            store_profile("tasks:my-task-list", "GET", 200, 0.1, Counter({"a;b": 1}))
+            for _ in range(3)
+        ]
+        expired_id, kept_id = self.get_files()
+        self.assertTrue({expired_id, kept_id} < set(profile_ids))
+
+        # past PROFILING_RETENTION
+        expired_at = time.time() - settings.PROFILING_RETENTION - 1
+        os.utime(os.path.join(self.directory, expired_id), (expired_at, expired_at))
+
+        self.assertEqual([profile["id"] for profile in list_profiles()], [kept_id])
+        self.assertEqual(self.get_files(), [kept_id])
+
+    def test_failed_write_leaves_no_file(self):
+        with mock.patch("core.profiling.os.replace", side_effect=OSError("No space left")), \
+                self.assertLogs("core.profiling", "WARNING"):
+            response = self.staff_client.get("/api/user-tasks/?profile=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(self.get_files(), [])
+
+    def test_sampler_thread_stops(self):
+        def wait():
+            time.sleep(0.02)
+
+        with StackSampler() as sampler:
+            wait()
+
+        self.assertFalse(sampler.thread.is_alive())
+        self.assertIsNone(sampler.root_frame)
+        self.assertGreater(sum(sampler.counts.values()), 0)
+
+        # a request running past PROFILING_MAX_SECONDS is sampled no longer
+        with override_settings(PROFILING_MAX_SECONDS=0), StackSampler() as sampler:
+            sampler.thread.join(1)
+
+            self.assertFalse(sampler.thread.is_alive())
+            self.assertEqual(sampler.counts, Counter())
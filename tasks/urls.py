@@ -1,12 +1,16 @@
 from django.urls import path
 
-from .views import UserTaskListView, UserTaskDetailView, UserTaskCloseView, UserTaskReissueView
+from .views import UserTaskListView, UserTaskDetailView, UserTaskCloseView, UserTaskReissueView, UserTaskBulkView, AsyncUserTaskListView
 
 
 app_name = "tasks"
 urlpatterns = [
     path("user-tasks/", UserTaskListView.as_view(is_admin_route=False), name="my-task-list"),
     path("users/<int:pk>/tasks/", UserTaskListView.as_view(is_admin_route=True), name="other-task-list"),
+    path("user-tasks/bulk/", UserTaskBulkView.as_view(is_admin_route=False), name="my-task-bulk"),
+    path("users/<int:pk>/tasks/bulk/", UserTaskBulkView.as_view(is_admin_route=True), name="other-task-bulk"),
+    path("async/user-tasks/", AsyncUserTaskListView.as_view(is_admin_route=False), name="async-my-task-list"),
+    path("async/users/<int:pk>/tasks/", AsyncUserTaskListView.as_view(is_admin_route=True), name="async-other-task-list"),
     path("user-tasks/<int:pk>/", UserTaskDetailView.as_view(), name="task-detail"),
     path("user-tasks/<int:pk>/close/", UserTaskCloseView.as_view(), name="task-close"),
     path("user-tasks/<int:pk>/reissue/", UserTaskReissueView.as_view(), name="task-reissue")
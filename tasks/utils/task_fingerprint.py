@@ -0,0 +1,24 @@
+from django.db.models import Count, Sum
+
+from core.conditional import aget_queryset_fingerprint, get_queryset_fingerprint
+
+
+def get_task_fingerprint(queryset, now, **aggregates):
+    """
+    Fingerprint of a task queryset for conditional requests
+    """
+    return get_queryset_fingerprint(
+        queryset,
+        overdue=Count("pk", filter=queryset.get_expired_condition(now)),
+        ids=Sum("pk"),
+        **aggregates
+    )
+
+
+async def aget_task_fingerprint(queryset, now, **aggregates):
+    return await aget_queryset_fingerprint(
+        queryset,
+        overdue=Count("pk", filter=queryset.get_expired_condition(now)),
+        ids=Sum("pk"),
+        **aggregates
+    )
@@ -1,20 +1,26 @@
-from django.db import transaction
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 
 from rest_framework import generics, status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.filters import OrderingFilter
 
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.async_views import AsyncAPIViewMixin
+from core.clock import get_request_now
+from core.concurrency import check_if_match, get_version_etag, retry_on_conflict
+from core.conditional import ConditionalGet
+from core.fast_serializers import aget_fast_list_response, get_fast_list_response
+from core.sparse_fields import get_only_fields, get_sparse_fields
 from core.pagination import NormalDataPagination
 from .models import UserTask
-from .serializers import TaskInfoSerializer, UserTaskInfoSerializer, InputTaskSerializer, TaskReissueSerializer
+from .serializers import TaskInfoSerializer, UserTaskInfoSerializer, InputTaskSerializer, TaskReissueSerializer, TaskInfoFastSerializer, BulkTaskOperationSerializer, BulkTaskRequestSerializer
 from .permissions import IsTaskOwnerOrStaff
 from .services.task_management import update_task, delete_task, close_task, reissue_task
-from .filters import TaskFilter
+from .services.bulk_task_management import BulkTaskActions, apply_user_task_operations
+from .filters import TaskFilter, TaskOrderingFilter
+from .utils.task_fingerprint import aget_task_fingerprint, get_task_fingerprint
 
 
 User = get_user_model()
@@ -26,11 +32,13 @@ class UserTaskListView(generics.GenericAPIView):
     queryset = UserTask.objects.all()
     pagination_class = NormalDataPagination
     filterset_class = TaskFilter
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskOrderingFilter]
 
-    ordering_filters = ["due_date", "created_at"]
+    ordering_fields = ["due_date", "created_at"]
     ordering = ["due_date"]
 
+    query_budget = {"GET": 4, "POST": 3}
+
     def get_permissions(self):
         if self.is_admin_route:
             permission_classes = [IsAdminUser]
@@ -48,19 +56,27 @@ class UserTaskListView(generics.GenericAPIView):
         queryset = self.get_queryset()
         queryset = self.filter_queryset(queryset)
 
-        page = self.paginate_queryset(queryset)
+        conditional_get = ConditionalGet(
+            request,
+            get_task_fingerprint(queryset, get_request_now(request))
+        )
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
 
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        serializer_class = TaskInfoFastSerializer.sparse(*get_sparse_fields(request))
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return conditional_get.patch_response(
+            get_fast_list_response(self, serializer_class, queryset)
+        )
 
     def get_queryset(self):
+        queryset = UserTask.objects.with_currentness(get_request_now(self.request))
+
         if self.is_admin_route:
-            return UserTask.objects.filter(user_id=self.kwargs["pk"])
-        return UserTask.objects.filter(user=self.request.user)
+            return queryset.filter(user_id=self.kwargs["pk"])
+        return queryset.filter(user=self.request.user)
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -84,11 +100,139 @@ class UserTaskListView(generics.GenericAPIView):
         )
 
 
+class AsyncUserTaskListView(AsyncAPIViewMixin, UserTaskListView):
+    """
+    UserTaskListView.get on the async request path (ASGI)
+    """
+    async def get(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        queryset = self.get_queryset()
+        queryset = self.filter_queryset(queryset)
+
+        conditional_get = ConditionalGet(
+            request,
+            await aget_task_fingerprint(queryset, get_request_now(request))
+        )
+        not_modified_response = conditional_get.get_not_modified_response(request)
+
+        if not_modified_response is not None:
+            return not_modified_response
+
+        serializer_class = TaskInfoFastSerializer.sparse(*get_sparse_fields(request))
+
+        return conditional_get.patch_response(
+            await aget_fast_list_response(self, serializer_class, queryset)
+        )
+
+
+class UserTaskBulkView(generics.GenericAPIView):
+    """
+    Applies up to 1000 personal task operations in one transaction
+    """
+    is_admin_route = False
+
+    serializer_class = BulkTaskRequestSerializer
+
+    query_budget = {"POST": 7}
+
+    def get_permissions(self):
+        if self.is_admin_route:
+            permission_classes = [IsAdminUser]
+        else:
+            permission_classes = [IsAuthenticated]
+
+        return [permission_class() for permission_class in permission_classes]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if self.is_admin_route:
+            target_user = get_object_or_404(User, pk=kwargs["pk"])
+        else:
+            target_user = request.user
+
+        operations = []
+        results = {}
+
+        for index, item in enumerate(serializer.validated_data["operations"]):
+            operation, errors = self.get_operation(item)
+
+            if errors is not None:
+                results[index] = {"status": "error", "errors": errors}
+            else:
+                operations.append({"index": index, **operation})
+
+        applied = apply_user_task_operations(target_user, operations, get_request_now(request))
+
+        for index, (task, error) in applied.items():
+            if error is not None:
+                results[index] = {
+                    "status": "error",
+                    "errors": {"detail": error.message, "code": error.code}
+                }
+            elif task is None:
+                results[index] = {"status": "ok"}
+            else:
+                results[index] = {"status": "ok", "task": TaskInfoSerializer(task).data}
+
+        return Response({
+            "results": [
+                {"index": index, **results[index]}
+                for index in sorted(results)
+            ]
+        })
+
+    @staticmethod
+    def get_operation(item):
+        """
+        Returns (operation, None) of a valid item of the batch, (None, errors) otherwise
+        """
+        operation_serializer = BulkTaskOperationSerializer(data=item)
+
+        if not operation_serializer.is_valid():
+            return None, operation_serializer.errors
+
+        action = operation_serializer.validated_data["action"]
+        fields = {}
+
+        if action in (BulkTaskActions.CREATE, BulkTaskActions.UPDATE):
+            task_serializer = InputTaskSerializer(
+                data=item,
+                partial=action == BulkTaskActions.UPDATE
+            )
+
+            if not task_serializer.is_valid():
+                return None, task_serializer.errors
+
+            fields = task_serializer.validated_data
+
+        return {
+            "action": action,
+            "pk": operation_serializer.validated_data.get("pk"),
+            "fields": fields
+        }, None
+
+
 class UserTaskDetailView(generics.GenericAPIView):
-    queryset = UserTask.objects.all()
     serializer_class = UserTaskInfoSerializer
     permission_classes = [IsTaskOwnerOrStaff]
 
+    query_budget = {"GET": 2, "PATCH": 3, "DELETE": 3}
+
+    def get_queryset(self):
+        queryset = UserTask.objects.with_currentness(get_request_now(self.request))
+
+        if self.request.method == "GET":
+            fields, _ = get_sparse_fields(self.request)
+
+            if fields is not None:
+                # version makes the ETag
+                queryset = queryset.only(
+                    *get_only_fields(UserTask, fields, required=("user", "version"))
+                )
+
+        return queryset
+
     def get_serializer_class(self):
         if self.request.method in ("PATCH", "PUT"):
             return InputTaskSerializer
@@ -96,18 +240,30 @@ class UserTaskDetailView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        fields, expand = get_sparse_fields(request)
+        serializer = self.get_serializer(instance, fields=fields, expand=expand)
 
-        return Response(serializer.data)
+        return Response(serializer.data, headers={"ETag": get_version_etag(instance)})
 
+    @retry_on_conflict
     def patch(self, request, *args, **kwargs):
         instance = self.get_object()
+        version_pinned = check_if_match(request, instance)
+
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
-        user_task = update_task(instance, serializer.validated_data)
+        user_task = update_task(
+            instance,
+            serializer.validated_data,
+            check_version=version_pinned,
+            now=get_request_now(request)
+        )
 
-        return Response(self.serializer_class(user_task).data)
+        return Response(
+            self.serializer_class(user_task).data,
+            headers={"ETag": get_version_etag(user_task)}
+        )
 
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -128,13 +284,16 @@ class TaskCloseView(generics.GenericAPIView):
     def get_serializer_class(self):
         raise NotImplementedError(f"Implement get_serializer_class in {self.__class__}")
 
+    @retry_on_conflict
     def post(self, request, *args, **kwargs):
-        with transaction.atomic():
-            task = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs["pk"])
-            self.check_object_permissions(request, task)
-            task = close_task(task)
+        task = get_object_or_404(self.get_queryset(), pk=kwargs["pk"])
+        self.check_object_permissions(request, task)
+        version_pinned = check_if_match(request, task)
+
+        # one UPDATE ... WHERE is_closed = false, the row is read again only if it matched nothing
+        task = close_task(task, check_version=version_pinned, now=get_request_now(request))
 
-            return Response(self.get_serializer(task).data)
+        return Response(self.get_serializer(task).data, headers={"ETag": get_version_etag(task)})
 
 
 class TaskReissueView(generics.GenericAPIView):
@@ -147,39 +306,48 @@ class TaskReissueView(generics.GenericAPIView):
     def get_serializer_class(self):
         raise NotImplementedError(f"Implement get_serializer_class in {self.__class__}")
 
+    @retry_on_conflict
     def post(self, request, *args, **kwargs):
         serializer = TaskReissueSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        with transaction.atomic():
-            task = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs["pk"])
-            self.check_object_permissions(request, task)
-
-            task = reissue_task(
-                task,
-                serializer.validated_data["due_date"]
-            )
+        task = get_object_or_404(self.get_queryset(), pk=kwargs["pk"])
+        self.check_object_permissions(request, task)
+        version_pinned = check_if_match(request, task)
+
+        # one UPDATE ... WHERE the task is closed or expired,
+        # the row is read again only if it matched nothing
+        task = reissue_task(
+            task,
+            serializer.validated_data["due_date"],
+            check_version=version_pinned,
+            now=get_request_now(request)
+        )
 
-            return Response(self.get_serializer(task).data)
+        return Response(self.get_serializer(task).data, headers={"ETag": get_version_etag(task)})
 
 
 class UserTaskCloseView(TaskCloseView):
+    query_budget = 3
+
     def get_permissions(self):
         return [IsTaskOwnerOrStaff()]
 
     def get_queryset(self):
-        return UserTask.objects.all()
+        return UserTask.objects.with_currentness(get_request_now(self.request))
 
     def get_serializer_class(self):
         return TaskInfoSerializer
 
 
 class UserTaskReissueView(TaskReissueView):
+    query_budget = 3
+
     def get_permissions(self):
         return [IsTaskOwnerOrStaff()]
 
     def get_queryset(self):
-        return UserTask.objects.all()
+        return UserTask.objects.with_currentness(get_request_now(self.request))
 
     def get_serializer_class(self):
         return TaskInfoSerializer
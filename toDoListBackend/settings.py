@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -50,6 +51,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
+    "core.tracing.TracingMiddleware",
+    "core.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "toDoListBackend.urls"
@@ -90,6 +95,20 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "to-do-list",
+    },
+    # what every worker must agree on, a local memory cache is per process
+    "shared": {
+        "BACKEND": os.environ.get(
+            "SHARED_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get("SHARED_CACHE_LOCATION", str(BASE_DIR / ".cache")),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -132,7 +151,7 @@ STATIC_URL = "static/"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -152,3 +171,59 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     'UPDATE_LAST_LOGIN': True,
 }
+
+# users served by CachedJWTAuthentication (users.authentication). Saves and
+# deletes invalidate only this cache, every worker must share it or it serves
+# a deactivated or changed user for up to cache_timeout (60) seconds
+JWT_USER_CACHE = "shared"
+
+# group -> role map in issued tokens (groups.utils.membership_claims)
+MEMBERSHIP_CLAIMS_ENABLED = True
+MEMBERSHIP_CLAIMS_MAX_GROUPS = 50
+
+# Last-Modified dates of conditional GETs (core.conditional), a date kept per
+# worker would move back and forth between the workers
+CONDITIONAL_GET_CACHE = "shared"
+
+# GroupDetailView snapshots (groups.utils.group_snapshot). Invalidation reaches
+# only the processes sharing this cache, the local memory cache is per process,
+# so other workers serve a changed group for up to GROUP_SNAPSHOT_TIMEOUT seconds.
+# Point it to a shared cache (e.g. Redis) before raising the timeout
+GROUP_SNAPSHOT_CACHE = "default"
+GROUP_SNAPSHOT_TIMEOUT = int(os.environ.get("GROUP_SNAPSHOT_TIMEOUT", 10))
+
+# SQL statements per request (core.query_budget), views declare query_budget.
+# "raise" fails requests over budget, "log" only logs them, "off" records nothing.
+# The tests raise (override_settings), on a server the error would replace the response
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "log")
+# a query shape repeated this many times in one request is logged as N+1
+QUERY_REPEAT_THRESHOLD = 5
+
+# per-route request metrics (core.metrics), served to staff at /api/metrics/.
+# Behind a preforking server point every worker to one directory,
+# cleared on deploy, and each scrape sums all of them
+METRICS_ENABLED = True
+METRICS_MULTIPROCESS_DIR = os.environ.get("METRICS_MULTIPROCESS_DIR")
+METRICS_FLUSH_INTERVAL = 5
+
+# spans of sampled requests (core.tracing): view, authentication, permissions,
+# SQL, serialization and rendering, one OTLP JSON line per trace.
+# A traceparent header carries the caller's sampling decision
+TRACING_ENABLED = True
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0))
+TRACING_EXPORT_PATH = os.environ.get("TRACING_EXPORT_PATH", str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = "toDoListBackend"
+
+# sampling profiler (core.profiling): requests of staff users sending X-Profile: 1
+# or ?profile=1, and PROFILING_SAMPLE_RATE of all requests, are sampled every
+# PROFILING_INTERVAL seconds into collapsed stacks per route, served to staff
+# at /api/profiles/. The newest PROFILING_MAX_PER_ROUTE of a route are kept
+# for PROFILING_RETENTION seconds
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.environ.get("PROFILING_DIR", str(BASE_DIR / "profiles"))
+PROFILING_INTERVAL = 0.005
+PROFILING_MAX_SECONDS = 30
+PROFILING_MAX_STACKS = 1000
+PROFILING_MAX_PER_ROUTE = 20
+PROFILING_RETENTION = 60 * 60 * 24 * 7
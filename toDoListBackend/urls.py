@@ -1,11 +1,17 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from core.metrics import MetricsView
+from core.profiling import ProfileDetailView, ProfileListView
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("users.urls")),
     path("api/", include("tasks.urls")),
     path("api/", include("groups.urls")),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+    path("api/profiles/", ProfileListView.as_view(), name="profile-list"),
+    path("api/profiles/<str:route>/<str:name>/", ProfileDetailView.as_view(), name="profile-detail"),
     # path("api/staff/", include("users.staff_urls")),
 ]
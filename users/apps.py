@@ -1,5 +1,9 @@
-from django.apps import AppConfig
-
-
-class UsersConfig(AppConfig):
-    name = 'users'
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'users'
+
+    def ready(self):
+        # registers the receivers
+        from . import signals  # pylint: disable=import-outside-toplevel,unused-import
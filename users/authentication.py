@@ -0,0 +1,72 @@
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication serving the user from a short-lived cache
+    """
+    cache_prefix = "jwt-user"
+    # how long a worker not sharing JWT_USER_CACHE may serve a changed user
+    cache_timeout = 60
+
+    @staticmethod
+    def get_cache():
+        return caches[settings.JWT_USER_CACHE]
+
+    @classmethod
+    def get_cache_key(cls, user_id):
+        return f"{cls.cache_prefix}:{user_id}"
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        cls.get_cache().delete_many([cls.get_cache_key(user_id) for user_id in user_ids])
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def get_user(self, validated_token):
+        cache = self.get_cache()
+        cache_key = self.get_cache_key(self.get_user_id(validated_token))
+        user = cache.get(cache_key)
+
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(cache_key, user, self.cache_timeout)
+
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for the async request path
+        """
+        header = self.get_header(request)
+
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_cache().get(self.get_cache_key(self.get_user_id(validated_token)))
+
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+
+        return user, validated_token
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_rename_date_joined_user_created_at_user_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='membership_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
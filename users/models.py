@@ -10,6 +10,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # bumped when user's memberships change, tokens with an older version
+    # carry stale membership claims (see groups.utils.membership_claims)
+    membership_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
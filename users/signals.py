@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import CachedJWTAuthentication
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(instance, **kwargs):
+    # e.g. UserDetailView.patch / delete, deactivation, password change
+    CachedJWTAuthentication.invalidate(instance.pk)
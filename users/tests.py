@@ -1,3 +1,74 @@
-from django.test import TestCase
-
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from tasks.tests import clear_caches, get_access_token
+
+from .authentication import CachedJWTAuthentication
+
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+        self.user = User.objects.create_user("user@example.com", nickname="user")
+        self.request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {get_access_token(self.user)}"
+        )
+
+    def authenticate(self):
+        return CachedJWTAuthentication().authenticate(self.request)[0]
+
+    def aauthenticate(self):
+        return async_to_sync(CachedJWTAuthentication().aauthenticate)(self.request)[0]
+
+    def test_cached_user_is_served_without_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+
+        for authenticate in (self.authenticate, self.aauthenticate):
+            with self.subTest(authenticate=authenticate.__name__), self.assertNumQueries(0):
+                self.assertEqual(authenticate(), self.user)
+
+    def test_save_invalidates(self):
+        for authenticate in (self.authenticate, self.aauthenticate):
+            with self.subTest(authenticate=authenticate.__name__):
+                authenticate()
+
+                self.user.nickname = f"renamed by {authenticate.__name__}"
+                self.user.save()
+
+                with self.assertNumQueries(1):
+                    self.assertEqual(authenticate().nickname, self.user.nickname)
+
+    def test_delete_invalidates(self):
+        self.authenticate()
+        self.user.delete()
+
+        for authenticate in (self.authenticate, self.aauthenticate):
+            with self.subTest(authenticate=authenticate.__name__):
+                with self.assertRaises(AuthenticationFailed):
+                    authenticate()
+
+    def test_inactive_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        for authenticate in (self.authenticate, self.aauthenticate):
+            with self.subTest(authenticate=authenticate.__name__):
+                with self.assertRaises(AuthenticationFailed):
+                    authenticate()
+
+        # the rejected user was not cached either
+        self.assertIsNone(CachedJWTAuthentication.get_cache().get(
+            CachedJWTAuthentication.get_cache_key(self.user.pk)
+        ))
@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from groups.utils.membership_claims import add_membership_claims
+
+
+class MembershipRefreshToken(RefreshToken):
+    """
+    RefreshToken carrying user's group memberships
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_membership_claims(token, user)
+
+        return token
@@ -3,11 +3,11 @@ from django.contrib.auth.signals import user_logged_in
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from core.pagination import NormalDataPagination
 from .serializers import RegisterRequestSerializer, LoginRequestSerializer, UserProfileInfoSerializer
 from .permissions import IsAccountOwnerOrAdmin
+from .tokens import MembershipRefreshToken
 
 
 User = get_user_model()
@@ -18,6 +18,8 @@ class RegisterView(generics.GenericAPIView):
     permission_classes = (AllowAny, )
     serializer_class = RegisterRequestSerializer
 
+    query_budget = {"POST": 4}
+
     def post(self, request):
         serializer = self.get_serializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -25,7 +27,7 @@ class RegisterView(generics.GenericAPIView):
 
         user_logged_in.send(sender=user.__class__, request=request, user=user)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = MembershipRefreshToken.for_user(user)
 
         return Response(
             {
@@ -42,6 +44,8 @@ class LoginView(generics.GenericAPIView):
     permission_classes = (AllowAny, )
     serializer_class = LoginRequestSerializer
 
+    query_budget = {"POST": 3}
+
     def post(self, request):
         serializer = self.get_serializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -49,7 +53,7 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data["user"]
         user_logged_in.send(sender=user.__class__, request=request, user=user)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = MembershipRefreshToken.for_user(user)
 
         return Response(
             {
@@ -65,6 +69,9 @@ class UserDetailView(generics.GenericAPIView):
     permission_classes = (IsAccountOwnerOrAdmin, )
     serializer_class = UserProfileInfoSerializer
 
+    # deleting a user cascades to their tasks and memberships in batches
+    query_budget = {"GET": 2, "PATCH": 4}
+
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)